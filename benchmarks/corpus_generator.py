@@ -0,0 +1,336 @@
+import os
+import csv
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from typing import Dict, List, Any
+
+COLORS = ['Red', 'Blue', 'Green', 'Black', 'White', 'Yellow', 'Silver', 'Orange', 'Grey', 'Purple']
+MATERIALS = ['Steel', 'Aluminum', 'Plastic', 'Copper', 'Brass', 'Rubber', 'Nylon', 'Titanium']
+PRODUCTS = ['Widget', 'Component', 'Part', 'Rod', 'Wire', 'Bracket', 'Bolt', 'Valve', 'Gasket',
+            'Bearing', 'Flange', 'Hinge', 'Spring', 'Washer', 'Coupling', 'Panel']
+SIZES = ['1kg', '5kg', '10kg', '25kg', '1m', '5m', '100m', '10mm', '25mm', '50mm']
+COMPANY_PREFIXES = ['ABC', 'XYZ', 'DEF', 'Global', 'Prime', 'Apex', 'Summit', 'Delta', 'Northern', 'Pacific']
+COMPANY_SUFFIXES = ['Manufacturing Corp', 'Industries Ltd', 'Engineering LLC', 'Supplies Inc', 'Works GmbH']
+
+# Columns of the open-invoice ledger, as AgingEngine reads it
+LEDGER_COLUMNS = ['CustomerID', 'CustomerName', 'InvoiceNo', 'InvoiceDate', 'DueDate', 'Amount', 'Comments']
+
+# Character confusions typical of OCR output
+OCR_CONFUSIONS = {'0': 'O', 'O': '0', '1': 'l', 'l': '1', 'S': '5', '5': 'S', 'B': '8', 'e': 'c'}
+
+TEXT_TEMPLATES = [
+    """PURCHASE ORDER
+
+Customer: {customer}
+Date: {date}
+PO Number: {po_number}
+
+Item Description: {item}
+Quantity: {quantity}
+Unit Price: ${price}
+
+Total: ${total}
+""",
+    """Purchase Order #{po_number}
+
+Client: {customer}
+Order Date: {date}
+
+Product: {item}
+Qty: {quantity} units
+Price per unit: ${price}
+
+Total Amount: ${total}
+""",
+    """ORDER CONFIRMATION REQUEST
+
+Bill To: {customer}
+Order Number: {po_number}
+{date}
+
+Description: {item}
+Quantity: {quantity}
+Amount: ${total}
+"""
+]
+
+
+class CorpusGenerator:
+    """Generates synthetic SKU catalogs and PO documents with known ground truth"""
+
+    def __init__(self, seed: int = 42, noise_level: float = 0.0):
+        self.random = random.Random(seed)
+        self.noise_level = noise_level
+
+    def generate_catalog(self, rows: int) -> List[Dict[str, str]]:
+        """Generate a SKU catalog with the columns SKUMapper expects"""
+        customers = self._generate_customers(max(rows // 20, 5))
+        catalog = []
+        seen = set()
+
+        while len(catalog) < rows:
+            color = self.random.choice(COLORS)
+            material = self.random.choice(MATERIALS)
+            product = self.random.choice(PRODUCTS)
+            size = self.random.choice(SIZES)
+            description = f"{color} {material} {product} {size}"
+            if description in seen:
+                description = f"{description} Type {len(catalog)}"
+            seen.add(description)
+
+            catalog.append({
+                'SKU': f"SKU-{len(catalog) + 1:06d}",
+                'ItemDescription': description,
+                'CustomerDescription': f"{color} {product}",
+                'Customer': self.random.choice(customers + ['All Customers'])
+            })
+
+        return catalog
+
+    def _generate_customers(self, count: int) -> List[str]:
+        """Generate distinct customer names"""
+        customers = set()
+        while len(customers) < count:
+            customers.add(f"{self.random.choice(COMPANY_PREFIXES)} {self.random.choice(COMPANY_SUFFIXES)}"
+                          + (f" {len(customers)}" if len(customers) >= 50 else ''))
+        return sorted(customers)
+
+    def generate_order(self, catalog: List[Dict[str, str]], index: int) -> Dict[str, Any]:
+        """Generate one PO's ground truth and rendered text"""
+        row = self.random.choice(catalog)
+        quantity = self.random.randint(1, 500)
+        price = round(self.random.uniform(1, 200), 2)
+        customer = row['Customer'] if row['Customer'] != 'All Customers' else \
+            f"{self.random.choice(COMPANY_PREFIXES)} {self.random.choice(COMPANY_SUFFIXES)}"
+        order_date = datetime(2024, 1, 1) + timedelta(days=self.random.randint(0, 365))
+
+        fields = {
+            'customer': customer,
+            'item': row['ItemDescription'],
+            'quantity': quantity,
+            'price': f"{price:.2f}",
+            'total': f"{price * quantity:,.2f}",
+            'po_number': f"PO{order_date.year}{index:06d}",
+            'date': order_date.strftime('%Y-%m-%d')
+        }
+        text = self.random.choice(TEXT_TEMPLATES).format(**fields)
+
+        return {
+            'expected_sku': row['SKU'],
+            'expected_customer': customer,
+            'expected_quantity': str(quantity),
+            'expected_po_number': fields['po_number'],
+            'text': self.add_noise(text)
+        }
+
+    def add_noise(self, text: str) -> str:
+        """Apply OCR-style character confusions and whitespace damage"""
+        if self.noise_level <= 0:
+            return text
+
+        output = []
+        for char in text:
+            roll = self.random.random()
+            if roll < self.noise_level * 0.5 and char in OCR_CONFUSIONS:
+                output.append(OCR_CONFUSIONS[char])
+            elif roll < self.noise_level * 0.6 and char == ' ':
+                output.append('  ')
+            elif roll < self.noise_level * 0.65 and char.isalpha():
+                continue
+            else:
+                output.append(char)
+        return ''.join(output)
+
+    def write_catalog(self, catalog: List[Dict[str, str]], path: str):
+        """Write the catalog as the Excel file SKUMapper loads"""
+        import pandas as pd
+
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        pd.DataFrame(catalog).to_excel(path, index=False)
+
+    def write_text(self, text: str, path: str):
+        """Write a plain text PO"""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def write_pdf(self, text: str, path: str, pages: int = 1):
+        """Write a minimal text-layer PDF without extra dependencies"""
+        lines = text.splitlines()
+        objects = []
+        page_ids = []
+        font_id = 3
+
+        objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+        objects.append(None)  # Pages tree, filled in once page ids are known
+        objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+        for page_number in range(pages):
+            page_lines = lines if page_number == 0 else [f"Page {page_number + 1} - terms and conditions"] * 40
+            stream = ["BT", "/F1 11 Tf", "14 TL", "72 760 Td"]
+            for line in page_lines:
+                escaped = line.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+                stream.append(f"({escaped}) Tj T*")
+            stream.append("ET")
+            content = '\n'.join(stream).encode('latin-1', errors='replace')
+
+            objects.append(b"<< /Length " + str(len(content)).encode() + b" >>\nstream\n"
+                           + content + b"\nendstream")
+            content_id = len(objects)
+            objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                           f"/Resources << /Font << /F1 {font_id} 0 R >> >> "
+                           f"/Contents {content_id} 0 R >>".encode())
+            page_ids.append(len(objects))
+
+        kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+        objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+        output = bytearray(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(len(output))
+            output += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+
+        xref_offset = len(output)
+        output += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+        for offset in offsets:
+            output += f"{offset:010d} 00000 n \n".encode()
+        output += (f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+                   f"startxref\n{xref_offset}\n%%EOF\n").encode()
+
+        with open(path, 'wb') as f:
+            f.write(output)
+
+    def write_image(self, text: str, path: str, scale: float = 1.0):
+        """Render a scanned-looking PO image, degraded according to the noise level"""
+        from PIL import Image, ImageDraw, ImageFont, ImageFilter
+
+        width, height = int(1240 * scale), int(1754 * scale)
+        image = Image.new('L', (width, height), 255)
+        draw = ImageDraw.Draw(image)
+
+        try:
+            font = ImageFont.truetype('DejaVuSans.ttf', int(28 * scale))
+        except OSError:
+            font = ImageFont.load_default()
+
+        y = int(100 * scale)
+        for line in text.splitlines():
+            draw.text((int(100 * scale), y), line, fill=0, font=font)
+            y += int(40 * scale)
+
+        if self.noise_level > 0:
+            pixels = image.load()
+            speckles = int(width * height * self.noise_level * 0.01)
+            for _ in range(speckles):
+                pixels[self.random.randrange(width), self.random.randrange(height)] = \
+                    self.random.choice((0, 128, 255))
+            image = image.rotate(self.random.uniform(-2, 2) * self.noise_level * 5,
+                                 fillcolor=255, expand=False)
+            if self.noise_level > 0.2:
+                image = image.filter(ImageFilter.GaussianBlur(radius=self.noise_level * 2))
+
+        image.save(path)
+
+    def generate_ledger(self, customers: List[str], invoices_per_customer: int = 5) -> List[Dict[str, Any]]:
+        """Generate open invoices for each customer, due across every aging bucket"""
+        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        ledger = []
+        for number, customer in enumerate(customers, start=1):
+            customer_id = f"CUST-{number:05d}"
+            for _ in range(self.random.randint(1, 2 * invoices_per_customer)):
+                due_date = today - timedelta(days=self.random.randint(-30, 150))
+                ledger.append({
+                    'CustomerID': customer_id,
+                    'CustomerName': customer,
+                    'InvoiceNo': f"INV-{len(ledger) + 1:07d}",
+                    'InvoiceDate': (due_date - timedelta(days=30)).strftime('%Y-%m-%d'),
+                    'DueDate': due_date.strftime('%Y-%m-%d'),
+                    'Amount': round(self.random.uniform(100, 50000), 2),
+                    'Comments': ''
+                })
+        return ledger
+
+    def write_ledger(self, ledger: List[Dict[str, Any]], path: str):
+        """Write the ledger as the CSV AgingEngine reads"""
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=LEDGER_COLUMNS)
+            writer.writeheader()
+            writer.writerows(ledger)
+
+    def generate_corpus(self, output_folder: str, catalog_rows: int = 1000, text_docs: int = 100,
+                        pdf_docs: int = 20, image_docs: int = 10, pdf_pages: int = 1,
+                        image_scale: float = 1.0, invoices_per_customer: int = 5) -> Dict[str, Any]:
+        """Write a catalog, PO documents, an invoice ledger for their customers and a ground-truth
+        manifest to a folder"""
+        os.makedirs(output_folder, exist_ok=True)
+        documents_folder = os.path.join(output_folder, 'documents')
+        os.makedirs(documents_folder, exist_ok=True)
+
+        catalog = self.generate_catalog(catalog_rows)
+        catalog_path = os.path.join(output_folder, 'sku_mapping.xlsx')
+        self.write_catalog(catalog, catalog_path)
+
+        documents = []
+        index = 0
+        for file_type, count in (('.txt', text_docs), ('.pdf', pdf_docs), ('.png', image_docs)):
+            for _ in range(count):
+                index += 1
+                order = self.generate_order(catalog, index)
+                path = os.path.join(documents_folder, f"po_{index:06d}{file_type}")
+
+                if file_type == '.txt':
+                    self.write_text(order['text'], path)
+                elif file_type == '.pdf':
+                    self.write_pdf(order['text'], path, pdf_pages)
+                else:
+                    self.write_image(order['text'], path, image_scale)
+
+                order['file'] = path
+                order['file_type'] = file_type
+                documents.append(order)
+
+        # Ledger rows come after every document, so documents stay identical for a given seed
+        ledger = self.generate_ledger(sorted({doc['expected_customer'] for doc in documents}),
+                                      invoices_per_customer)
+        ledger_path = os.path.join(output_folder, 'open_invoices.csv')
+        self.write_ledger(ledger, ledger_path)
+        customers = {row['CustomerID']: row['CustomerName'] for row in ledger}
+
+        manifest = {
+            'catalog_file': catalog_path,
+            'catalog_rows': catalog_rows,
+            'noise_level': self.noise_level,
+            'ledger_file': ledger_path,
+            'customers': [{'id': customer_id, 'name': name} for customer_id, name in customers.items()],
+            'documents': documents
+        }
+        with open(os.path.join(output_folder, 'manifest.json'), 'w') as f:
+            json.dump(manifest, f, indent=2)
+
+        print(f"📁 Generated corpus: {len(documents)} documents, {catalog_rows} SKUs in {output_folder}")
+        return manifest
+
+
+def main():
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic PO corpus")
+    parser.add_argument('output_folder')
+    parser.add_argument('--catalog-rows', type=int, default=1000)
+    parser.add_argument('--text', type=int, default=100)
+    parser.add_argument('--pdf', type=int, default=20)
+    parser.add_argument('--images', type=int, default=10)
+    parser.add_argument('--pdf-pages', type=int, default=1)
+    parser.add_argument('--image-scale', type=float, default=1.0)
+    parser.add_argument('--noise', type=float, default=0.0, help="Noise level between 0 and 1")
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(seed=args.seed, noise_level=args.noise)
+    generator.generate_corpus(args.output_folder, args.catalog_rows, args.text, args.pdf,
+                              args.images, args.pdf_pages, args.image_scale)
+
+
+if __name__ == "__main__":
+    main()
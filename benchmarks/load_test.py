@@ -0,0 +1,228 @@
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import logging
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from contextlib import redirect_stdout
+from typing import Any, Dict, List
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus_generator import CorpusGenerator
+from utils.config_manager import ConfigManager
+
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(int(round(pct / 100 * len(sorted_values))), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Count and latency percentiles in milliseconds"""
+    ordered = sorted(seconds)
+    summary = {'count': len(ordered)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = percentile(ordered, pct) * 1000
+    summary['max_ms'] = (ordered[-1] if ordered else 0.0) * 1000
+    return summary
+
+
+class LoadTest:
+    """Pushes a synthetic corpus through the full order pipeline with concurrent workers
+
+    Every worker is an OrderProcessor with its own folders, journal and indexes, as separate
+    hosts would have; they share the SKU catalog and the process-wide ERP in-flight count,
+    so the ERP model's concurrency slowdown and throttling apply across workers.
+    """
+
+    def __init__(self, work_folder: str, manifest: Dict[str, Any], workers: int = 4,
+                 erp_settings: Dict[str, Any] = None):
+        self.work_folder = work_folder
+        self.manifest = manifest
+        self.workers = workers
+        self.erp_settings = erp_settings or {}
+
+    def _worker_config(self, index: int) -> ConfigManager:
+        """Configuration with every relative path moved under the worker's folder"""
+        folder = os.path.join(self.work_folder, f"worker_{index:02d}")
+        config = ConfigManager(os.path.join(folder, 'settings.json'))
+
+        for key, value in config.get('paths', {}).items():
+            if isinstance(value, str) and not os.path.isabs(value):
+                config.set(f"paths.{key}", os.path.join(folder, value))
+        config.set('paths.sku_mapping_file', self.manifest['catalog_file'])
+
+        config.set('erp.record_calls', True)
+        for key, value in self.erp_settings.items():
+            config.set(f"erp.{key}", value)
+        config.set('cluster.enabled', False)
+        config.set('metrics.textfile', None)
+        return config
+
+    def run(self) -> Dict[str, Any]:
+        """Process every document once and collect end-to-end and ERP call latencies"""
+        from order_processing.main_processor import OrderProcessor
+
+        processors = [OrderProcessor(self._worker_config(index)) for index in range(self.workers)]
+        for processor in processors:
+            os.makedirs(processor.input_folder, exist_ok=True)
+
+        jobs: queue.Queue = queue.Queue()
+        for document in self.manifest['documents']:
+            jobs.put(document)
+
+        lock = threading.Lock()
+        latencies: List[float] = []
+        outcomes: Counter = Counter()
+
+        def work(processor):
+            while True:
+                try:
+                    document = jobs.get_nowait()
+                except queue.Empty:
+                    return
+                file_path = shutil.copy(document['file'], processor.input_folder)
+                start = time.perf_counter()
+                success = processor._process_single_file(file_path)
+                elapsed = time.perf_counter() - start
+                with lock:
+                    latencies.append(elapsed)
+                    outcomes['processed' if success else 'exception'] += 1
+
+        print(f"\n🚚 Load test: {jobs.qsize()} documents, {self.workers} workers")
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            started = time.perf_counter()
+            threads = [
+                threading.Thread(target=work, args=(processor,), name=f"load-{index}")
+                for index, processor in enumerate(processors)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall_seconds = time.perf_counter() - started
+
+        for processor in processors:
+            processor.journal.flush()
+
+        erp: Dict[str, Dict[str, Any]] = {}
+        observations: Dict[str, List[tuple]] = {}
+        for processor in processors:
+            for operation, calls in processor.erp_simulator.latency_model.observations.items():
+                observations.setdefault(operation, []).extend(calls)
+        for operation, calls in sorted(observations.items()):
+            erp[operation] = {
+                **summarize([seconds for seconds, _ in calls]),
+                'statuses': dict(Counter(status for _, status in calls))
+            }
+
+        return {
+            'documents': len(latencies),
+            'workers': self.workers,
+            'wall_seconds': wall_seconds,
+            'throughput_per_s': len(latencies) / wall_seconds if wall_seconds > 0 else 0.0,
+            'outcomes': dict(outcomes),
+            'latency': summarize(latencies),
+            'erp': erp,
+            'erp_settings': self.erp_settings
+        }
+
+
+def print_report(result: Dict[str, Any]):
+    """Print throughput and latency percentiles"""
+    latency = result['latency']
+    print(f"\n📈 {result['documents']} documents in {result['wall_seconds']:.2f}s "
+          f"with {result['workers']} workers: {result['throughput_per_s']:.2f} docs/s")
+    print(f"   Outcomes: {', '.join(f'{k} {v}' for k, v in sorted(result['outcomes'].items()))}")
+    print(f"   End-to-end  p50 {latency['p50_ms']:9.1f} ms   p95 {latency['p95_ms']:9.1f} ms   "
+          f"p99 {latency['p99_ms']:9.1f} ms   max {latency['max_ms']:9.1f} ms")
+
+    for operation, stats in result['erp'].items():
+        failures = {status: count for status, count in stats['statuses'].items() if status != 'ok'}
+        print(f"   {operation:<22} p50 {stats['p50_ms']:9.1f} ms   p95 {stats['p95_ms']:9.1f} ms   "
+              f"p99 {stats['p99_ms']:9.1f} ms" + (f"   failures {failures}" if failures else ''))
+
+
+def main():
+    """Generate a corpus, run it through the pipeline under an ERP latency model and report"""
+    parser = argparse.ArgumentParser(description="Load test the order pipeline against a simulated ERP")
+    parser.add_argument('--documents', type=int, default=200, help="Text PO documents")
+    parser.add_argument('--pdf', type=int, default=0)
+    parser.add_argument('--images', type=int, default=0)
+    parser.add_argument('--catalog-rows', type=int, default=1000)
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--time-scale', type=float, default=0.01,
+                        help="Real seconds per simulated ERP second")
+    parser.add_argument('--distribution', choices=['constant', 'uniform', 'normal', 'lognormal', 'exponential'],
+                        help="Latency distribution for every order ERP call")
+    parser.add_argument('--sigma', type=float, default=0.5, help="Spread of a lognormal distribution")
+    parser.add_argument('--tail-rate', type=float, default=0.0, help="Share of calls hit by a slow outlier")
+    parser.add_argument('--tail-multiplier', type=float, default=10.0)
+    parser.add_argument('--overhead', type=float, help="Per-call overhead in simulated seconds")
+    parser.add_argument('--concurrency-slowdown', type=float,
+                        help="Latency increase per additional ERP call in flight")
+    parser.add_argument('--max-concurrent-calls', type=int, help="Throttle calls above this many in flight")
+    parser.add_argument('--timeout', type=float, help="ERP call timeout in simulated seconds")
+    parser.add_argument('--error-rate', type=float, help="Share of ERP calls that fail")
+    parser.add_argument('--erp-config', help="JSON file with erp settings, applied before the flags above")
+    parser.add_argument('--work-folder', help="Keep the corpus and worker folders here instead of a temp folder")
+    parser.add_argument('--output', help="Write the result as JSON to this file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    erp_settings: Dict[str, Any] = {}
+    if args.erp_config:
+        with open(args.erp_config, 'r') as f:
+            erp_settings.update(json.load(f))
+    erp_settings['time_scale'] = args.time_scale
+    erp_settings['seed'] = args.seed
+    flags = {
+        'per_call_overhead_seconds': args.overhead,
+        'concurrency_slowdown': args.concurrency_slowdown,
+        'max_concurrent_calls': args.max_concurrent_calls,
+        'timeout_seconds': args.timeout,
+        'error_rate': args.error_rate
+    }
+    erp_settings.update({key: value for key, value in flags.items() if value is not None})
+    if args.distribution:
+        operations = erp_settings.setdefault('operations', {})
+        for operation in ('create_sales_order', 'create_delivery_note', 'create_invoice'):
+            operations.setdefault(operation, {}).update({
+                'distribution': args.distribution,
+                'sigma': args.sigma,
+                'tail_rate': args.tail_rate,
+                'tail_multiplier': args.tail_multiplier
+            })
+
+    with tempfile.TemporaryDirectory(prefix='rpa_load_') as temp_folder:
+        work_folder = args.work_folder or temp_folder
+        generator = CorpusGenerator(seed=args.seed, noise_level=args.noise)
+        manifest = generator.generate_corpus(
+            os.path.join(work_folder, 'corpus'), args.catalog_rows, args.documents, args.pdf, args.images
+        )
+        result = LoadTest(work_folder, manifest, args.workers, erp_settings).run()
+
+    print_report(result)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(result, f, indent=4)
+        print(f"\n💾 Result written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
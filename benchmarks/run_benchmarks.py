@@ -0,0 +1,224 @@
+import io
+import os
+import sys
+import json
+import time
+import pickle
+import logging
+import argparse
+import tempfile
+import statistics
+from contextlib import redirect_stdout
+from typing import Dict, List, Any, Callable, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus_generator import CorpusGenerator
+from utils.config_manager import ConfigManager
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class BenchmarkSuite:
+    """Times the order and unblock stages on a generated corpus"""
+
+    def __init__(self, work_folder: str, manifest: Dict[str, Any], repeat: int = 3):
+        self.work_folder = work_folder
+        self.manifest = manifest
+        self.repeat = repeat
+        self.results: Dict[str, Dict[str, float]] = {}
+
+        self.config = ConfigManager(os.path.join(work_folder, 'settings.json'))
+        self.config.set('paths.sku_mapping_file', manifest['catalog_file'])
+        self.config.set('paths.reports_folder', os.path.join(work_folder, 'reports'))
+        self.config.set('paths.logs_folder', os.path.join(work_folder, 'logs'))
+        # The generated ledger, so aging results do not depend on the working directory
+        if manifest.get('ledger_file'):
+            self.config.set('paths.invoice_ledger_file', manifest['ledger_file'])
+
+    def _measure(self, name: str, items: List[Any], operation: Callable[[Any], Any],
+                 score: Optional[Callable[[Any, Any], bool]] = None):
+        """Time an operation per item, keeping the median over repeats"""
+        if not items:
+            return
+
+        timings = []
+        correct = 0
+        for _ in range(self.repeat):
+            correct = 0
+            for item in items:
+                start = time.perf_counter()
+                with redirect_stdout(io.StringIO()):
+                    output = operation(item)
+                timings.append(time.perf_counter() - start)
+                if score and score(item, output):
+                    correct += 1
+
+        result = {
+            'operations': len(items),
+            'median_ms': statistics.median(timings) * 1000,
+            'p95_ms': sorted(timings)[int(len(timings) * 0.95) - 1 if len(timings) > 1 else 0] * 1000,
+            'throughput_per_s': len(timings) / sum(timings) if sum(timings) > 0 else 0.0
+        }
+        if score:
+            result['accuracy'] = correct / len(items)
+        self.results[name] = result
+        print(f"   {name:<24} median {result['median_ms']:9.3f} ms   p95 {result['p95_ms']:9.3f} ms"
+              + (f"   accuracy {result['accuracy']:.1%}" if score else ''))
+
+    def run(self) -> Dict[str, Dict[str, float]]:
+        """Run every stage benchmark whose dependencies are installed"""
+        documents = self.manifest['documents']
+        print("\n⏱️ Running stage benchmarks")
+
+        try:
+            from order_processing.text_extractor import TextExtractor
+            extractor = TextExtractor(self.config)
+            for file_type in ('.txt', '.pdf', '.png'):
+                typed = [doc for doc in documents if doc['file_type'] == file_type]
+                try:
+                    self._measure(f"extraction{file_type.replace('.', '_')}", typed,
+                                  lambda doc: extractor.extract_from_file(doc['file']))
+                except OSError as e:
+                    # e.g. the tesseract binary is missing even though pytesseract imports
+                    print(f"   ⚠️ Skipping {file_type} extraction benchmark: {str(e)}")
+        except ImportError as e:
+            print(f"   ⚠️ Skipping extraction benchmarks: {str(e)}")
+
+        from order_processing.data_parser import DataParser
+        parser = DataParser(self.config)
+        parsed = {}
+
+        def parse(doc):
+            parsed[doc['file']] = parser.parse_text(doc['text'])
+            return parsed[doc['file']]
+
+        self._measure('parsing', documents, parse,
+                      lambda doc, order: order.quantity == doc['expected_quantity'])
+
+        from order_processing.sku_maper import SKUMapper
+        mapper = SKUMapper(self.config)
+        self._measure(
+            'sku_mapping', documents,
+            lambda doc: mapper.map_item_to_sku(parsed[doc['file']].item_description,
+                                               parsed[doc['file']].customer_name),
+            lambda doc, result: result[0] == doc['expected_sku']
+        )
+
+        from order_processing.order_batch import OrderRecord, OrderBatch
+        records = [OrderRecord.from_parsed(order, None) for order in parsed.values()]
+        self._measure('order_batch_pickle', [OrderBatch(records)],
+                      lambda batch: pickle.loads(pickle.dumps(batch, pickle.HIGHEST_PROTOCOL)))
+
+        from customer_unblock.aging_report_generator import AgingReportGenerator
+        customers = [(customer['id'], customer['name']) for customer in self.manifest.get('customers', [])[:20]]
+
+        # Every repeat after the first would be a report cache hit, so generation is timed with
+        # the cache off and lookups are timed separately against a warmed cache
+        self.config.set('aging.cache_enabled', False)
+        generator = AgingReportGenerator(self.config)
+        self._measure('aging_report', customers,
+                      lambda customer: generator.generate_aging_report(*customer))
+
+        self.config.set('aging.cache_enabled', True)
+        cached_generator = AgingReportGenerator(self.config)
+        with redirect_stdout(io.StringIO()):
+            for customer in customers:
+                cached_generator.generate_aging_report(*customer)
+        self._measure('aging_report_cached', customers,
+                      lambda customer: cached_generator.generate_aging_report(*customer))
+
+        return self.results
+
+
+def compare_to_baseline(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+                        tolerance: float, accuracy_tolerance: float) -> List[str]:
+    """List benchmarks that are slower or less accurate than the baseline allows"""
+    regressions = []
+    for name, baseline_result in baseline.get('benchmarks', {}).items():
+        result = results.get(name)
+        if result is None:
+            regressions.append(f"{name}: in the baseline but did not run")
+            continue
+
+        # Accuracy-only baselines carry no timings, since those depend on the machine
+        allowed = baseline_result.get('median_ms', float('inf')) * (1 + tolerance)
+        if result['median_ms'] > allowed:
+            regressions.append(f"{name}: median {result['median_ms']:.3f} ms > "
+                               f"{allowed:.3f} ms (baseline {baseline_result['median_ms']:.3f} ms)")
+
+        if 'accuracy' in baseline_result and 'accuracy' in result:
+            if result['accuracy'] < baseline_result['accuracy'] - accuracy_tolerance:
+                regressions.append(f"{name}: accuracy {result['accuracy']:.1%} < "
+                                   f"baseline {baseline_result['accuracy']:.1%}")
+    return regressions
+
+
+def main():
+    """Generate a corpus, run the suite and check it against the stored baseline"""
+    parser = argparse.ArgumentParser(description="Stage micro-benchmarks for the RPA pipelines")
+    parser.add_argument('--catalog-rows', type=int, default=1000)
+    parser.add_argument('--text', type=int, default=200)
+    parser.add_argument('--pdf', type=int, default=20)
+    parser.add_argument('--images', type=int, default=5)
+    parser.add_argument('--noise', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--work-folder', help="Keep the corpus here instead of a temp folder")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative slowdown of the median before failing")
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.02)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('--accuracy-only', action='store_true',
+                        help="With --update-baseline, store only accuracy, which is machine independent")
+    parser.add_argument('--allow-missing-baseline', action='store_true',
+                        help="Pass instead of failing when there is no baseline to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory(prefix='rpa_bench_') as temp_folder:
+        work_folder = args.work_folder or temp_folder
+        generator = CorpusGenerator(seed=args.seed, noise_level=args.noise)
+        manifest = generator.generate_corpus(
+            os.path.join(work_folder, 'corpus'), args.catalog_rows, args.text, args.pdf, args.images
+        )
+
+        results = BenchmarkSuite(work_folder, manifest, args.repeat).run()
+
+    corpus = {key: getattr(args, key) for key in ('catalog_rows', 'text', 'pdf', 'images', 'noise', 'seed')}
+
+    if args.update_baseline:
+        if args.accuracy_only:
+            results = {name: {'accuracy': result['accuracy']}
+                       for name, result in results.items() if 'accuracy' in result}
+        with open(args.baseline, 'w') as f:
+            json.dump({'corpus': corpus, 'benchmarks': results}, f, indent=4)
+        print(f"\n💾 Baseline updated: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\n{'⚠️' if args.allow_missing_baseline else '❌'} No baseline at {args.baseline}; "
+              f"run with --update-baseline to create one")
+        return 0 if args.allow_missing_baseline else 1
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+
+    if baseline.get('corpus') != corpus:
+        print("\n⚠️ Corpus parameters differ from the baseline; comparison may not be meaningful")
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance, args.accuracy_tolerance)
+    if regressions:
+        print("\n❌ Benchmark regressions:")
+        for regression in regressions:
+            print(f"   {regression}")
+        return 1
+
+    print("\n✅ No benchmark regressions against baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
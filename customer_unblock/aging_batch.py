@@ -0,0 +1,217 @@
+import os
+import csv
+import time
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .aging_engine import AgingEngine
+from .aging_report_generator import AgingReportGenerator, safe_sheet_name
+from .report_cache import ReportCache
+from utils.metrics import get_metrics
+from utils.logger import setup_worker_logging, start_worker_log_listener
+
+# Report writer for the current worker process, created once by the pool initializer
+_worker_generator: Optional[AgingReportGenerator] = None
+
+
+def _init_worker(config_manager, log_queue, log_level):
+    """Route logging to the parent and create one report writer per worker process"""
+    global _worker_generator
+    setup_worker_logging(log_queue, log_level)
+    _worker_generator = AgingReportGenerator(config_manager)
+
+
+def _write_customer_reports(tasks: List[tuple], report_format: str) -> List[tuple]:
+    """Write a chunk of customer reports and time each one"""
+    engine = _worker_generator.aging_engine
+    results = []
+    for customer_id, aged, report_path in tasks:
+        started = time.perf_counter()
+        sheets = {'Aging Report': engine.to_report(aged), 'Summary': engine.summary(aged)}
+        report_path = _worker_generator._write_report(sheets, report_path, report_format)
+        results.append((customer_id, report_path, len(aged), time.perf_counter() - started))
+    return results
+
+
+@dataclass
+class CustomerReportTiming:
+    """Outcome of one customer's report in a batch"""
+    customer_id: str
+    report_path: str
+    invoices: int
+    seconds: float
+    cached: bool = False
+
+
+@dataclass
+class AgingBatchResult:
+    """Outcome of a batch aging run"""
+    output_folder: str
+    reports: List[CustomerReportTiming] = field(default_factory=list)
+    workbook_path: Optional[str] = None
+    timings_path: Optional[str] = None
+    elapsed_seconds: float = 0.0
+
+
+class AgingBatchGenerator:
+    """Generates aging reports for many customers across a process pool"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        self.reports_folder = self.config.get('paths.reports_folder', 'reports')
+        self.report_format = self.config.get('aging.report_format', 'xlsx')
+        self.workers = self.config.get('aging.batch_workers', 0) or os.cpu_count() or 1
+        self.chunk_size = self.config.get('aging.batch_chunk_size', 50)
+
+        self.aging_engine = AgingEngine(config_manager)
+        self.report_cache = ReportCache(config_manager)
+        self.report_latency = get_metrics().histogram(
+            'rpa_aging_report_seconds', 'Per-customer aging report generation time', ['mode']
+        )
+
+    def generate_batch(self, customer_ids: List[str] = None, report_format: str = None,
+                       single_workbook: bool = False) -> AgingBatchResult:
+        """Generate reports for the given customers, or every customer in the ledger"""
+        try:
+            started = time.perf_counter()
+            if not self.aging_engine.has_ledger():
+                raise FileNotFoundError(f"Invoice ledger not found: {self.aging_engine.ledger_file}")
+
+            report_format = (report_format or self.report_format).lower()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            result = AgingBatchResult(output_folder=os.path.join(self.reports_folder, f"aging_batch_{timestamp}"))
+            os.makedirs(result.output_folder, exist_ok=True)
+
+            # Load, age and split the ledger once; workers only format and write
+            ledger = self.aging_engine.load_ledger()
+            groups = self.aging_engine.customer_groups()
+            selected = [str(c) for c in customer_ids] if customer_ids else list(groups)
+            unknown = [customer_id for customer_id in selected if customer_id not in groups]
+            if unknown:
+                self.logger.warning("No open invoices for %s requested customers", len(unknown))
+            selected = [customer_id for customer_id in selected if customer_id in groups]
+
+            aged = self.aging_engine.age(ledger)
+            print(f"📊 Generating aging reports for {len(selected)} customers "
+                  f"({len(ledger)} invoices, {self.workers} workers)")
+
+            if single_workbook and report_format != 'xlsx':
+                self.logger.warning("Single workbook needs xlsx, writing %s files per customer", report_format)
+
+            if single_workbook and report_format == 'xlsx' and selected:
+                self._write_workbook(aged, groups, selected, result)
+            else:
+                self._write_customer_files(ledger, aged, groups, selected, report_format, result)
+
+            result.elapsed_seconds = time.perf_counter() - started
+            result.timings_path = self._write_timings(result)
+
+            self.logger.info("Aging batch completed: %s reports in %.1fs (%s)",
+                             len(result.reports), result.elapsed_seconds, result.output_folder)
+            print(f"   ✅ {len(result.reports)} reports in {result.elapsed_seconds:.1f}s: {result.output_folder}")
+            return result
+
+        except Exception as e:
+            self.logger.error("Error generating aging batch: %s", e)
+            raise
+
+    def _write_customer_files(self, ledger: pd.DataFrame, aged: pd.DataFrame, groups: Dict,
+                              selected: List[str], report_format: str, result: AgingBatchResult):
+        """Write one report per customer in parallel, reusing cached reports"""
+        # One hashing pass over the full ledger gives every customer's fingerprint
+        row_hashes = self.aging_engine.row_hashes(ledger)
+        fingerprints = {}
+        tasks = []
+
+        for customer_id in selected:
+            rows = groups[customer_id]
+            fingerprint = self.aging_engine.fingerprint_rows(row_hashes[rows])
+            cached_path = self.report_cache.lookup(customer_id, report_format, fingerprint)
+            if cached_path:
+                result.reports.append(CustomerReportTiming(customer_id, cached_path, len(rows), 0.0, cached=True))
+                continue
+
+            fingerprints[customer_id] = fingerprint
+            report_path = os.path.join(result.output_folder, f"AgingReport_{customer_id}.{report_format}")
+            tasks.append((customer_id, aged.iloc[rows], report_path))
+
+        if result.reports:
+            print(f"   ♻️ {len(result.reports)} customers unchanged, reusing cached reports")
+
+        chunks = [tasks[i:i + self.chunk_size] for i in range(0, len(tasks), self.chunk_size)]
+        log_queue, log_listener = start_worker_log_listener()
+        try:
+            self._run_pool(chunks, report_format, fingerprints, result, log_queue, len(tasks))
+        finally:
+            log_listener.stop()
+        self.report_cache.flush()
+
+    def _run_pool(self, chunks: List[List[tuple]], report_format: str, fingerprints: Dict[str, str],
+                  result: AgingBatchResult, log_queue, total: int):
+        """Write report chunks on the process pool and record each customer's result"""
+        done = 0
+        initargs = (self.config, log_queue, logging.getLogger().getEffectiveLevel())
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=initargs) as executor:
+            futures = [executor.submit(_write_customer_reports, chunk, report_format) for chunk in chunks]
+            for future in as_completed(futures):
+                for customer_id, report_path, invoices, seconds in future.result():
+                    self.report_cache.store(customer_id, report_format, fingerprints[customer_id],
+                                            report_path, flush=False)
+                    self.report_latency.labels(mode='file').observe(seconds)
+                    result.reports.append(CustomerReportTiming(customer_id, report_path, invoices, seconds))
+                    done += 1
+                print(f"   ⏳ {done}/{total} reports written")
+
+    def _write_workbook(self, aged: pd.DataFrame, groups: Dict, selected: List[str],
+                        result: AgingBatchResult):
+        """Write all customers as sheets of one workbook behind a bucket totals sheet"""
+        engine = self.aging_engine
+        totals = engine.bucket_totals(aged.iloc[np.concatenate([groups[c] for c in selected])])
+
+        # Excel compares sheet names case-insensitively after they are cleaned and truncated
+        sheets = {'Bucket Totals': totals}
+        taken = {name.lower() for name in sheets}
+        timings = []
+        for customer_id in selected:
+            started = time.perf_counter()
+            sheet_name = safe_sheet_name(customer_id)
+            suffix = 1
+            while sheet_name.lower() in taken:
+                suffix += 1
+                sheet_name = f"{safe_sheet_name(customer_id)[:27]}~{suffix}"
+            taken.add(sheet_name.lower())
+            customer_aged = aged.iloc[groups[customer_id]]
+            sheets[sheet_name] = engine.to_report(customer_aged)
+            timings.append((customer_id, len(customer_aged), time.perf_counter() - started))
+
+        # A single xlsx file cannot be written concurrently; it is streamed in constant memory
+        result.workbook_path = os.path.join(result.output_folder, 'AgingReports.xlsx')
+        writer = AgingReportGenerator(self.config)
+        write_started = time.perf_counter()
+        writer._write_report(sheets, result.workbook_path, 'xlsx')
+        write_share = (time.perf_counter() - write_started) / max(len(selected), 1)
+
+        for customer_id, invoices, seconds in timings:
+            self.report_latency.labels(mode='workbook').observe(seconds + write_share)
+            result.reports.append(CustomerReportTiming(customer_id, result.workbook_path, invoices,
+                                                       seconds + write_share))
+
+    def _write_timings(self, result: AgingBatchResult) -> str:
+        """Write per-customer timings next to the reports"""
+        timings_path = os.path.join(result.output_folder, 'timings.csv')
+        with open(timings_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['customer_id', 'invoices', 'seconds', 'cached', 'report_path'])
+            for timing in sorted(result.reports, key=lambda t: t.seconds, reverse=True):
+                writer.writerow([timing.customer_id, timing.invoices, f"{timing.seconds:.4f}",
+                                 timing.cached, timing.report_path])
+        return timings_path
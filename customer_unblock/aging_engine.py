@@ -0,0 +1,177 @@
+import os
+import hashlib
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Aging buckets by days past due; right edges are inclusive
+BUCKET_EDGES = [-np.inf, 0, 30, 60, 90, np.inf]
+BUCKET_LABELS = ['Current', '1-30 Days', '31-60 Days', '61-90 Days', '90+ Days']
+
+# Ledger columns and the report column each one maps to
+REPORT_COLUMNS = {
+    'InvoiceNo': 'Invoice_No',
+    'InvoiceDate': 'Invoice_Date',
+    'DueDate': 'Due_Date',
+    'Amount': 'Amount',
+    'Days_Overdue': 'Days_Overdue',
+    'Aging_Bucket': 'Aging_Bucket',
+    'Comments': 'Comments'
+}
+
+REQUIRED_COLUMNS = ['CustomerID', 'InvoiceNo', 'DueDate', 'Amount']
+LEDGER_COLUMNS = ['CustomerID', 'CustomerName', 'InvoiceNo', 'InvoiceDate', 'DueDate', 'Amount', 'Comments']
+
+
+class AgingEngine:
+    """Ages an open-invoice ledger with vectorized date arithmetic and one groupby"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+        self.ledger_file = self.config.get('paths.invoice_ledger_file', 'data/ledger/open_invoices.csv')
+
+        self._ledger: Optional[pd.DataFrame] = None
+        self._ledger_mtime: Optional[float] = None
+        self._customer_rows: Dict[str, np.ndarray] = {}
+
+    def has_ledger(self) -> bool:
+        """Check whether the configured ledger file exists"""
+        return os.path.exists(self.ledger_file)
+
+    def load_ledger(self) -> pd.DataFrame:
+        """Load the ledger with typed columns, reloading only when the file changes"""
+        mtime = os.path.getmtime(self.ledger_file)
+        if self._ledger is not None and self._ledger_mtime == mtime:
+            return self._ledger
+
+        extension = os.path.splitext(self.ledger_file)[1].lower()
+        if extension == '.parquet':
+            ledger = pd.read_parquet(self.ledger_file)
+        elif extension in ('.xlsx', '.xls'):
+            ledger = pd.read_excel(self.ledger_file)
+        else:
+            ledger = pd.read_csv(self.ledger_file, dtype={'CustomerID': str, 'InvoiceNo': str})
+
+        self._ledger = self.normalize(ledger)
+        self._ledger_mtime = mtime
+
+        # Row positions per customer, so single-customer lookups skip a full-ledger scan
+        self._customer_rows = self._ledger.groupby('CustomerID', sort=False).indices
+        self.logger.info("Loaded invoice ledger with %s open invoices", len(self._ledger))
+        return self._ledger
+
+    def normalize(self, ledger: pd.DataFrame) -> pd.DataFrame:
+        """Coerce ledger columns to numeric and datetime dtypes"""
+        missing = [column for column in REQUIRED_COLUMNS if column not in ledger.columns]
+        if missing:
+            raise ValueError(f"Invoice ledger is missing columns: {', '.join(missing)}")
+
+        ledger = ledger.copy()
+        ledger['CustomerID'] = ledger['CustomerID'].astype(str)
+
+        # Amounts exported as text such as '$15,000' are cleaned in one vectorized pass
+        if not pd.api.types.is_numeric_dtype(ledger['Amount']):
+            ledger['Amount'] = pd.to_numeric(
+                ledger['Amount'].astype(str).str.replace(r'[$,\s]', '', regex=True), errors='coerce'
+            )
+        ledger['Amount'] = ledger['Amount'].astype('float64')
+
+        for column in ('InvoiceDate', 'DueDate'):
+            if column in ledger.columns:
+                ledger[column] = pd.to_datetime(ledger[column], errors='coerce')
+
+        if 'Comments' not in ledger.columns:
+            ledger['Comments'] = ''
+        if 'CustomerName' not in ledger.columns:
+            ledger['CustomerName'] = ledger['CustomerID']
+
+        return ledger
+
+    def age(self, ledger: pd.DataFrame, as_of: datetime = None) -> pd.DataFrame:
+        """Add Days_Overdue and Aging_Bucket columns"""
+        as_of = pd.Timestamp(as_of or datetime.now()).normalize()
+
+        aged = ledger.copy()
+        days = (as_of - aged['DueDate']).dt.days
+        aged['Days_Overdue'] = days.clip(lower=0).fillna(0).astype('int64')
+        aged['Aging_Bucket'] = pd.cut(days.fillna(0), bins=BUCKET_EDGES, labels=BUCKET_LABELS)
+        return aged
+
+    def bucket_totals(self, aged: pd.DataFrame) -> pd.DataFrame:
+        """Total open amount per customer and bucket in a single groupby"""
+        totals = (
+            aged.groupby(['CustomerID', 'Aging_Bucket'], observed=False, sort=True)['Amount']
+            .sum()
+            .unstack('Aging_Bucket', fill_value=0.0)
+            .reindex(columns=BUCKET_LABELS, fill_value=0.0)
+        )
+        totals['Total'] = totals.sum(axis=1)
+        totals.columns.name = None
+        return totals.reset_index()
+
+    def age_all(self, as_of: datetime = None) -> Dict[str, pd.DataFrame]:
+        """Age the full ledger and total it per customer and bucket"""
+        aged = self.age(self.load_ledger(), as_of)
+        return {'detail': aged, 'totals': self.bucket_totals(aged)}
+
+    def customer_groups(self) -> Dict[str, np.ndarray]:
+        """Ledger row positions per customer, computed once per ledger load"""
+        self.load_ledger()
+        return self._customer_rows
+
+    def customer_slice(self, customer_id: str) -> pd.DataFrame:
+        """Un-aged ledger rows for one customer"""
+        ledger = self.load_ledger()
+        rows = self._customer_rows.get(str(customer_id))
+        if rows is None:
+            self.logger.warning("Customer %s has no open invoices in ledger %s", customer_id, self.ledger_file)
+            rows = np.empty(0, dtype=np.intp)
+        return ledger.iloc[rows]
+
+    def customer_invoices(self, customer_id: str, as_of: datetime = None) -> pd.DataFrame:
+        """Aged open invoices for one customer"""
+        return self.age(self.customer_slice(customer_id), as_of)
+
+    def row_hashes(self, invoices: pd.DataFrame) -> np.ndarray:
+        """Per-row content hashes; each row hashes independently of the others"""
+        columns = [column for column in LEDGER_COLUMNS if column in invoices.columns]
+        return pd.util.hash_pandas_object(invoices[columns], index=False).values
+
+    def fingerprint(self, invoices: pd.DataFrame, as_of: datetime = None) -> str:
+        """Hash a ledger slice plus the as-of date, which determines days overdue"""
+        return self.fingerprint_rows(self.row_hashes(invoices), as_of)
+
+    def fingerprint_rows(self, row_hashes: np.ndarray, as_of: datetime = None) -> str:
+        """Fingerprint precomputed row hashes, e.g. one customer's rows of a full-ledger hash"""
+        as_of = pd.Timestamp(as_of or datetime.now()).normalize()
+        digest = hashlib.sha256(np.ascontiguousarray(row_hashes).tobytes())
+        digest.update(as_of.strftime('%Y-%m-%d').encode('utf-8'))
+        return digest.hexdigest()
+
+    def to_report(self, aged: pd.DataFrame) -> pd.DataFrame:
+        """Select and rename aged ledger columns for the report sheet"""
+        columns = [column for column in REPORT_COLUMNS if column in aged.columns]
+        report = aged[columns].rename(columns=REPORT_COLUMNS)
+        report['Aging_Bucket'] = report['Aging_Bucket'].astype(str)
+        return report.sort_values('Days_Overdue', ascending=False, kind='stable')
+
+    def summary(self, aged: pd.DataFrame) -> pd.DataFrame:
+        """Per-bucket invoice counts and totals for one customer's report"""
+        summary = (
+            aged.groupby('Aging_Bucket', observed=False)['Amount']
+            .agg(Invoices='count', Amount='sum')
+            .reindex(BUCKET_LABELS, fill_value=0)
+            .rename_axis('Aging_Bucket')
+            .reset_index()
+        )
+        total = pd.DataFrame([{
+            'Aging_Bucket': 'Total',
+            'Invoices': int(summary['Invoices'].sum()),
+            'Amount': float(summary['Amount'].sum())
+        }])
+        summary['Aging_Bucket'] = summary['Aging_Bucket'].astype(str)
+        return pd.concat([summary, total], ignore_index=True)
@@ -1,9 +1,20 @@
 import pandas as pd
+import xlsxwriter
 import os
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any
 
+from .aging_engine import AgingEngine
+from .report_cache import ReportCache
+from utils.tracing import traced
+
+
+def safe_sheet_name(name: str) -> str:
+    """Excel sheet name: at most 31 characters and none of []:*?/\\"""
+    return ''.join('_' if c in '[]:*?/\\' else c for c in str(name))[:31]
+
+
 class AgingReportGenerator:
     """Generates customer aging reports"""
     
@@ -11,97 +22,187 @@ class AgingReportGenerator:
         self.config = config_manager
         self.logger = logging.getLogger(__name__)
         self.reports_folder = self.config.get('paths.reports_folder', 'reports')
+        self.report_format = self.config.get('aging.report_format', 'xlsx')
+        self.aging_engine = AgingEngine(config_manager)
+        self.report_cache = ReportCache(config_manager)
     
-    def generate_aging_report(self, customer_id: str, customer_name: str) -> str:
+    @traced()
+    def generate_aging_report(self, customer_id: str, customer_name: str,
+                              report_format: str = None) -> str:
         """Generate aging report for customer"""
         try:
-            self.logger.info(f"Generating aging report for customer: {customer_name}")
+            self.logger.info("Generating aging report for customer: %s", customer_name)
             print(f"📊 Generating aging report for: {customer_name}")
             
-            # Create sample aging data (in real system, this would query the database)
-            aging_data = self._create_sample_aging_data(customer_id, customer_name)
+            # Customer's open invoices from the ledger, or sample data without one
+            engine = self.aging_engine
+            if engine.has_ledger():
+                invoices = engine.customer_slice(customer_id)
+                if invoices.empty:
+                    print(f"   ⚠️ No open invoices in the ledger for {customer_id}, report has no open items")
+            else:
+                invoices = engine.normalize(pd.DataFrame(self._create_sample_aging_data(customer_id, customer_name)))
             
-            # Create DataFrame
-            df = pd.DataFrame(aging_data)
+            # Reuse the last report when the customer's invoices and the as-of date are unchanged
+            report_format = (report_format or self.report_format).lower()
+            fingerprint = engine.fingerprint(invoices)
+            cached_path = self.report_cache.lookup(customer_id, report_format, fingerprint)
+            if cached_path:
+                self.logger.info("Reusing cached aging report: %s", cached_path)
+                print(f"   ♻️ Invoices unchanged, reusing report: {os.path.basename(cached_path)}")
+                return cached_path
+            
+            aged = engine.age(invoices)
+            sheets = {'Aging Report': engine.to_report(aged), 'Summary': engine.summary(aged)}
             
             # Generate report file
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            report_filename = f"AgingReport_{customer_id}_{timestamp}.xlsx"
+            report_filename = f"AgingReport_{customer_id}_{timestamp}.{report_format}"
             report_path = os.path.join(self.reports_folder, report_filename)
             
             # Ensure reports directory exists
             os.makedirs(self.reports_folder, exist_ok=True)
             
-            # Write to Excel with formatting
-            with pd.ExcelWriter(report_path, engine='openpyxl') as writer:
-                df.to_excel(writer, sheet_name='Aging Report', index=False)
-                
-                # Get workbook and worksheet
-                workbook = writer.book
-                worksheet = writer.sheets['Aging Report']
-                
-                # Add header formatting
-                from openpyxl.styles import Font, PatternFill
-                header_font = Font(bold=True)
-                header_fill = PatternFill(start_color='CCCCCC', end_color='CCCCCC', fill_type='solid')
-                
-                for cell in worksheet[1]:
-                    cell.font = header_font
-                    cell.fill = header_fill
-                
-                # Auto-adjust column widths
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = column[0].column_letter
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = min(max_length + 2, 50)
-                    worksheet.column_dimensions[column_letter].width = adjusted_width
+            report_path = self._write_report(sheets, report_path, report_format)
+            self.report_cache.store(customer_id, report_format, fingerprint, report_path)
             
-            self.logger.info(f"Aging report generated: {report_path}")
-            print(f"   ✅ Report saved: {report_filename}")
+            self.logger.info("Aging report generated: %s", report_path)
+            print(f"   ✅ Report saved: {os.path.basename(report_path)}")
             
             return report_path
             
         except Exception as e:
-            self.logger.error(f"Error generating aging report: {str(e)}")
+            self.logger.error("Error generating aging report: %s", e)
             raise
     
+    def generate_ledger_summary(self, report_format: str = None) -> str:
+        """Generate per-bucket totals for all customers in the ledger"""
+        try:
+            self.logger.info("Generating aging summary for all customers")
+            print("📊 Generating aging summary for all customers")
+            
+            aged = self.aging_engine.age_all()
+            totals = aged['totals']
+            names = aged['detail'].drop_duplicates('CustomerID')[['CustomerID', 'CustomerName']]
+            totals = names.merge(totals, on='CustomerID', how='right')
+            
+            report_format = (report_format or self.report_format).lower()
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            report_path = os.path.join(self.reports_folder, f"AgingSummary_{timestamp}.{report_format}")
+            os.makedirs(self.reports_folder, exist_ok=True)
+            
+            report_path = self._write_report({'Bucket Totals': totals}, report_path, report_format)
+            
+            self.logger.info("Aging summary generated for %s customers: %s", len(totals), report_path)
+            print(f"   ✅ Summary saved: {os.path.basename(report_path)}")
+            return report_path
+            
+        except Exception as e:
+            self.logger.error("Error generating aging summary: %s", e)
+            raise
+    
+    def _write_report(self, sheets: Dict[str, pd.DataFrame], report_path: str, report_format: str) -> str:
+        """Write report sheets in the requested format and return the final path"""
+        if report_format == 'xlsx':
+            self._write_xlsx(sheets, report_path)
+            return report_path
+        
+        # Machine-readable fast paths carry only the detail sheet
+        df = next(iter(sheets.values()))
+        if report_format == 'parquet':
+            try:
+                df.to_parquet(report_path, index=False)
+                return report_path
+            except ImportError as e:
+                self.logger.warning("Parquet engine unavailable (%s), writing CSV instead", e)
+                report_path = os.path.splitext(report_path)[0] + '.csv'
+        elif report_format != 'csv':
+            raise ValueError(f"Unsupported aging report format: {report_format}")
+        
+        df.to_csv(report_path, index=False)
+        return report_path
+    
+    def _write_xlsx(self, sheets: Dict[str, pd.DataFrame], report_path: str):
+        """Stream sheets row by row through xlsxwriter's constant-memory mode"""
+        workbook = xlsxwriter.Workbook(report_path, {'constant_memory': True})
+        try:
+            formats = {
+                'header': workbook.add_format({'bold': True, 'bg_color': '#CCCCCC'}),
+                'date': workbook.add_format({'num_format': 'yyyy-mm-dd'}),
+                'amount': workbook.add_format({'num_format': '#,##0.00'})
+            }
+            for sheet_name, df in sheets.items():
+                self._write_sheet(workbook, sheet_name, df, formats)
+        finally:
+            workbook.close()
+    
+    def _write_sheet(self, workbook, sheet_name: str, df: pd.DataFrame, formats: Dict[str, Any]):
+        """Write one DataFrame as a formatted worksheet"""
+        worksheet = workbook.add_worksheet(safe_sheet_name(sheet_name))
+        
+        # Column formats and widths must be set before rows are flushed in constant-memory mode
+        for col_idx, (column, width) in enumerate(self._column_widths(df).items()):
+            dtype = df[column].dtype
+            if pd.api.types.is_datetime64_any_dtype(dtype):
+                column_format = formats['date']
+            elif pd.api.types.is_float_dtype(dtype):
+                column_format = formats['amount']
+            else:
+                column_format = None
+            worksheet.set_column(col_idx, col_idx, width, column_format)
+        
+        worksheet.write_row(0, 0, [str(column) for column in df.columns], formats['header'])
+        
+        # Missing values become blank cells; NaN/NaT cannot be written as numbers or dates
+        values = df.astype(object).where(df.notna(), None)
+        for row_idx, row in enumerate(values.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_idx, 0, row)
+    
+    def _column_widths(self, df: pd.DataFrame) -> Dict[str, int]:
+        """Compute auto-fit widths from the data in one vectorized pass per column"""
+        widths = {}
+        for column in df.columns:
+            series = df[column]
+            if pd.api.types.is_datetime64_any_dtype(series.dtype):
+                data_width = 10
+            elif series.empty:
+                data_width = 0
+            else:
+                data_width = int(series.astype(str).str.len().fillna(0).max())
+            widths[column] = min(max(data_width, len(str(column))) + 2, 50)
+        return widths
+    
     def _create_sample_aging_data(self, customer_id: str, customer_name: str) -> list:
-        """Create sample aging data for demonstration"""
-        # Sample invoice data
-        base_date = datetime.now()
+        """Create sample ledger rows for demonstration when no ledger file exists"""
+        # Sample invoice data, anchored to today so the cache fingerprint is stable within a day
+        base_date = datetime.combine(datetime.now().date(), datetime.min.time())
         
         aging_data = [
             {
-                'Invoice_No': 'INV-2024001',
-                'Invoice_Date': (base_date - timedelta(days=60)).strftime('%Y-%m-%d'),
-                'Due_Date': (base_date - timedelta(days=30)).strftime('%Y-%m-%d'),
-                'Amount': '$15,000',
-                'Days_Overdue': '30',
-                'Aging_Bucket': '31-60 Days',
+                'CustomerID': customer_id,
+                'CustomerName': customer_name,
+                'InvoiceNo': 'INV-2024001',
+                'InvoiceDate': base_date - timedelta(days=60),
+                'DueDate': base_date - timedelta(days=30),
+                'Amount': 15000.0,
                 'Comments': 'Customer promised payment by month end'
             },
             {
-                'Invoice_No': 'INV-2024002',
-                'Invoice_Date': (base_date - timedelta(days=45)).strftime('%Y-%m-%d'),
-                'Due_Date': (base_date - timedelta(days=15)).strftime('%Y-%m-%d'),
-                'Amount': '$8,500',
-                'Days_Overdue': '15',
-                'Aging_Bucket': '1-30 Days',
+                'CustomerID': customer_id,
+                'CustomerName': customer_name,
+                'InvoiceNo': 'INV-2024002',
+                'InvoiceDate': base_date - timedelta(days=45),
+                'DueDate': base_date - timedelta(days=15),
+                'Amount': 8500.0,
                 'Comments': 'Pending approval from customer finance team'
             },
             {
-                'Invoice_No': 'INV-2024003',
-                'Invoice_Date': (base_date - timedelta(days=90)).strftime('%Y-%m-%d'),
-                'Due_Date': (base_date - timedelta(days=60)).strftime('%Y-%m-%d'),
-                'Amount': '$12,200',
-                'Days_Overdue': '60',
-                'Aging_Bucket': '61-90 Days',
+                'CustomerID': customer_id,
+                'CustomerName': customer_name,
+                'InvoiceNo': 'INV-2024003',
+                'InvoiceDate': base_date - timedelta(days=90),
+                'DueDate': base_date - timedelta(days=60),
+                'Amount': 12200.0,
                 'Comments': 'Customer in communication for payment plan'
             }
         ]
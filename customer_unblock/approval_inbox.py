@@ -0,0 +1,199 @@
+import os
+import re
+import time
+import email
+import imaplib
+import logging
+import threading
+from dataclasses import dataclass
+from email import policy
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+# A decision must start its line, so quoted instructions ("• Reply 'APPROVED - ...'")
+# and quoted history ("> APPROVED - ...") never match
+DECISION_PATTERN = re.compile(r'^\s*(APPROVED|REJECTED)\s*[-–:]\s*(REQ-\d+)\b', re.IGNORECASE | re.MULTILINE)
+
+
+@dataclass
+class PendingApproval:
+    """An approval request waiting for a management reply"""
+    request_id: str
+    customer_id: str
+    customer_name: str
+    sent_at: float
+    on_decision: Callable[[str, str], None]
+
+
+class ApprovalInbox:
+    """Matches management replies from a maildir or IMAP folder against all pending requests"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        self.source = self.config.get('approval.source', 'console')
+        self.maildir = self.config.get('approval.maildir', 'data/approvals')
+        self.poll_interval = self.config.get('approval.poll_interval_seconds', 10)
+        self.timeout_seconds = self.config.get('approval.timeout_hours', 48) * 3600
+
+        self._pending: Dict[str, PendingApproval] = {}
+        self._lock = threading.Lock()
+        # Replies left unread because their request is not registered yet, logged once each
+        self._deferred: Set[str] = set()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether replies come from a mailbox rather than the console"""
+        return self.source in ('maildir', 'imap')
+
+    def pending_count(self) -> int:
+        """Number of requests still waiting for a reply"""
+        return len(self._pending)
+
+    def register(self, request_id: str, customer_id: str, customer_name: str,
+                 on_decision: Callable[[str, str], None], sent_at: float = None):
+        """Add a request to the outstanding index; on_decision(request_id, status) runs on reply"""
+        with self._lock:
+            self._pending[request_id] = PendingApproval(
+                request_id, customer_id, customer_name, sent_at or time.time(), on_decision
+            )
+
+    def poll_once(self) -> int:
+        """Read new replies once, dispatch every matched decision and expire overdue requests"""
+        dispatched = 0
+        for message_id, sender, text, received_at, consume in self._fetch_messages():
+            # A reply is consumed only once every decision in it reached a registered request;
+            # otherwise it stays unread for when the request registers (e.g. resumed after restart)
+            unmatched = []
+            for status, request_id in self.parse_decisions(text):
+                if self._dispatch(request_id, status, sender):
+                    dispatched += 1
+                else:
+                    unmatched.append(request_id)
+
+            if not unmatched or time.time() - received_at > self.timeout_seconds:
+                if unmatched:
+                    self.logger.warning("Discarding reply %s for requests never registered: %s",
+                                        message_id, ', '.join(unmatched))
+                consume()
+                self._deferred.discard(message_id)
+            elif message_id not in self._deferred:
+                self._deferred.add(message_id)
+                self.logger.info("Keeping reply %s until %s is registered", message_id, ', '.join(unmatched))
+
+        now = time.time()
+        with self._lock:
+            expired = [p.request_id for p in self._pending.values() if now - p.sent_at > self.timeout_seconds]
+        for request_id in expired:
+            if self._dispatch(request_id, 'TIMEOUT', None):
+                dispatched += 1
+
+        return dispatched
+
+    def wait_for_all(self, max_wait_seconds: float = None):
+        """Poll until every registered request has a decision or timed out"""
+        started = time.time()
+        print(f"\n⏳ Waiting for {self.pending_count()} approval replies in {self.source}...")
+
+        while self._pending:
+            dispatched = self.poll_once()
+            if dispatched:
+                print(f"   📨 {dispatched} decisions received, {self.pending_count()} still pending")
+            if not self._pending:
+                break
+            if max_wait_seconds is not None and time.time() - started >= max_wait_seconds:
+                self.logger.warning("Stopped waiting with %s approvals outstanding", self.pending_count())
+                break
+            time.sleep(self.poll_interval)
+
+    @staticmethod
+    def parse_decisions(text: str) -> List[Tuple[str, str]]:
+        """Extract (status, request_id) pairs from a reply body"""
+        return [(status.upper(), request_id.upper()) for status, request_id in DECISION_PATTERN.findall(text)]
+
+    def _dispatch(self, request_id: str, status: str, sender: Optional[str]) -> bool:
+        """Hand a decision to the waiting workflow; the first decision per request wins"""
+        with self._lock:
+            pending = self._pending.pop(request_id, None)
+
+        if pending is None:
+            self.logger.debug("No pending request %s for %s", request_id, status)
+            return False
+
+        self.logger.info("Approval decision for %s: %s from %s", request_id, status, sender or 'n/a')
+        print(f"✅ Decision received for {pending.customer_name}: {status}")
+        try:
+            pending.on_decision(request_id, status)
+        except Exception as e:
+            self.logger.error("Error dispatching decision for %s: %s", request_id, e)
+        return True
+
+    def _fetch_messages(self) -> Iterator[Tuple[str, str, str, float, Callable[[], None]]]:
+        """Yield (message id, sender, body text, received at, consume) for unread replies"""
+        if self.source == 'imap':
+            yield from self._fetch_imap()
+        elif self.source == 'maildir':
+            yield from self._fetch_maildir()
+
+    def _fetch_maildir(self) -> Iterator[Tuple[str, str, str, float, Callable[[], None]]]:
+        """Read messages delivered to new/; consuming one moves it to cur/"""
+        new_folder = os.path.join(self.maildir, 'new')
+        cur_folder = os.path.join(self.maildir, 'cur')
+        if not os.path.isdir(new_folder):
+            return
+        os.makedirs(cur_folder, exist_ok=True)
+
+        for name in sorted(os.listdir(new_folder)):
+            path = os.path.join(new_folder, name)
+            try:
+                received_at = os.path.getmtime(path)
+                with open(path, 'rb') as f:
+                    message = email.message_from_binary_file(f, policy=policy.default)
+            except OSError as e:
+                self.logger.warning("Could not read approval reply %s: %s", name, e)
+                continue
+
+            def consume(path=path, name=name):
+                os.replace(path, os.path.join(cur_folder, f"{name}:2,S"))
+
+            yield name, message.get('From', ''), self._message_text(message), received_at, consume
+
+    def _fetch_imap(self) -> Iterator[Tuple[str, str, str, float, Callable[[], None]]]:
+        """Fetch unseen messages from the configured IMAP folder without marking them seen"""
+        host = self.config.get('approval.imap_host')
+        if not host:
+            self.logger.warning("approval.source is imap but approval.imap_host is not set")
+            return
+
+        client = imaplib.IMAP4_SSL(host, self.config.get('approval.imap_port', 993))
+        try:
+            client.login(self.config.get('approval.imap_user', ''), self.config.get('approval.imap_password', ''))
+            client.select(self.config.get('approval.imap_folder', 'INBOX'))
+            # Unmatched replies stay unseen; the date window stops them being re-read forever
+            since = (datetime.now() - timedelta(seconds=self.timeout_seconds + 86400)).strftime('%d-%b-%Y')
+            _, data = client.search(None, 'UNSEEN', 'SINCE', since)
+            for number in data[0].split():
+                # BODY.PEEK leaves the message unseen until it is consumed
+                _, parts = client.fetch(number, '(BODY.PEEK[])')
+                message = email.message_from_bytes(parts[0][1], policy=policy.default)
+                received = message.get('Date')
+                received_at = received.datetime.timestamp() if received and received.datetime else time.time()
+
+                def consume(number=number):
+                    client.store(number, '+FLAGS', '\\Seen')
+
+                yield (number.decode(), message.get('From', ''), self._message_text(message),
+                       received_at, consume)
+        finally:
+            try:
+                client.logout()
+            except imaplib.IMAP4.error:
+                pass
+
+    @staticmethod
+    def _message_text(message) -> str:
+        """Subject plus plain-text body of a reply"""
+        body = message.get_body(preferencelist=('plain',))
+        text = body.get_content() if body is not None else ''
+        return f"{message.get('Subject', '')}\n{text}"
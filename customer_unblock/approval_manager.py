@@ -2,6 +2,7 @@ import logging
 from datetime import datetime
 from typing import List
 from utils.email_sender import EmailSender
+from utils.tracing import traced
 
 class ApprovalManager:
     """Manages the approval workflow for customer unblock requests"""
@@ -11,11 +12,12 @@ class ApprovalManager:
         self.logger = logging.getLogger(__name__)
         self.email_sender = EmailSender(config_manager)
     
+    @traced()
     def send_approval_request(self, request_id: str, customer_name: str, 
                             block_reason: str, aging_report_path: str) -> bool:
         """Send approval request email to management"""
         try:
-            self.logger.info(f"Sending approval request for: {customer_name}")
+            self.logger.info("Sending approval request for: %s", customer_name)
             
             # Get management emails from config
             management_emails = self.config.get('email.management_emails', ['manager@company.com'])
@@ -46,20 +48,21 @@ RPA Automation System"""
             
             if success:
                 print(f"   ✅ Approval request sent successfully")
-                self.logger.info(f"Approval request sent for request ID: {request_id}")
+                self.logger.info("Approval request sent for request ID: %s", request_id)
             else:
                 print(f"   ⚠️ Email sending simulated (check configuration)")
             
             return True
             
         except Exception as e:
-            self.logger.error(f"Error sending approval request: {str(e)}")
+            self.logger.error("Error sending approval request: %s", e)
             return False
     
+    @traced()
     def monitor_approval_response(self, request_id: str) -> str:
         """Monitor for approval response - simulated with user input"""
         try:
-            self.logger.info(f"Monitoring approval response for request: {request_id}")
+            self.logger.info("Monitoring approval response for request: %s", request_id)
             
             print(f"\n⏳ Waiting for Management Approval...")
             print("In a real system, this would monitor emails for approval responses.")
@@ -71,11 +74,11 @@ RPA Automation System"""
                 
                 if response in ['APPROVED', 'REJECTED']:
                     print(f"✅ Decision received: {response}")
-                    self.logger.info(f"Approval decision for {request_id}: {response}")
+                    self.logger.info("Approval decision for %s: %s", request_id, response)
                     return response
                 else:
                     print("❌ Invalid response. Please enter 'APPROVED' or 'REJECTED'")
                     
         except Exception as e:
-            self.logger.error(f"Error monitoring approval response: {str(e)}")
+            self.logger.error("Error monitoring approval response: %s", e)
             return "TIMEOUT"
\ No newline at end of file
@@ -1,5 +1,12 @@
+import os
+import csv
+import shutil
+import json
 import logging
-from typing import Optional, Tuple
+from itertools import islice
+from typing import Any, Optional, Tuple, Iterator, Iterable, Dict, List
+
+EXPORT_FORMATS = ('.csv', '.jsonl')
 
 class BlockDetector:
     """Simulates customer block detection in ERP system"""
@@ -7,6 +14,24 @@ class BlockDetector:
     def __init__(self, config_manager):
         self.config = config_manager
         self.logger = logging.getLogger(__name__)
+        
+        # ERP credit-block exports
+        self.export_folder = self.config.get('paths.block_export_folder', 'data/erp_exports')
+        self.watermark_file = self.config.get(
+            'paths.block_watermark_file',
+            os.path.join(self.config.get('paths.logs_folder', 'logs'), 'block_watermark.json')
+        )
+        self.chunk_size = self.config.get('block_detection.chunk_size', 5000)
+        self.move_processed_exports = self.config.get('block_detection.move_processed_exports', True)
+        self.columns = {
+            'customer_id': self.config.get('block_detection.columns.customer_id', 'CustomerID'),
+            'customer_name': self.config.get('block_detection.columns.customer_name', 'CustomerName'),
+            'block_reason': self.config.get('block_detection.columns.block_reason', 'BlockReason'),
+            'blocked_at': self.config.get('block_detection.columns.blocked_at', 'BlockedAt')
+        }
+        
+        # Customers whose handling failed during the current detection run, kept for a retry
+        self._failed: Dict[str, List[str]] = {}
     
     def detect_customer_block(self) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """Detect blocked customer - simulated with user input"""
@@ -36,7 +61,7 @@ class BlockDetector:
                 print(f"   Name: {customer_name}")
                 print(f"   Reason: {block_reason}")
                 
-                self.logger.info(f"Block detected for customer: {customer_name} ({customer_id})")
+                self.logger.info("Block detected for customer: %s (%s)", customer_name, customer_id)
                 
                 return customer_id, customer_name, block_reason
             else:
@@ -44,5 +69,138 @@ class BlockDetector:
                 return None, None, None
                 
         except Exception as e:
-            self.logger.error(f"Error parsing block detection input: {str(e)}")
-            return None, None, None
\ No newline at end of file
+            self.logger.error("Error parsing block detection input: %s", e)
+            return None, None, None
+    
+    def has_pending_exports(self) -> bool:
+        """Check whether any ERP block export files or failed customers are waiting"""
+        return bool(self._list_export_files()) or bool(self._load_watermark()['retry'])
+    
+    def _list_export_files(self) -> List[str]:
+        """List export files oldest first"""
+        if not os.path.isdir(self.export_folder):
+            return []
+        
+        files = [
+            os.path.join(self.export_folder, name) for name in os.listdir(self.export_folder)
+            if os.path.splitext(name)[1].lower() in EXPORT_FORMATS
+        ]
+        return sorted(files, key=os.path.getmtime)
+    
+    def _load_watermark(self) -> Dict[str, Any]:
+        """Load the newest BlockedAt handled, the customer IDs handled at it, undated IDs handled
+        and customers to retry"""
+        watermark = {'blocked_at': '', 'customer_ids': set(), 'undated': set(), 'retry': {}}
+        if os.path.exists(self.watermark_file):
+            with open(self.watermark_file, 'r') as f:
+                data = json.load(f)
+            watermark['blocked_at'] = data.get('blocked_at', '')
+            # Older watermarks kept a single (BlockedAt, CustomerID) position
+            legacy_id = data.get('customer_id')
+            watermark['customer_ids'] = set(data.get('customer_ids', [legacy_id] if legacy_id else []))
+            watermark['undated'] = set(data.get('undated', []))
+            watermark['retry'] = data.get('retry', {})
+        return watermark
+    
+    def _save_watermark(self, watermark: Dict[str, Any]):
+        """Persist the watermark atomically"""
+        os.makedirs(os.path.dirname(self.watermark_file) or '.', exist_ok=True)
+        temp_file = f"{self.watermark_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump({
+                'blocked_at': watermark['blocked_at'],
+                'customer_ids': sorted(watermark['customer_ids']),
+                'undated': sorted(watermark['undated']),
+                'retry': self._failed
+            }, f)
+        os.replace(temp_file, self.watermark_file)
+    
+    def _read_records(self, file_path: str) -> Iterator[Dict[str, str]]:
+        """Stream records from a CSV or JSONL export one line at a time"""
+        with open(file_path, 'r', encoding='utf-8', newline='') as f:
+            if file_path.lower().endswith('.csv'):
+                yield from csv.DictReader(f)
+            else:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+    
+    def _chunks(self, records: Iterable[Dict[str, str]]) -> Iterator[List[Dict[str, str]]]:
+        """Group a record stream into fixed-size chunks"""
+        iterator = iter(records)
+        while True:
+            chunk = list(islice(iterator, self.chunk_size))
+            if not chunk:
+                return
+            yield chunk
+    
+    def mark_failed(self, customer_id: str, customer_name: str, block_reason: str):
+        """Keep a delivered customer whose handling failed, to be delivered again next run"""
+        self._failed[customer_id] = [customer_name, block_reason]
+    
+    def detect_blocks_from_exports(self) -> Iterator[Tuple[str, str, str]]:
+        """Yield every customer blocked after the saved watermark, streaming all exports
+        
+        BlockedAt values are compared as strings, so exports must use ISO timestamps.
+        Customers blocked at exactly the watermark time are told apart by the IDs already
+        handled at that time. Rows without BlockedAt cannot be ordered, so each such
+        customer is delivered once and remembered. The watermark advances after each export
+        file has been fully consumed, so a crash part-way through a file re-delivers that
+        file's customers on the next run. Customers passed to mark_failed() are saved with
+        the watermark and delivered first on the next run.
+        """
+        watermark = self._load_watermark()
+        newest = {key: set(value) if isinstance(value, set) else value for key, value in watermark.items()}
+        seen_customers = set()
+        columns = self.columns
+        self._failed = {}
+        
+        for customer_id, (customer_name, block_reason) in watermark['retry'].items():
+            seen_customers.add(customer_id)
+            self.logger.info("Retrying blocked customer: %s (%s)", customer_name, customer_id)
+            yield customer_id, customer_name, block_reason
+        if watermark['retry']:
+            self._save_watermark(newest)
+        
+        for file_path in self._list_export_files():
+            self.logger.info("Reading block export: %s (watermark %s)", file_path, watermark['blocked_at'] or 'none')
+            print(f"📥 Reading ERP block export: {os.path.basename(file_path)}")
+            
+            detected = 0
+            for chunk in self._chunks(self._read_records(file_path)):
+                for record in chunk:
+                    blocked_at = str(record.get(columns['blocked_at']) or '').strip()
+                    customer_id = str(record.get(columns['customer_id']) or '').strip()
+                    if not customer_id or customer_id in seen_customers:
+                        continue
+                    
+                    if not blocked_at:
+                        if customer_id in watermark['undated']:
+                            continue
+                        self.logger.warning("Block export row for %s has no %s", customer_id, columns['blocked_at'])
+                        newest['undated'].add(customer_id)
+                    elif blocked_at < watermark['blocked_at'] or (
+                            blocked_at == watermark['blocked_at'] and customer_id in watermark['customer_ids']):
+                        continue
+                    elif blocked_at > newest['blocked_at']:
+                        newest['blocked_at'] = blocked_at
+                        newest['customer_ids'] = {customer_id}
+                    elif blocked_at == newest['blocked_at']:
+                        newest['customer_ids'].add(customer_id)
+                    
+                    seen_customers.add(customer_id)
+                    detected += 1
+                    
+                    customer_name = str(record.get(columns['customer_name']) or '').strip()
+                    block_reason = str(record.get(columns['block_reason']) or '').strip()
+                    self.logger.info("Block detected for customer: %s (%s)", customer_name, customer_id)
+                    yield customer_id, customer_name, block_reason
+            
+            self._save_watermark(newest)
+            print(f"   🚫 {detected} newly blocked customers in {os.path.basename(file_path)}")
+            
+            # Consumed exports are moved aside so later runs do not rescan them
+            if self.move_processed_exports:
+                processed_folder = os.path.join(self.export_folder, 'processed')
+                os.makedirs(processed_folder, exist_ok=True)
+                shutil.move(file_path, os.path.join(processed_folder, os.path.basename(file_path)))
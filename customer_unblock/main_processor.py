@@ -1,12 +1,20 @@
+import time
+import asyncio
 import logging
+from contextlib import contextmanager
 from datetime import datetime
 
 from .block_detector import BlockDetector
 from .aging_report_generator import AgingReportGenerator
 from .approval_manager import ApprovalManager
-from .erp_unblock_manager import ERPUnblockManager
+from .approval_inbox import ApprovalInbox
+from .unblock_manager import ERPUnblockManager
 from .notification_manager import NotificationManager
 from .request_tracker import RequestTracker
+from .workflow_engine import UnblockWorkflowEngine
+from utils.metrics import get_metrics, export_metrics
+from utils.profiler import StageProfiler
+from utils.tracing import get_tracer, span
 
 class CustomerUnblockProcessor:
     """Main customer unblock processing workflow"""
@@ -19,9 +27,20 @@ class CustomerUnblockProcessor:
         self.block_detector = BlockDetector(config_manager)
         self.aging_report_generator = AgingReportGenerator(config_manager)
         self.approval_manager = ApprovalManager(config_manager)
+        self.approval_inbox = ApprovalInbox(config_manager)
         self.erp_unblock_manager = ERPUnblockManager(config_manager)
         self.notification_manager = NotificationManager(config_manager)
         self.request_tracker = RequestTracker(config_manager)
+        
+        metrics = get_metrics()
+        self.step_latency = metrics.histogram(
+            'rpa_unblock_step_seconds', 'Customer unblock step latency', ['step']
+        )
+        self.requests_total = metrics.counter(
+            'rpa_unblock_requests_total', 'Unblock requests by final status', ['status']
+        )
+        self.profiler = StageProfiler(config_manager, 'customer_unblock')
+        self.tracer = get_tracer()
     
     def run(self):
         """Execute the customer unblock workflow"""
@@ -30,56 +49,125 @@ class CustomerUnblockProcessor:
         print("=" * 50)
         
         try:
+            # With a mailbox approval source, requests run concurrently as persisted state machines
+            if self.approval_inbox.enabled:
+                self._run_workflows()
+                return
+            
+            # Bulk mode: stream newly blocked customers from ERP credit-block exports
+            if self.block_detector.has_pending_exports():
+                handled = 0
+                for customer_id, customer_name, block_reason in self.block_detector.detect_blocks_from_exports():
+                    try:
+                        self._handle_blocked_customer(customer_id, customer_name, block_reason)
+                        handled += 1
+                    except Exception as e:
+                        self.logger.error("Error handling blocked customer %s: %s", customer_id, e)
+                        print(f"❌ Error for {customer_name}: {str(e)}")
+                        self.block_detector.mark_failed(customer_id, customer_name, block_reason)
+                
+                print(f"\n✅ Bulk block detection completed: {handled} customers handled")
+                return
+            
             # Step 1: Detect customer block
-            customer_id, customer_name, block_reason = self.block_detector.detect_customer_block()
+            self.profiler.begin_unit()
+            with self._step('block_detection'):
+                customer_id, customer_name, block_reason = self.block_detector.detect_customer_block()
             
             if not customer_id:
                 print("\n✅ No customer blocks detected. Process completed.")
                 return
             
-            # Generate unique request ID
-            request_id = f"REQ-{datetime.now().strftime('%Y%m%d%H%M%S')}"
-            
-            print(f"\n🎫 Generated Request ID: {request_id}")
-            
-            # Log initial request
-            self.request_tracker.log_request(request_id, customer_name, "PENDING_APPROVAL")
+            self._handle_blocked_customer(customer_id, customer_name, block_reason)
             
-            # Step 2: Generate aging report
-            print(f"\n📊 Generating aging report...")
+        except Exception as e:
+            self.logger.error("Error in customer unblock workflow: %s", e)
+            print(f"❌ Error: {str(e)}")
+        
+        finally:
+            self.request_tracker.flush()
+            export_metrics(self.config)
+            self.profiler.write_reports()
+    
+    def _run_workflows(self):
+        """Drive resumed and newly detected requests through the asynchronous workflow engine"""
+        if self.block_detector.has_pending_exports():
+            blocks = self.block_detector.detect_blocks_from_exports()
+        else:
+            customer_id, customer_name, block_reason = self.block_detector.detect_customer_block()
+            blocks = [(customer_id, customer_name, block_reason)] if customer_id else []
+        
+        engine = UnblockWorkflowEngine(self.config, self)
+        asyncio.run(engine.run(blocks))
+        print(f"\n✅ Customer unblock workflows processed")
+    
+    def _handle_blocked_customer(self, customer_id: str, customer_name: str, block_reason: str):
+        """Run report, approval and unblock steps for one blocked customer"""
+        self.profiler.begin_unit()
+        
+        # Generate unique request ID
+        request_id = f"REQ-{datetime.now().strftime('%Y%m%d%H%M%S%f')}"
+        
+        print(f"\n🎫 Generated Request ID: {request_id}")
+        
+        with self.tracer.trace('unblock_request', trace_id=request_id, customer=customer_id):
+            self._run_request(request_id, customer_id, customer_name, block_reason)
+    
+    def _run_request(self, request_id: str, customer_id: str, customer_name: str, block_reason: str):
+        """Report, approval and unblock steps of one request"""
+        # Log initial request
+        self.request_tracker.log_request(request_id, customer_name, "PENDING_APPROVAL", customer_id=customer_id)
+        
+        # Step 2: Generate aging report
+        print(f"\n📊 Generating aging report...")
+        with self._step('aging_report'):
             aging_report_path = self.aging_report_generator.generate_aging_report(
                 customer_id, customer_name
             )
-            
-            # Step 3: Send approval request
-            print(f"\n📧 Sending approval request to management...")
+        
+        # Step 3: Send approval request
+        print(f"\n📧 Sending approval request to management...")
+        with self._step('approval_request'):
             approval_sent = self.approval_manager.send_approval_request(
                 request_id, customer_name, block_reason, aging_report_path
             )
-            
-            if not approval_sent:
-                print("❌ Failed to send approval request")
-                self.request_tracker.log_request(request_id, customer_name, "FAILED_EMAIL")
-                return
-            
-            # Update request status
-            self.request_tracker.log_request(request_id, customer_name, "APPROVAL_SENT")
-            
-            # Step 4: Monitor for approval response
-            print(f"\n⏳ Monitoring for approval response...")
+        
+        if not approval_sent:
+            print("❌ Failed to send approval request")
+            self.request_tracker.log_request(request_id, customer_name, "FAILED_EMAIL")
+            return
+        
+        # Update request status
+        self.request_tracker.log_request(request_id, customer_name, "APPROVAL_SENT")
+        
+        # Step 4: Monitor for approval response
+        print(f"\n⏳ Monitoring for approval response...")
+        with self._step('approval_wait'):
             approval_status = self.approval_manager.monitor_approval_response(request_id)
-            
-            # Step 5: Process approval decision
-            print(f"\n⚖️ Processing approval decision: {approval_status}")
-            self._process_approval_decision(request_id, customer_id, customer_name, approval_status)
-            
-            print(f"\n✅ Customer Unblock Process Completed")
-            print(f"   Request ID: {request_id}")
-            print(f"   Final Status: {approval_status}")
-            
-        except Exception as e:
-            self.logger.error(f"Error in customer unblock workflow: {str(e)}")
-            print(f"❌ Error: {str(e)}")
+        
+        self._complete_request(request_id, customer_id, customer_name, approval_status)
+    
+    def _complete_request(self, request_id: str, customer_id: str, customer_name: str,
+                          approval_status: str):
+        """Act on the approval decision and record the outcome"""
+        # Step 5: Process approval decision
+        print(f"\n⚖️ Processing approval decision: {approval_status}")
+        self._process_approval_decision(request_id, customer_id, customer_name, approval_status)
+        self.requests_total.labels(status=approval_status).inc()
+        
+        print(f"\n✅ Customer Unblock Process Completed")
+        print(f"   Request ID: {request_id}")
+        print(f"   Final Status: {approval_status}")
+    
+    @contextmanager
+    def _step(self, name: str):
+        """Time one step of the unblock workflow"""
+        start = time.perf_counter()
+        try:
+            with self.profiler.stage(name), span(name):
+                yield
+        finally:
+            self.step_latency.labels(step=name).observe(time.perf_counter() - start)
     
     def _process_approval_decision(self, request_id: str, customer_id: str, 
                                  customer_name: str, approval_status: str):
@@ -89,16 +177,18 @@ class CustomerUnblockProcessor:
                 print("✅ Request approved - processing unblock...")
                 
                 # Unblock customer in ERP
-                unblock_success = self.erp_unblock_manager.unblock_customer(customer_id, customer_name)
+                with self._step('erp_unblock'):
+                    unblock_success = self.erp_unblock_manager.unblock_customer(customer_id, customer_name)
                 
                 if unblock_success:
                     # Update status
                     self.request_tracker.log_request(request_id, customer_name, "APPROVED_COMPLETED")
                     
                     # Send approval notification
-                    self.notification_manager.send_approval_notification(
-                        customer_id, customer_name, request_id, "APPROVED"
-                    )
+                    with self._step('notification'):
+                        self.notification_manager.send_approval_notification(
+                            customer_id, customer_name, request_id, "APPROVED"
+                        )
                     
                     print("   ✅ Customer unblocked successfully")
                 else:
@@ -112,9 +202,10 @@ class CustomerUnblockProcessor:
                 self.request_tracker.log_request(request_id, customer_name, "REJECTED")
                 
                 # Send rejection notification
-                self.notification_manager.send_approval_notification(
-                    customer_id, customer_name, request_id, "REJECTED"
-                )
+                with self._step('notification'):
+                    self.notification_manager.send_approval_notification(
+                        customer_id, customer_name, request_id, "REJECTED"
+                    )
                 
                 print("   📧 Rejection notification sent to sales team")
             
@@ -125,12 +216,13 @@ class CustomerUnblockProcessor:
                 self.request_tracker.log_request(request_id, customer_name, f"TIMEOUT_{approval_status}")
                 
                 # Send timeout notification
-                self.notification_manager.send_approval_notification(
-                    customer_id, customer_name, request_id, approval_status
-                )
+                with self._step('notification'):
+                    self.notification_manager.send_approval_notification(
+                        customer_id, customer_name, request_id, approval_status
+                    )
                 
                 print("   📧 Timeout notification sent to admin team")
             
         except Exception as e:
-            self.logger.error(f"Error processing approval decision: {str(e)}")
+            self.logger.error("Error processing approval decision: %s", e)
             self.request_tracker.log_request(request_id, customer_name, f"ERROR_{str(e)[:50]}")
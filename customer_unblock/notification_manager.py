@@ -1,6 +1,7 @@
 import logging
 from datetime import datetime
 from utils.email_sender import EmailSender
+from utils.tracing import traced
 
 class NotificationManager:
     """Manages notifications for customer unblock process"""
@@ -10,6 +11,7 @@ class NotificationManager:
         self.logger = logging.getLogger(__name__)
         self.email_sender = EmailSender(config_manager)
     
+    @traced()
     def send_approval_notification(self, customer_id: str, customer_name: str, 
                                  request_id: str, status: str) -> bool:
         """Send notification about approval decision"""
@@ -72,11 +74,11 @@ RPA Automation System"""
             success = self.email_sender.send_email(recipients, subject, body)
             
             if success:
-                self.logger.info(f"Notification sent for {status} decision: {request_id}")
+                self.logger.info("Notification sent for %s decision: %s", status, request_id)
                 print(f"   📧 {status} notification sent to sales team")
             
             return success
             
         except Exception as e:
-            self.logger.error(f"Error sending notification: {str(e)}")
+            self.logger.error("Error sending notification: %s", e)
             return False
\ No newline at end of file
@@ -0,0 +1,141 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+
+class ReportCache:
+    """Copies of generated report files keyed by customer and content fingerprint
+
+    Reports handed to store() stay where their caller wrote them; the cache keeps its own
+    copy in a folder it owns, so eviction never deletes a report someone else produced.
+    """
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        self.reports_folder = self.config.get('paths.reports_folder', 'reports')
+        self.cache_folder = os.path.join(self.reports_folder, 'aging_cache')
+        self.index_file = os.path.join(self.cache_folder, 'index.json')
+        self.enabled = self.config.get('aging.cache_enabled', True)
+        self.max_age_seconds = self.config.get('aging.cache_max_age_hours', 24) * 3600
+        self.max_total_bytes = self.config.get('aging.cache_max_mb', 500) * 1024 * 1024
+
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Dict[str, Any]] = self._load_index()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        """Load the cache index, dropping entries whose copies are gone"""
+        if not os.path.exists(self.index_file):
+            return {}
+        try:
+            with open(self.index_file, 'r') as f:
+                entries = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning("Ignoring unreadable report cache index: %s", e)
+            return {}
+        return {key: entry for key, entry in entries.items()
+                if self._owns(entry['path']) and os.path.exists(entry['path'])}
+
+    def _save_index(self):
+        """Write the cache index atomically"""
+        os.makedirs(self.cache_folder, exist_ok=True)
+        temp_file = f"{self.index_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self._entries, f, indent=2)
+        os.replace(temp_file, self.index_file)
+
+    @staticmethod
+    def _key(customer_id: str, report_format: str, fingerprint: str) -> str:
+        return f"{customer_id}|{report_format}|{fingerprint}"
+
+    def _owns(self, path: str) -> bool:
+        """Whether a file lives in the cache's own folder"""
+        cache_folder = os.path.abspath(self.cache_folder)
+        return os.path.commonpath([cache_folder, os.path.abspath(path)]) == cache_folder
+
+    def _copy_in(self, key: str, path: str) -> str:
+        """Hard-link, or copy where links are unsupported, a report into the cache folder"""
+        os.makedirs(self.cache_folder, exist_ok=True)
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        cached_path = os.path.join(self.cache_folder, f"{digest}{os.path.splitext(path)[1]}")
+        if os.path.exists(cached_path):
+            os.remove(cached_path)
+        try:
+            os.link(path, cached_path)
+        except OSError:
+            shutil.copy2(path, cached_path)
+        return cached_path
+
+    def lookup(self, customer_id: str, report_format: str, fingerprint: str) -> Optional[str]:
+        """Return the cached copy of the report if the customer's data is unchanged"""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(self._key(customer_id, report_format, fingerprint))
+            if not entry:
+                return None
+            if time.time() - entry['created_at'] > self.max_age_seconds or not os.path.exists(entry['path']):
+                return None
+            entry['last_used'] = time.time()
+            return entry['path']
+
+    def store(self, customer_id: str, report_format: str, fingerprint: str, path: str,
+              flush: bool = True):
+        """Record a freshly generated report; batches pass flush=False and call flush() once"""
+        if not self.enabled:
+            return
+
+        key = self._key(customer_id, report_format, fingerprint)
+        with self._lock:
+            cached_path = self._copy_in(key, path)
+            self._entries[key] = {
+                'customer_id': customer_id,
+                'path': cached_path,
+                'size': os.path.getsize(cached_path),
+                'created_at': time.time(),
+                'last_used': time.time()
+            }
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Evict stale reports and persist the index"""
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._evict()
+            self._save_index()
+
+    def _evict(self):
+        """Drop expired reports, then least recently used ones until under the size cap"""
+        now = time.time()
+        for key, entry in list(self._entries.items()):
+            if now - entry['created_at'] > self.max_age_seconds:
+                self._remove_file(entry['path'])
+                del self._entries[key]
+
+        total = sum(entry['size'] for entry in self._entries.values())
+        for key, entry in sorted(self._entries.items(), key=lambda item: item[1]['last_used']):
+            if total <= self.max_total_bytes:
+                break
+            self._remove_file(entry['path'])
+            total -= entry['size']
+            del self._entries[key]
+
+    def _remove_file(self, path: str):
+        """Delete an evicted copy; files outside the cache folder are only dropped from the index"""
+        if not self._owns(path):
+            return
+        try:
+            os.remove(path)
+            self.logger.info("Evicted cached aging report: %s", path)
+        except FileNotFoundError:
+            pass
@@ -1,36 +1,226 @@
 import os
+import time
+import sqlite3
 import logging
+import threading
+from dataclasses import dataclass
 from datetime import datetime
+from typing import List, Optional
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Statuses after an outside effect (email sent, ERP updated) or at the end of a request
+# are written at once rather than waiting in the batch, so a crash cannot lose them
+DURABLE_STATUSES = {'APPROVAL_SENT', 'APPROVED_COMPLETED', 'REJECTED', 'UNBLOCK_FAILED', 'FAILED_EMAIL'}
+DURABLE_STATUS_PREFIXES = ('TIMEOUT_', 'ERROR_')
+
+
+def is_durable_status(status: str) -> bool:
+    """Whether a status change must be written without batching"""
+    return status in DURABLE_STATUSES or status.startswith(DURABLE_STATUS_PREFIXES)
+
+
+@dataclass
+class UnblockRequest:
+    """Current state of one unblock request"""
+    request_id: str
+    customer_id: Optional[str]
+    customer_name: str
+    status: str
+    created_at: str
+    updated_at: str
+
 
 class RequestTracker:
-    """Tracks customer unblock requests"""
-    
+    """Tracks customer unblock requests in an indexed SQLite store"""
+
     def __init__(self, config_manager):
         self.config = config_manager
         self.logger = logging.getLogger(__name__)
         self.logs_folder = self.config.get('paths.logs_folder', 'logs')
         self.tracking_file = os.path.join(self.logs_folder, 'unblock_requests.txt')
-    
-    def log_request(self, request_id: str, customer_name: str, 
-                   status: str, timestamp: str = None) -> bool:
-        """Log unblock request to tracking file"""
+        self.store_path = self.config.get('paths.request_store', os.path.join(self.logs_folder, 'unblock_requests.db'))
+        self.batch_size = self.config.get('request_store.batch_size', 50)
+        self.flush_interval = self.config.get('request_store.flush_interval_seconds', 1.0)
+
+        self._lock = threading.Lock()
+        self._pending_events: List[tuple] = []
+        self._last_flush = time.monotonic()
+
+        os.makedirs(os.path.dirname(self.store_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.store_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._create_schema()
+        self._import_text_log()
+
+    def _create_schema(self):
+        """Create request tables if they do not exist"""
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS requests (
+                request_id TEXT PRIMARY KEY,
+                customer_id TEXT,
+                customer_name TEXT NOT NULL,
+                status TEXT NOT NULL,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS request_events (
+                event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                request_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                recorded_at TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS store_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_requests_customer_id ON requests(customer_id);
+            CREATE INDEX IF NOT EXISTS idx_requests_customer_name ON requests(customer_name);
+            CREATE INDEX IF NOT EXISTS idx_requests_status ON requests(status, updated_at);
+            CREATE INDEX IF NOT EXISTS idx_requests_updated ON requests(updated_at);
+            CREATE INDEX IF NOT EXISTS idx_events_request ON request_events(request_id, event_id);
+        """)
+        self._conn.commit()
+
+    def log_request(self, request_id: str, customer_name: str,
+                   status: str, timestamp: str = None, customer_id: str = None) -> bool:
+        """Record a status change; writes are batched and flushed by size or age, final ones at once"""
         try:
             if timestamp is None:
-                timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            
-            # Ensure logs directory exists
-            os.makedirs(self.logs_folder, exist_ok=True)
-            
-            # Create log entry
-            log_entry = f"{timestamp} | {request_id} | {customer_name} | {status}\n"
-            
-            # Append to tracking file
-            with open(self.tracking_file, 'a', encoding='utf-8') as f:
-                f.write(log_entry)
-            
-            self.logger.info(f"Request logged: {request_id} - {status}")
+                timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+
+            with self._lock:
+                self._pending_events.append((request_id, customer_id, customer_name, status, timestamp))
+                due = (is_durable_status(status)
+                       or len(self._pending_events) >= self.batch_size
+                       or time.monotonic() - self._last_flush >= self.flush_interval)
+            if due:
+                self.flush()
+
+            self.logger.info("Request logged: %s - %s", request_id, status)
             return True
-            
+
         except Exception as e:
-            self.logger.error(f"Error logging request: {str(e)}")
-            return False    
\ No newline at end of file
+            self.logger.error("Error logging request: %s", e)
+            return False
+
+    def flush(self):
+        """Write buffered status changes in one transaction"""
+        with self._lock:
+            events, self._pending_events = self._pending_events, []
+            self._last_flush = time.monotonic()
+            if not events:
+                return
+
+            with self._conn:
+                self._write_events(events)
+
+    def _write_events(self, events: List[tuple]):
+        """Upsert current state and append history rows; caller holds the transaction"""
+        self._conn.executemany(
+            """INSERT INTO requests (request_id, customer_id, customer_name, status, created_at, updated_at)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT(request_id) DO UPDATE SET
+                   customer_id = COALESCE(excluded.customer_id, requests.customer_id),
+                   customer_name = excluded.customer_name,
+                   status = excluded.status,
+                   updated_at = excluded.updated_at""",
+            [(rid, cid, name, status, ts, ts) for rid, cid, name, status, ts in events]
+        )
+        self._conn.executemany(
+            'INSERT INTO request_events (request_id, status, recorded_at) VALUES (?, ?, ?)',
+            [(rid, status, ts) for rid, _, _, status, ts in events]
+        )
+
+    def _query(self, where: str = '', params: tuple = (), limit: int = None) -> List[UnblockRequest]:
+        """Run a query against current request state"""
+        self.flush()
+        sql = """SELECT request_id, customer_id, customer_name, status, created_at, updated_at
+                 FROM requests"""
+        if where:
+            sql += f" WHERE {where}"
+        sql += " ORDER BY updated_at DESC"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [UnblockRequest(*row) for row in rows]
+
+    def get_request(self, request_id: str) -> Optional[UnblockRequest]:
+        """Current state of one request"""
+        requests = self._query('request_id = ?', (request_id,), limit=1)
+        return requests[0] if requests else None
+
+    def find_by_status(self, status: str) -> List[UnblockRequest]:
+        """All requests currently in a status, e.g. APPROVAL_SENT"""
+        return self._query('status = ?', (status,))
+
+    def find_by_customer(self, customer: str) -> List[UnblockRequest]:
+        """Requests for a customer ID or name"""
+        return self._query('customer_id = ? OR customer_name = ?', (customer, customer))
+
+    def list_requests(self, updated_from: str = None, updated_to: str = None,
+                      status: str = None, limit: int = None) -> List[UnblockRequest]:
+        """Requests last updated within a time range (YYYY-MM-DD[ HH:MM:SS])"""
+        clauses = []
+        params = []
+        if updated_from:
+            clauses.append('updated_at >= ?')
+            params.append(updated_from)
+        if updated_to:
+            # A bare date includes the whole day
+            clauses.append('updated_at <= ?')
+            params.append(updated_to if len(updated_to) > 10 else f"{updated_to} 23:59:59")
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        return self._query(' AND '.join(clauses), tuple(params), limit)
+
+    def history(self, request_id: str) -> List[tuple]:
+        """All (status, timestamp) changes for a request in order"""
+        self.flush()
+        with self._lock:
+            return self._conn.execute(
+                'SELECT status, recorded_at FROM request_events WHERE request_id = ? ORDER BY event_id',
+                (request_id,)
+            ).fetchall()
+
+    def _import_text_log(self):
+        """Load the legacy append-only text log once"""
+        if not os.path.exists(self.tracking_file):
+            return
+
+        imported = self._conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'text_log_imported'"
+        ).fetchone()
+        if imported:
+            return
+
+        events = []
+        with open(self.tracking_file, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, start=1):
+                parts = [part.strip() for part in line.rstrip('\n').split(' | ')]
+                if len(parts) != 4:
+                    if line.strip():
+                        self.logger.warning("Skipping malformed request log line %s", line_number)
+                    continue
+                timestamp, request_id, customer_name, status = parts
+                events.append((request_id, None, customer_name, status, timestamp))
+
+        with self._conn:
+            self._write_events(events)
+            self._conn.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('text_log_imported', ?)",
+                (datetime.now().strftime(TIMESTAMP_FORMAT),)
+            )
+
+        self.logger.info("Imported %s request log entries from %s", len(events), self.tracking_file)
+        print(f"📥 Imported {len(events)} entries from {os.path.basename(self.tracking_file)} into the request store")
+
+    def close(self):
+        """Flush pending writes and close the store"""
+        self.flush()
+        with self._lock:
+            self._conn.close()
@@ -1,6 +1,20 @@
 import logging
 import time
 from datetime import datetime
+from typing import Dict, List, Tuple
+
+from utils.erp_model import ERPLatencyModel
+from utils.metrics import get_metrics
+from utils.tracing import span, traced
+
+# Simulated ERP cost per step: a fixed part per session plus a part per customer touched.
+# A single unblock pays every fixed part once, as the original four one-second steps did.
+DEFAULT_SIMULATION_COSTS = {
+    'connect': (1.0, 0.0),
+    'search': (0.9, 0.1),
+    'update': (0.95, 0.05),
+    'save': (0.95, 0.05)
+}
 
 class ERPUnblockManager:
     """Manages customer unblock operations in ERP system"""
@@ -8,11 +22,34 @@ class ERPUnblockManager:
     def __init__(self, config_manager):
         self.config = config_manager
         self.logger = logging.getLogger(__name__)
+        
+        metrics = get_metrics()
+        self.call_latency = metrics.histogram(
+            'rpa_erp_call_seconds', 'ERP call latency by operation', ['operation']
+        )
+        self.calls_total = metrics.counter(
+            'rpa_erp_calls_total', 'ERP calls by operation and status', ['operation', 'status']
+        )
+        
+        costs = self.config.get('erp.simulation_costs', {})
+        self.simulation_costs = {
+            step: tuple(costs.get(step, default)) for step, default in DEFAULT_SIMULATION_COSTS.items()
+        }
+        self.bulk_max_customers = self.config.get('erp.bulk_max_customers', 500)
+        self.latency_model = ERPLatencyModel(config_manager)
+    
+    def _simulate(self, step: str, customers: int):
+        """Spend the modeled cost of one ERP step over a number of customers"""
+        fixed, per_customer = self.simulation_costs[step]
+        with span(f"erp.{step}", customers=customers):
+            self.latency_model.call(f"unblock_{step}", fixed + per_customer * customers)
     
+    @traced()
     def unblock_customer(self, customer_id: str, customer_name: str) -> bool:
         """Unblock customer in ERP system"""
+        start = time.perf_counter()
         try:
-            self.logger.info(f"Unblocking customer in ERP: {customer_name} ({customer_id})")
+            self.logger.info("Unblocking customer in ERP: %s (%s)", customer_name, customer_id)
             
             print(f"🔓 Unblocking customer in ERP system...")
             print(f"   Customer: {customer_name}")
@@ -20,23 +57,77 @@ class ERPUnblockManager:
             
             # Simulate ERP operations
             print("   🔍 Connecting to ERP system...")
-            time.sleep(1)
+            self._simulate('connect', 1)
             
             print("   🔍 Searching for customer record...")
-            time.sleep(1)
+            self._simulate('search', 1)
             
             print("   ✏️ Updating customer status...")
-            time.sleep(1)
+            self._simulate('update', 1)
             
             print("   💾 Saving changes...")
-            time.sleep(1)
+            self._simulate('save', 1)
             
             print("   ✅ Customer unblocked successfully")
             
-            self.logger.info(f"Customer {customer_name} unblocked successfully")
+            self.logger.info("Customer %s unblocked successfully", customer_name)
+            self._record_call('unblock_customer', start, 'ok')
             return True
             
         except Exception as e:
-            self.logger.error(f"Error unblocking customer {customer_name}: {str(e)}")
+            self.logger.error("Error unblocking customer %s: %s", customer_name, e)
             print(f"   ❌ Error unblocking customer: {str(e)}")
+            self._record_call('unblock_customer', start, 'error')
             return False
+    
+    @traced()
+    def unblock_customers(self, customers: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """Unblock many customers in one ERP session; returns success per customer ID"""
+        results: Dict[str, bool] = {}
+        for start_idx in range(0, len(customers), self.bulk_max_customers):
+            results.update(self._unblock_session(customers[start_idx:start_idx + self.bulk_max_customers]))
+        return results
+    
+    def _unblock_session(self, customers: List[Tuple[str, str]]) -> Dict[str, bool]:
+        """Connect once, look up all records in one query and commit the updates together"""
+        start = time.perf_counter()
+        unique = dict(customers)
+        try:
+            self.logger.info("Bulk unblocking %s customers in one ERP session", len(unique))
+            print(f"🔓 Bulk unblocking {len(unique)} customers in ERP system...")
+            
+            print("   🔍 Connecting to ERP system...")
+            self._simulate('connect', len(unique))
+            
+            print(f"   🔍 Searching {len(unique)} customer records...")
+            self._simulate('search', len(unique))
+            found = {customer_id: name for customer_id, name in unique.items() if customer_id.strip()}
+            
+            print(f"   ✏️ Updating {len(found)} customer statuses...")
+            self._simulate('update', len(found))
+            
+            print("   💾 Saving changes...")
+            self._simulate('save', len(found))
+            
+            results = {customer_id: customer_id in found for customer_id in unique}
+            for customer_id, unblocked in results.items():
+                if unblocked:
+                    self.logger.info("Customer %s unblocked successfully", unique[customer_id])
+                else:
+                    self.logger.warning("Customer record not found in ERP: %s (%s)", unique[customer_id], customer_id)
+            
+            print(f"   ✅ {sum(results.values())}/{len(results)} customers unblocked")
+            self._record_call('bulk_unblock', start, 'ok')
+            return results
+            
+        except Exception as e:
+            # The session commits atomically, so a failure leaves every customer in the batch blocked
+            self.logger.error("Error in bulk unblock of %s customers: %s", len(unique), e)
+            print(f"   ❌ Error in bulk unblock: {str(e)}")
+            self._record_call('bulk_unblock', start, 'error')
+            return {customer_id: False for customer_id in unique}
+    
+    def _record_call(self, operation: str, start: float, status: str):
+        """Record latency and outcome of one ERP call"""
+        self.call_latency.labels(operation=operation).observe(time.perf_counter() - start)
+        self.calls_total.labels(operation=operation, status=status).inc()
@@ -0,0 +1,407 @@
+import time
+import asyncio
+import sqlite3
+import contextvars
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from utils.metrics import get_metrics
+from utils.tracing import get_tracer, span
+
+# Workflow states in order; a request parks in APPROVAL_SENT without holding any task
+NEW = 'NEW'
+REPORT_READY = 'REPORT_READY'
+APPROVAL_SENT = 'APPROVAL_SENT'
+APPROVED = 'APPROVED'
+REJECTED = 'REJECTED'
+TIMEOUT = 'TIMEOUT'
+UNBLOCKED = 'UNBLOCKED'
+UNBLOCK_FAILED = 'UNBLOCK_FAILED'
+COMPLETED = 'COMPLETED'
+FAILED = 'FAILED'
+
+TERMINAL_STATES = {COMPLETED, FAILED}
+
+# Tracker status written when a workflow finishes, keyed by the state it finished from
+FINAL_TRACKER_STATUS = {
+    UNBLOCKED: 'APPROVED_COMPLETED',
+    UNBLOCK_FAILED: 'UNBLOCK_FAILED',
+    REJECTED: 'REJECTED',
+    TIMEOUT: 'TIMEOUT_TIMEOUT'
+}
+
+DEFAULT_STEP_CONCURRENCY = {
+    'aging_report': 4,
+    'approval_request': 8,
+    'erp_unblock': 4,
+    'notification': 8
+}
+
+
+@dataclass
+class UnblockWorkflow:
+    """Persisted state of one customer unblock request"""
+    request_id: str
+    customer_id: str
+    customer_name: str
+    block_reason: str
+    state: str = NEW
+    report_path: Optional[str] = None
+    decision: Optional[str] = None
+    error: Optional[str] = None
+    created_at: str = ''
+    updated_at: str = ''
+
+
+class WorkflowStore:
+    """SQLite table of workflow states, kept next to the request store"""
+
+    COLUMNS = ('request_id', 'customer_id', 'customer_name', 'block_reason', 'state',
+               'report_path', 'decision', 'error', 'created_at', 'updated_at')
+
+    def __init__(self, store_path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(store_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS workflows (
+                request_id TEXT PRIMARY KEY,
+                customer_id TEXT NOT NULL,
+                customer_name TEXT NOT NULL,
+                block_reason TEXT,
+                state TEXT NOT NULL,
+                report_path TEXT,
+                decision TEXT,
+                error TEXT,
+                created_at TEXT NOT NULL,
+                updated_at TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_workflows_state ON workflows(state, updated_at);
+        """)
+        self._conn.commit()
+
+    def save(self, workflow: UnblockWorkflow, touch: bool = True):
+        """Persist a workflow after each transition; touch=False keeps its updated_at"""
+        now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        workflow.created_at = workflow.created_at or now
+        if touch or not workflow.updated_at:
+            workflow.updated_at = now
+        row = asdict(workflow)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO workflows ({', '.join(self.COLUMNS)}) "
+                f"VALUES ({', '.join('?' for _ in self.COLUMNS)})",
+                tuple(row[column] for column in self.COLUMNS)
+            )
+
+    def exists(self, request_id: str) -> bool:
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM workflows WHERE request_id = ?', (request_id,)
+            ).fetchone() is not None
+
+    def load_active(self) -> List[UnblockWorkflow]:
+        """Workflows that have not reached a terminal state"""
+        placeholders = ', '.join('?' for _ in TERMINAL_STATES)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(self.COLUMNS)} FROM workflows WHERE state NOT IN ({placeholders})",
+                tuple(TERMINAL_STATES)
+            ).fetchall()
+        return [UnblockWorkflow(*row) for row in rows]
+
+    def count_by_state(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._conn.execute('SELECT state, COUNT(*) FROM workflows GROUP BY state').fetchall())
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class UnblockWorkflowEngine:
+    """Drives many unblock requests concurrently as persisted state machines on asyncio"""
+
+    def __init__(self, config_manager, processor):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+        self.processor = processor
+
+        self.store = WorkflowStore(processor.request_tracker.store_path)
+        self.max_workers = self.config.get('workflow.max_workers', 16)
+        self.step_concurrency = {**DEFAULT_STEP_CONCURRENCY, **self.config.get('workflow.step_concurrency', {})}
+        self.max_wait_seconds = self.config.get('approval.max_wait_seconds')
+        self.bulk_window_seconds = self.config.get('erp.bulk_window_seconds', 0.5)
+        self.bulk_max_customers = self.config.get('erp.bulk_max_customers', 500)
+
+        self.step_latency = get_metrics().histogram(
+            'rpa_unblock_step_seconds', 'Customer unblock step latency', ['step']
+        )
+        self.active_workflows = get_metrics().gauge(
+            'rpa_unblock_workflows', 'Unblock workflows by state', ['state']
+        )
+
+        self._workflows: Dict[str, UnblockWorkflow] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._last_request_time: Optional[datetime] = None
+        self._unblock_queue: List[Tuple[UnblockWorkflow, asyncio.Future]] = []
+        self._unblock_timer: Optional[asyncio.TimerHandle] = None
+
+    async def run(self, blocks: Iterable[Tuple[str, str, str]] = ()):
+        """Resume persisted workflows, start new ones and drive all of them to a resting state"""
+        self._loop = asyncio.get_running_loop()
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='unblock')
+        self._semaphores = {step: asyncio.Semaphore(limit) for step, limit in self.step_concurrency.items()}
+        started = time.time()
+
+        try:
+            self._resume()
+            for customer_id, customer_name, block_reason in blocks:
+                self.submit(customer_id, customer_name, block_reason)
+                # Let started workflows make progress while a large export is still being read
+                await asyncio.sleep(0)
+
+            # Tasks run until their workflow finishes or parks in APPROVAL_SENT;
+            # a single poller then serves every parked request
+            while self._tasks or self.processor.approval_inbox.pending_count():
+                if self._tasks:
+                    await asyncio.wait(set(self._tasks), timeout=self.processor.approval_inbox.poll_interval)
+                if self.processor.approval_inbox.pending_count():
+                    await self._run_blocking(self.processor.approval_inbox.poll_once)
+                    if not self._tasks:
+                        await asyncio.sleep(self.processor.approval_inbox.poll_interval)
+                if self.max_wait_seconds is not None and time.time() - started >= self.max_wait_seconds:
+                    if self._tasks:
+                        await asyncio.wait(set(self._tasks))
+                    break
+
+            self._report_states()
+        finally:
+            self._executor.shutdown(wait=True)
+            self.processor.request_tracker.flush()
+
+    def submit(self, customer_id: str, customer_name: str, block_reason: str) -> str:
+        """Create and start a workflow for a newly blocked customer"""
+        workflow = UnblockWorkflow(self._new_request_id(), customer_id, customer_name, block_reason)
+        self.store.save(workflow)
+        self.processor.request_tracker.log_request(
+            workflow.request_id, customer_name, 'PENDING_APPROVAL', customer_id=customer_id
+        )
+        print(f"🎫 {workflow.request_id}: {customer_name}")
+        self._start(workflow)
+        return workflow.request_id
+
+    def _new_request_id(self) -> str:
+        """Request IDs keep the REQ-<timestamp> format and stay unique within a tight loop"""
+        now = datetime.now()
+        if self._last_request_time is not None and now <= self._last_request_time:
+            now = self._last_request_time + timedelta(microseconds=1)
+        self._last_request_time = now
+        return f"REQ-{now.strftime('%Y%m%d%H%M%S%f')}"
+
+    def _resume(self):
+        """Reload unfinished workflows and adopt requests awaiting approval from the tracker"""
+        for workflow in self.store.load_active():
+            self._start(workflow)
+
+        for request in self.processor.request_tracker.find_by_status('APPROVAL_SENT'):
+            if request.request_id in self._workflows or self.store.exists(request.request_id):
+                continue
+            if not request.customer_id:
+                self.logger.warning("Cannot resume %s: no customer ID recorded", request.request_id)
+                continue
+            # The tracker's updated_at is when the approval was sent; keep it so the timeout
+            # does not restart on every restart
+            workflow = UnblockWorkflow(request.request_id, request.customer_id, request.customer_name,
+                                       '', state=APPROVAL_SENT, created_at=request.created_at,
+                                       updated_at=request.updated_at)
+            self.store.save(workflow, touch=False)
+            self._start(workflow)
+
+        if self._workflows:
+            print(f"📬 Resumed {len(self._workflows)} unfinished unblock requests")
+
+    def _start(self, workflow: UnblockWorkflow):
+        """Track a workflow and schedule its next step"""
+        self._workflows[workflow.request_id] = workflow
+        if workflow.state == APPROVAL_SENT:
+            self._park(workflow)
+        else:
+            self._spawn(workflow)
+
+    def _spawn(self, workflow: UnblockWorkflow):
+        task = self._loop.create_task(self._advance(workflow))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _park(self, workflow: UnblockWorkflow):
+        """Register a waiting request with the approval inbox; no task is held while waiting"""
+        sent_at = datetime.strptime(workflow.updated_at, '%Y-%m-%d %H:%M:%S').timestamp()
+        self.processor.approval_inbox.register(
+            workflow.request_id, workflow.customer_id, workflow.customer_name,
+            self._on_decision_threadsafe, sent_at=sent_at
+        )
+
+    def _on_decision_threadsafe(self, request_id: str, status: str):
+        """Inbox callback, invoked on the polling thread"""
+        self._loop.call_soon_threadsafe(self._on_decision, request_id, status)
+
+    def _on_decision(self, request_id: str, status: str):
+        workflow = self._workflows.get(request_id)
+        if workflow is None or workflow.state != APPROVAL_SENT:
+            return
+
+        sent_at = datetime.strptime(workflow.updated_at, '%Y-%m-%d %H:%M:%S').timestamp()
+        self.step_latency.labels(step='approval_wait').observe(time.time() - sent_at)
+        workflow.decision = status
+        self._transition(workflow, status if status in (APPROVED, REJECTED) else TIMEOUT)
+        self._spawn(workflow)
+
+    async def _advance(self, workflow: UnblockWorkflow):
+        """Run steps until the workflow parks for approval or finishes; each run is a trace segment"""
+        with get_tracer().trace('unblock_request', trace_id=workflow.request_id,
+                                customer=workflow.customer_id, resumed_from=workflow.state):
+            await self._advance_steps(workflow)
+    
+    async def _advance_steps(self, workflow: UnblockWorkflow):
+        try:
+            while workflow.state not in TERMINAL_STATES:
+                if workflow.state == NEW:
+                    workflow.report_path = await self._step(
+                        'aging_report', self.processor.aging_report_generator.generate_aging_report,
+                        workflow.customer_id, workflow.customer_name
+                    )
+                    self._transition(workflow, REPORT_READY)
+
+                elif workflow.state == REPORT_READY:
+                    sent = await self._step(
+                        'approval_request', self.processor.approval_manager.send_approval_request,
+                        workflow.request_id, workflow.customer_name, workflow.block_reason, workflow.report_path
+                    )
+                    if not sent:
+                        self.processor.request_tracker.log_request(
+                            workflow.request_id, workflow.customer_name, 'FAILED_EMAIL'
+                        )
+                        workflow.error = 'approval email failed'
+                        self._transition(workflow, FAILED)
+                        break
+                    self.processor.request_tracker.log_request(
+                        workflow.request_id, workflow.customer_name, 'APPROVAL_SENT'
+                    )
+                    self._transition(workflow, APPROVAL_SENT)
+                    self._park(workflow)
+                    return
+
+                elif workflow.state == APPROVED:
+                    with span('erp_unblock_wait'):
+                        unblocked = await self._bulk_unblock(workflow)
+                    self._transition(workflow, UNBLOCKED if unblocked else UNBLOCK_FAILED)
+
+                elif workflow.state in (UNBLOCKED, REJECTED, TIMEOUT):
+                    await self._step(
+                        'notification', self.processor.notification_manager.send_approval_notification,
+                        workflow.customer_id, workflow.customer_name, workflow.request_id, workflow.decision
+                    )
+                    self._finish(workflow)
+
+                elif workflow.state == UNBLOCK_FAILED:
+                    self._finish(workflow)
+
+                else:
+                    raise ValueError(f"Unknown workflow state: {workflow.state}")
+
+        except Exception as e:
+            self.logger.error("Workflow %s failed in %s: %s", workflow.request_id, workflow.state, e)
+            self.processor.request_tracker.log_request(
+                workflow.request_id, workflow.customer_name, f"ERROR_{str(e)[:50]}"
+            )
+            workflow.error = str(e)
+            self._transition(workflow, FAILED)
+
+    def _finish(self, workflow: UnblockWorkflow):
+        """Record the final request status and close the workflow"""
+        status = FINAL_TRACKER_STATUS[workflow.state]
+        self.processor.request_tracker.log_request(workflow.request_id, workflow.customer_name, status)
+        self.processor.requests_total.labels(status=workflow.decision or status).inc()
+        print(f"✅ {workflow.request_id} ({workflow.customer_name}): {status}")
+        self._transition(workflow, COMPLETED)
+
+    def _transition(self, workflow: UnblockWorkflow, state: str):
+        """Move to a new state and persist it before anything else happens"""
+        self.logger.debug("Workflow %s: %s -> %s", workflow.request_id, workflow.state, state)
+        workflow.state = state
+        self.store.save(workflow)
+        if state in TERMINAL_STATES:
+            self._workflows.pop(workflow.request_id, None)
+
+    async def _bulk_unblock(self, workflow: UnblockWorkflow) -> bool:
+        """Queue an approved customer; approvals arriving together share one ERP session"""
+        future = self._loop.create_future()
+        self._unblock_queue.append((workflow, future))
+
+        if len(self._unblock_queue) >= self.bulk_max_customers:
+            self._flush_unblocks()
+        elif self._unblock_timer is None:
+            self._unblock_timer = self._loop.call_later(self.bulk_window_seconds, self._flush_unblocks)
+
+        return await future
+
+    def _flush_unblocks(self):
+        """Send the queued approvals to the ERP as one bulk unblock"""
+        if self._unblock_timer is not None:
+            self._unblock_timer.cancel()
+            self._unblock_timer = None
+
+        batch, self._unblock_queue = self._unblock_queue, []
+        if batch:
+            # Held like workflow tasks so it is not collected mid-flight and run() waits for it
+            task = self._loop.create_task(self._run_unblock_batch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._on_batch_done)
+
+    def _on_batch_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            self.logger.error("Bulk unblock batch failed: %s", task.exception())
+
+    async def _run_unblock_batch(self, batch: List[Tuple[UnblockWorkflow, asyncio.Future]]):
+        customers = [(workflow.customer_id, workflow.customer_name) for workflow, _ in batch]
+        try:
+            results = await self._step('erp_unblock', self.processor.erp_unblock_manager.unblock_customers, customers)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for workflow, future in batch:
+            if not future.done():
+                future.set_result(results.get(workflow.customer_id, False))
+
+    async def _step(self, name: str, func, *args):
+        """Run a blocking step on the worker pool under its concurrency limit"""
+        async with self._semaphores[name]:
+            start = time.perf_counter()
+            try:
+                with span(name):
+                    return await self._run_blocking(func, *args)
+            finally:
+                self.step_latency.labels(step=name).observe(time.perf_counter() - start)
+
+    async def _run_blocking(self, func, *args):
+        # Executor threads do not inherit context variables; carry the current trace span over
+        context = contextvars.copy_context()
+        return await self._loop.run_in_executor(self._executor, context.run, func, *args)
+
+    def _report_states(self):
+        """Print and export how many workflows rest in each state"""
+        counts = self.store.count_by_state()
+        for state, count in counts.items():
+            self.active_workflows.labels(state=state).set(count)
+        waiting = counts.get(APPROVAL_SENT, 0)
+        if waiting:
+            print(f"📬 {waiting} requests still awaiting approval; they resume on the next run")
@@ -1,6 +1,7 @@
 import os
 import sys
 import logging
+import argparse
 from datetime import datetime
 import json
 
@@ -8,22 +9,78 @@ sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from utils.logger import setup_logging
 from utils.config_manager import ConfigManager
+from utils.metrics import start_metrics_server
+from utils.tracing import configure_tracing, print_trace_report
 
 def setup_directories():
     """Create required directory structure"""
     directories = [
-        'data/input', 'data/processed', 'data/exceptions',
-        'logs', 'reports', 'config'
+        'data/input', 'data/processed', 'data/exceptions', 'data/erp_exports', 'data/ledger',
+        'data/archive', 'data/replay', 'logs', 'reports', 'config'
     ]
     
     for directory in directories:
         os.makedirs(directory, exist_ok=True)
 
+def parse_args():
+    """Parse command line options for batch runs"""
+    parser = argparse.ArgumentParser(description="RPA POC - Order Processing & Customer Unblock")
+    parser.add_argument('--process', choices=['order', 'unblock', 'aging', 'replay', 'traces'],
+                        help="Run one workflow non-interactively and exit")
+    parser.add_argument('--customers', nargs='+',
+                        help="Customer IDs for --process aging (default: every customer in the ledger)")
+    parser.add_argument('--single-workbook', action='store_true',
+                        help="Write --process aging output as one multi-sheet workbook")
+    parser.add_argument('--replay-stage', default='SKU_MAPPED',
+                        help="Failing stage of exceptions to replay with --process replay")
+    parser.add_argument('--replay-item',
+                        help="Only replay exceptions for this item description")
+    parser.add_argument('--top', type=int, default=10,
+                        help="Number of slowest traces to list with --process traces")
+    parser.add_argument('--trace-name', choices=['order_file', 'unblock_request'],
+                        help="Only report traces of this kind with --process traces")
+    parser.add_argument('--profile', action='store_true',
+                        help="Profile each stage with cProfile and tracemalloc")
+    parser.add_argument('--profile-sample-rate', type=float,
+                        help="Fraction of files/requests to profile (default from config)")
+    return parser.parse_args()
+
+def run_order_processing(config_manager):
+    """Run the order processing workflow"""
+    from order_processing.main_processor import OrderProcessor
+    processor = OrderProcessor(config_manager)
+    processor.run()
+
+def run_customer_unblock(config_manager):
+    """Run the customer unblock workflow"""
+    from customer_unblock.main_processor import CustomerUnblockProcessor
+    processor = CustomerUnblockProcessor(config_manager)
+    processor.run()
+
+def run_aging_batch(config_manager, customer_ids=None, single_workbook=False):
+    """Generate aging reports for many customers in parallel"""
+    from customer_unblock.aging_batch import AgingBatchGenerator
+    generator = AgingBatchGenerator(config_manager)
+    generator.generate_batch(customer_ids, single_workbook=single_workbook)
+
+def run_exception_replay(config_manager, stage='SKU_MAPPED', item=None):
+    """Replay indexed exceptions from their failing stage"""
+    from order_processing.main_processor import OrderProcessor
+    processor = OrderProcessor(config_manager)
+    processor.print_exception_summary()
+    processor.replay_exceptions(stage, item, force=True)
+
 def main():
     """Main execution function"""
+    args = parse_args()
+    
+    # Load configuration
+    config_manager = ConfigManager()
+    
     # Setup logging
-    setup_logging()
+    setup_logging(config_manager)
     logger = logging.getLogger(__name__)
+    configure_tracing(config_manager)
     
     print("=" * 60)
     print("🤖 RPA POC - Order Processing & Customer Unblock")
@@ -32,11 +89,36 @@ def main():
     
     setup_directories()
     
-    # Load configuration
-    config_manager = ConfigManager()
+    if args.profile:
+        config_manager.set('profiling.enabled', True)
+    if args.profile_sample_rate is not None:
+        config_manager.set('profiling.sample_rate', args.profile_sample_rate)
+    
+    # Optional localhost /metrics endpoint for Prometheus scraping
+    start_metrics_server(config_manager)
     
     logger.info("Starting RPA POC Application")
     
+    if args.process == "order":
+        logger.info("Starting Order Processing workflow")
+        run_order_processing(config_manager)
+        sys.exit(0)
+    elif args.process == "unblock":
+        logger.info("Starting Customer Unblock workflow")
+        run_customer_unblock(config_manager)
+        sys.exit(0)
+    elif args.process == "aging":
+        logger.info("Starting aging report batch")
+        run_aging_batch(config_manager, args.customers, args.single_workbook)
+        sys.exit(0)
+    elif args.process == "traces":
+        print_trace_report(config_manager, args.top, args.trace_name)
+        sys.exit(0)
+    elif args.process == "replay":
+        logger.info("Starting exception replay")
+        run_exception_replay(config_manager, args.replay_stage, args.replay_item)
+        sys.exit(0)
+    
     while True:
         print("\nSelect Process:")
         print("1. Order Processing")
@@ -47,15 +129,11 @@ def main():
         
         if choice == "1":
             logger.info("Starting Order Processing workflow")
-            from order_processing.main_processor import OrderProcessor
-            processor = OrderProcessor(config_manager)
-            processor.run()
+            run_order_processing(config_manager)
             
         elif choice == "2":
             logger.info("Starting Customer Unblock workflow")
-            from customer_unblock.main_processor import CustomerUnblockProcessor
-            processor = CustomerUnblockProcessor(config_manager)
-            processor.run()
+            run_customer_unblock(config_manager)
             
         elif choice == "3":
             print("👋 Goodbye!")
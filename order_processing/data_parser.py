@@ -1,7 +1,11 @@
+import os
 import re
+import json
 import logging
 from dataclasses import dataclass
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Pattern, Set
+
+from utils.metrics import get_metrics
 
 @dataclass
 class ParsedOrder:
@@ -13,6 +17,61 @@ class ParsedOrder:
     order_date: Optional[str] = None
     po_number: Optional[str] = None
 
+# Generic patterns, compiled once for every parser instance
+GENERIC_PATTERNS = {
+    'customer': [
+        r'(?i)(customer|client|company)[:\s]+([^\n\r]+)',
+        r'(?i)(bill\s+to|sold\s+to)[:\s]+([^\n\r]+)',
+        # Only a "From:" header line; a bare "from" inside a sentence is not a customer
+        r'(?im)^\s*(from)\s*:\s*([^\n\r]+)'
+    ],
+    'item': [
+        r'(?i)(item|description|product)[:\s]+([^\n\r]+)',
+        r'(?i)(part\s+description|item\s+description)[:\s]+([^\n\r]+)'
+    ],
+    'quantity': [
+        r'(?i)(qty|quantity)[:\s]*(\d+)',
+        r'(?i)(units?)[:\s]*(\d+)',
+        r'(?i)(\d+)\s*(?:pcs|pieces|units?)'
+    ],
+    'price': [
+        r'(?i)(price|amount|total)[:\s]*[\$]?(\d+\.?\d*)',
+        r'[\$](\d+\.?\d*)'
+    ],
+    'po_number': [
+        r'(?i)(po|purchase\s+order)[\s#]*(\w+)',
+        r'(?i)(order\s+number)[:\s]*(\w+)'
+    ],
+    'date': [
+        r'(?i)(date|order\s+date)[:\s]*([^\n\r]+)',
+        r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
+        r'(\d{4}[-/]\d{1,2}[-/]\d{1,2})'
+    ]
+}
+
+SENDER_PATTERN = re.compile(r'(?im)^\s*(?:from|sender|reply-to)\s*:.*?[\w.+-]+@([\w-]+(?:\.[\w-]+)+)')
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+def normalize_phrase(phrase: str) -> str:
+    """Lowercase a header phrase and reduce it to single-spaced words, as header text is"""
+    return ' '.join(TOKEN_PATTERN.findall(phrase.lower()))
+
+
+def compile_patterns(patterns: Dict[str, List[str]]) -> Dict[str, List[Pattern]]:
+    """Compile a field -> regex list mapping"""
+    return {field: [re.compile(pattern) for pattern in field_patterns] for field, field_patterns in patterns.items()}
+
+
+@dataclass
+class ParserProfile:
+    """Customer-specific pattern set and the document fingerprint that selects it"""
+    name: str
+    header_tokens: Set[str]
+    sender_domain: Optional[str]
+    patterns: Dict[str, List[Pattern]]
+    customer_name: Optional[str] = None
+
 class DataParser:
     """Parses text content to extract order information"""
     
@@ -20,47 +79,96 @@ class DataParser:
         self.config = config_manager
         self.logger = logging.getLogger(__name__)
         
-        # Regex patterns for data extraction
-        self.patterns = {
-            'customer': [
-                r'(?i)(customer|client|company)[:\s]+([^\n\r]+)',
-                r'(?i)(bill\s+to|sold\s+to)[:\s]+([^\n\r]+)',
-                r'(?i)(from)[:\s]+([^\n\r]+)'
-            ],
-            'item': [
-                r'(?i)(item|description|product)[:\s]+([^\n\r]+)',
-                r'(?i)(part\s+description|item\s+description)[:\s]+([^\n\r]+)'
-            ],
-            'quantity': [
-                r'(?i)(qty|quantity)[:\s]*(\d+)',
-                r'(?i)(units?)[:\s]*(\d+)',
-                r'(\d+)\s*(?i)(pcs|pieces|units?)'
-            ],
-            'price': [
-                r'(?i)(price|amount|total)[:\s]*[\$]?(\d+\.?\d*)',
-                r'[\$](\d+\.?\d*)'
-            ],
-            'po_number': [
-                r'(?i)(po|purchase\s+order)[\s#]*(\w+)',
-                r'(?i)(order\s+number)[:\s]*(\w+)'
-            ],
-            'date': [
-                r'(?i)(date|order\s+date)[:\s]*([^\n\r]+)',
-                r'(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-                r'(\d{4}[-/]\d{1,2}[-/]\d{1,2})'
-            ]
-        }
+        self.header_lines = self.config.get('parser.header_lines', 12)
+        self.patterns = compile_patterns(GENERIC_PATTERNS)
+        
+        # Customer profiles, indexed by sender domain and by the first word of each header phrase
+        self.profiles: List[ParserProfile] = self._load_profiles()
+        self._by_sender: Dict[str, ParserProfile] = {}
+        self._by_token: Dict[str, List[ParserProfile]] = {}
+        for profile in self.profiles:
+            if profile.sender_domain:
+                self._by_sender[profile.sender_domain] = profile
+            for phrase in profile.header_tokens:
+                self._by_token.setdefault(phrase.split()[0], []).append(profile)
+        
+        self.profile_matches = get_metrics().counter(
+            'rpa_parser_profile_total', 'Parsed documents by pattern profile', ['profile']
+        )
+    
+    def _load_profiles(self) -> List[ParserProfile]:
+        """Load and precompile customer parser profiles"""
+        profiles_file = self.config.get('paths.parser_profiles_file', 'config/parser_profiles.json')
+        if not os.path.exists(profiles_file):
+            return []
+        
+        try:
+            with open(profiles_file, 'r') as f:
+                raw_profiles = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning("Could not load parser profiles: %s", e)
+            return []
+        
+        profiles = []
+        for raw in raw_profiles:
+            match = raw.get('match', {})
+            try:
+                patterns = compile_patterns(raw.get('patterns', {}))
+            except re.error as e:
+                self.logger.warning("Skipping parser profile %s: %s", raw.get('name'), e)
+                continue
+            profiles.append(ParserProfile(
+                name=raw['name'],
+                header_tokens={phrase for phrase in map(normalize_phrase, match.get('header_tokens', [])) if phrase},
+                sender_domain=(match.get('sender_domain') or '').lower() or None,
+                patterns=patterns,
+                customer_name=raw.get('customer_name')
+            ))
+        
+        self.logger.info("Loaded %s parser profiles", len(profiles))
+        return profiles
+    
+    def route(self, text: str) -> Optional[ParserProfile]:
+        """Pick a customer profile from the sender domain or the header tokens"""
+        if not self.profiles:
+            return None
+        
+        sender = SENDER_PATTERN.search(text)
+        if sender and sender.group(1).lower() in self._by_sender:
+            return self._by_sender[sender.group(1).lower()]
+        
+        header = [line for line in text.splitlines() if line.strip()][:self.header_lines]
+        words = TOKEN_PATTERN.findall('\n'.join(header).lower())
+        header_text = f" {' '.join(words)} "
+        
+        candidates = {id(profile): profile for word in set(words) for profile in self._by_token.get(word, ())}
+        matches = [
+            profile for profile in candidates.values()
+            if all(f" {phrase} " in header_text for phrase in profile.header_tokens)
+        ]
+        if not matches:
+            return None
+        # The most specific profile wins; ties go to the name so routing never depends on set order
+        return min(matches, key=lambda profile: (-len(profile.header_tokens), profile.name))
     
     def parse_text(self, text: str) -> ParsedOrder:
         """Parse extracted text to find order details"""
         try:
             self.logger.info("Starting text parsing")
             
-            # Extract information using patterns
-            extracted_data = {}
+            # Customer-specific patterns first, generic patterns for anything they do not cover
+            profile = self.route(text)
+            self.profile_matches.labels(profile=profile.name if profile else 'generic').inc()
             
+            extracted_data = {}
             for field, patterns in self.patterns.items():
-                extracted_data[field] = self._extract_field(text, patterns)
+                value = None
+                if profile and field in profile.patterns:
+                    value = self._extract_field(text, profile.patterns[field])
+                extracted_data[field] = value if value is not None else self._extract_field(text, patterns)
+            
+            if profile and profile.customer_name:
+                extracted_data['customer'] = profile.customer_name
             
             # Create ParsedOrder object
             parsed_order = ParsedOrder(
@@ -72,17 +180,17 @@ class DataParser:
                 order_date=extracted_data.get('date')
             )
             
-            self.logger.info(f"Parsed order: {parsed_order}")
+            self.logger.debug("Parsed order: %s", parsed_order)
             return parsed_order
             
         except Exception as e:
-            self.logger.error(f"Error parsing text: {str(e)}")
+            self.logger.error("Error parsing text: %s", e)
             raise
     
-    def _extract_field(self, text: str, patterns: list) -> Optional[str]:
+    def _extract_field(self, text: str, patterns: List[Pattern]) -> Optional[str]:
         """Extract field value using multiple patterns"""
         for pattern in patterns:
-            match = re.search(pattern, text)
+            match = pattern.search(text)
             if match:
-                return match.group(-1).strip()
+                return match.group(match.lastindex or 0).strip()
         return None
\ No newline at end of file
@@ -0,0 +1,211 @@
+import os
+import re
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+SIMHASH_BITS = 64
+# Four 16-bit blocks: two fingerprints within 3 bits of each other share at least one block
+BLOCK_COUNT = 4
+BLOCK_BITS = SIMHASH_BITS // BLOCK_COUNT
+
+# Parsed fields outweigh any single text shingle, so the same order reads alike despite OCR noise
+FIELD_WEIGHT = 8
+# Single words: an OCR misread then changes one feature instead of a run of overlapping shingles
+SHINGLE_SIZE = 1
+
+NORMALIZE_PATTERN = re.compile(r'[^a-z0-9]+')
+
+
+class DuplicateOrderError(ValueError):
+    """Raised when a PO is a likely resend of an order already submitted to the ERP"""
+
+
+@dataclass
+class DuplicateMatch:
+    """An earlier order that the current document likely duplicates"""
+    filename: str
+    sales_order_number: Optional[str]
+    seen_at: str
+    distance: int
+    reason: str
+
+
+def normalize(value: Any) -> str:
+    """Lowercase and collapse punctuation and whitespace"""
+    return NORMALIZE_PATTERN.sub(' ', str(value or '').lower()).strip()
+
+
+def _feature_hashes(features: List[str]) -> np.ndarray:
+    return np.array(
+        [int.from_bytes(hashlib.blake2b(f.encode('utf-8'), digest_size=8).digest(), 'big') for f in features],
+        dtype=np.uint64
+    )
+
+
+def simhash(text: str, fields: Dict[str, Any]) -> int:
+    """64-bit SimHash over words of the text plus weighted parsed fields"""
+    words = normalize(text).split()
+    shingles = [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))]
+    field_features = [f"{name}={normalize(value)}" for name, value in fields.items() if value]
+
+    features = [s for s in shingles if s] + field_features
+    if not features:
+        return 0
+    weights = np.array([1] * (len(features) - len(field_features)) + [FIELD_WEIGHT] * len(field_features))
+
+    # Bit matrix of feature hashes, most significant bit first
+    hashes = _feature_hashes(features)
+    bits = np.unpackbits(hashes.byteswap().view(np.uint8).reshape(-1, 8), axis=1).astype(np.int64)
+    totals = (np.where(bits == 1, 1, -1) * weights[:, None]).sum(axis=0)
+
+    value = 0
+    for bit in totals > 0:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _blocks(value: int) -> List[int]:
+    mask = (1 << BLOCK_BITS) - 1
+    return [(value >> (BLOCK_BITS * i)) & mask for i in range(BLOCK_COUNT)]
+
+
+def _to_signed(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class DuplicateDetector:
+    """SimHash index of submitted orders for spotting resent POs before ERP submission"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        logs_folder = self.config.get('paths.logs_folder', 'logs')
+        self.index_path = self.config.get(
+            'paths.duplicate_index_file', os.path.join(logs_folder, 'duplicate_index.db')
+        )
+        self.window_days = self.config.get('duplicates.window_days', 30)
+        self.max_distance = min(self.config.get('duplicates.max_distance', 3), BLOCK_COUNT - 1)
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._create_schema()
+        self.prune()
+
+    def _create_schema(self):
+        """Create index tables if they do not exist"""
+        block_columns = ''.join(f"block{i} INTEGER NOT NULL, " for i in range(BLOCK_COUNT))
+        block_indexes = ''.join(
+            f"CREATE INDEX IF NOT EXISTS idx_orders_block{i} ON orders(block{i}, customer);" for i in range(BLOCK_COUNT)
+        )
+        self._conn.executescript(f"""
+            CREATE TABLE IF NOT EXISTS orders (
+                order_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                simhash INTEGER NOT NULL,
+                {block_columns}
+                customer TEXT,
+                po_number TEXT,
+                order_date TEXT,
+                item TEXT,
+                quantity TEXT,
+                filename TEXT,
+                sales_order_number TEXT,
+                seen_at TEXT NOT NULL
+            );
+            {block_indexes}
+            CREATE INDEX IF NOT EXISTS idx_orders_po ON orders(customer, po_number);
+            CREATE INDEX IF NOT EXISTS idx_orders_seen ON orders(seen_at);
+        """)
+        self._conn.commit()
+
+    @staticmethod
+    def _fields(order: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            'customer': normalize(order.get('customer_name')),
+            # PO-123, PO 123 and PO123 are the same reference
+            'po_number': normalize(order.get('po_number')).replace(' ', ''),
+            'order_date': normalize(order.get('order_date')),
+            'item': normalize(order.get('item_description')),
+            'quantity': normalize(order.get('quantity'))
+        }
+
+    def check(self, text: str, order: Dict[str, Any]) -> Optional[DuplicateMatch]:
+        """Find a likely earlier submission of a parsed order within the window"""
+        fields = self._fields(order)
+        fingerprint = simhash(text, fields)
+        since = (datetime.now() - timedelta(days=self.window_days)).isoformat(timespec='seconds')
+
+        with self._lock:
+            # Same customer, PO number, item and quantity is a resend whatever the scan looks like
+            if fields['po_number']:
+                row = self._conn.execute(
+                    """SELECT filename, sales_order_number, seen_at FROM orders
+                       WHERE customer = ? AND po_number = ? AND item = ? AND quantity = ? AND seen_at >= ?
+                       ORDER BY order_id DESC LIMIT 1""",
+                    (fields['customer'], fields['po_number'], fields['item'], fields['quantity'], since)
+                ).fetchone()
+                if row:
+                    return DuplicateMatch(row[0], row[1], row[2], 0, 'same customer, PO number, item and quantity')
+
+            # Near-identical text for the same customer: candidates share at least one exact block
+            sql = ' UNION '.join(
+                f"""SELECT simhash, filename, sales_order_number, seen_at, po_number, order_date, item, quantity
+                    FROM orders
+                    WHERE block{i} = ? AND customer = ? AND seen_at >= ?"""
+                for i in range(BLOCK_COUNT)
+            )
+            params = []
+            for block in _blocks(fingerprint):
+                params.extend((block, fields['customer'], since))
+            rows = self._conn.execute(sql, params).fetchall()
+
+        best = None
+        for stored, filename, so_number, seen_at, po_number, order_date, item, quantity in rows:
+            distance = bin((stored & ((1 << 64) - 1)) ^ fingerprint).count('1')
+            # A different quantity or item is a new order even if the page looks the same
+            if distance > self.max_distance or item != fields['item'] or quantity != fields['quantity']:
+                continue
+            # Recurring orders share a template but carry their own PO number and date
+            if self._conflicts(po_number, fields['po_number']) or self._conflicts(order_date, fields['order_date']):
+                continue
+            if best is None or distance < best.distance:
+                best = DuplicateMatch(filename, so_number, seen_at, distance, f"text {distance} bits from earlier PO")
+        return best
+
+    @staticmethod
+    def _conflicts(stored: str, current: str) -> bool:
+        return bool(stored and current and stored != current)
+
+    def register(self, text: str, order: Dict[str, Any], filename: str, sales_order_number: str):
+        """Add a submitted order to the index"""
+        fields = self._fields(order)
+        fingerprint = simhash(text, fields)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"""INSERT INTO orders (simhash, {', '.join(f'block{i}' for i in range(BLOCK_COUNT))},
+                                        customer, po_number, order_date, item, quantity, filename,
+                                        sales_order_number, seen_at)
+                    VALUES ({', '.join('?' for _ in range(BLOCK_COUNT + 9))})""",
+                (_to_signed(fingerprint), *_blocks(fingerprint), fields['customer'], fields['po_number'],
+                 fields['order_date'], fields['item'], fields['quantity'], filename, sales_order_number,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def prune(self) -> int:
+        """Drop orders older than the duplicate window"""
+        cutoff = (datetime.now() - timedelta(days=self.window_days)).isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            removed = self._conn.execute('DELETE FROM orders WHERE seen_at < ?', (cutoff,)).rowcount
+        if removed:
+            self.logger.info("Pruned %s orders outside the %s-day duplicate window", removed, self.window_days)
+        return removed
@@ -1,7 +1,29 @@
 import logging
 import time
+import itertools
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Union
+
+from .order_batch import OrderRecord
+from utils.erp_model import ERPLatencyModel
+from utils.metrics import get_metrics
+from utils.tracing import traced
+
+# Unloaded ERP response time per call, in seconds; erp.operations can reshape them
+DEFAULT_CALL_SECONDS = {
+    'create_sales_order': 2.0,
+    'create_delivery_note': 1.0,
+    'create_invoice': 1.0
+}
+
+# Process-wide document sequence; timestamps alone repeat within a second across concurrent calls
+_document_sequence = itertools.count(1)
+
+
+def _document_number(prefix: str) -> str:
+    """Unique document number in the PREFIX-<timestamp>-<sequence> format"""
+    return f"{prefix}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{next(_document_sequence):06d}"
+
 
 class ERPSimulator:
     """Simulates ERP system operations"""
@@ -9,18 +31,28 @@ class ERPSimulator:
     def __init__(self, config_manager):
         self.config = config_manager
         self.logger = logging.getLogger(__name__)
+        
+        metrics = get_metrics()
+        self.call_latency = metrics.histogram(
+            'rpa_erp_call_seconds', 'ERP call latency by operation', ['operation']
+        )
+        self.calls_total = metrics.counter(
+            'rpa_erp_calls_total', 'ERP calls by operation and status', ['operation', 'status']
+        )
+        self.latency_model = ERPLatencyModel(config_manager)
     
-    def create_sales_order(self, order_data: Dict[str, Any]) -> Dict[str, str]:
-        """Simulate creating a sales order in ERP system"""
+    @traced()
+    def create_sales_order(self, order_data: Union[OrderRecord, Dict[str, Any]]) -> Dict[str, str]:
+        """Simulate creating a sales order in ERP system from an order record or dict"""
+        start = time.perf_counter()
         try:
             self.logger.info("Creating sales order in ERP system...")
             
             # Simulate processing time
-            time.sleep(2)
+            self.latency_model.call('create_sales_order', DEFAULT_CALL_SECONDS['create_sales_order'])
             
             # Generate order numbers
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            so_number = f"SO-{timestamp}"
+            so_number = _document_number('SO')
             
             print(f"🔄 Creating Sales Order...")
             print(f"   Customer: {order_data.get('customer_name', 'Unknown')}")
@@ -29,61 +61,74 @@ class ERPSimulator:
             print(f"   Quantity: {order_data.get('quantity', '1')}")
             print(f"   Sales Order: {so_number}")
             
-            self.logger.info(f"Sales order created: {so_number}")
+            self.logger.info("Sales order created: %s", so_number)
             
+            self._record_call('create_sales_order', start, 'ok')
             return {
                 'sales_order_number': so_number,
                 'status': 'created'
             }
             
         except Exception as e:
-            self.logger.error(f"Error creating sales order: {str(e)}")
+            self.logger.error("Error creating sales order: %s", e)
+            self._record_call('create_sales_order', start, 'error')
             raise
     
+    @traced()
     def create_delivery_note(self, sales_order_number: str) -> Dict[str, str]:
         """Simulate creating delivery note"""
+        start = time.perf_counter()
         try:
             self.logger.info("Creating delivery note...")
             
             # Simulate processing time
-            time.sleep(1)
+            self.latency_model.call('create_delivery_note', DEFAULT_CALL_SECONDS['create_delivery_note'])
             
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            dn_number = f"DN-{timestamp}"
+            dn_number = _document_number('DN')
             
             print(f"📦 Creating Delivery Note: {dn_number}")
             
-            self.logger.info(f"Delivery note created: {dn_number}")
+            self.logger.info("Delivery note created: %s", dn_number)
             
+            self._record_call('create_delivery_note', start, 'ok')
             return {
                 'delivery_note_number': dn_number,
                 'status': 'created'
             }
             
         except Exception as e:
-            self.logger.error(f"Error creating delivery note: {str(e)}")
+            self.logger.error("Error creating delivery note: %s", e)
+            self._record_call('create_delivery_note', start, 'error')
             raise
     
+    @traced()
     def create_invoice(self, delivery_note_number: str) -> Dict[str, str]:
         """Simulate creating invoice"""
+        start = time.perf_counter()
         try:
             self.logger.info("Creating invoice...")
             
             # Simulate processing time
-            time.sleep(1)
+            self.latency_model.call('create_invoice', DEFAULT_CALL_SECONDS['create_invoice'])
             
-            timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-            invoice_number = f"INV-{timestamp}"
+            invoice_number = _document_number('INV')
             
             print(f"🧾 Creating Invoice: {invoice_number}")
             
-            self.logger.info(f"Invoice created: {invoice_number}")
+            self.logger.info("Invoice created: %s", invoice_number)
             
+            self._record_call('create_invoice', start, 'ok')
             return {
                 'invoice_number': invoice_number,
                 'status': 'created'
             }
             
         except Exception as e:
-            self.logger.error(f"Error creating invoice: {str(e)}")
-            raise
\ No newline at end of file
+            self.logger.error("Error creating invoice: %s", e)
+            self._record_call('create_invoice', start, 'error')
+            raise
+    
+    def _record_call(self, operation: str, start: float, status: str):
+        """Record latency and outcome of one ERP call"""
+        self.call_latency.labels(operation=operation).observe(time.perf_counter() - start)
+        self.calls_total.labels(operation=operation, status=status).inc()
\ No newline at end of file
@@ -0,0 +1,263 @@
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from .file_archive import compute_content_hash
+from .processing_journal import STAGES
+
+ERROR_LOG_SUFFIX = '.error.log'
+SKU_ERROR_PATTERN = re.compile(r'SKU mapping not found for item: (.*)')
+
+
+def item_key(description: Optional[str]) -> str:
+    """Case- and whitespace-insensitive key for an item description"""
+    return ' '.join(str(description or '').lower().split())
+
+
+def failing_stage(last_stage: Optional[str]) -> str:
+    """The stage a file was working towards when it failed"""
+    if last_stage not in STAGES:
+        return 'EXTRACTED'
+    return STAGES[min(STAGES.index(last_stage) + 1, len(STAGES) - 1)]
+
+
+@dataclass
+class ExceptionRecord:
+    """A failed input file and the pipeline data saved before it failed"""
+    content_hash: str
+    filename: str
+    stage: str
+    item_key: str
+    customer: str
+    error_message: str
+    archive_entry_id: Optional[int]
+    exception_path: Optional[str]
+    catalog_version: Optional[str]
+    extracted_text: Optional[str]
+    parsed_order: Optional[Dict[str, Any]]
+    failed_at: str
+
+
+class ExceptionIndex:
+    """Open exceptions indexed by failing stage and unmapped description for targeted replay"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        logs_folder = self.config.get('paths.logs_folder', 'logs')
+        self.index_path = self.config.get(
+            'paths.exception_index_file', os.path.join(logs_folder, 'exception_index.db')
+        )
+        self.exceptions_folder = self.config.get('paths.exceptions_folder', 'data/exceptions')
+        # A replay claim older than this is from a crashed run and is reopened
+        self.replay_lease_seconds = self.config.get('exceptions.replay_lease_seconds', 3600)
+
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.index_path) or '.', exist_ok=True)
+        self._conn = sqlite3.connect(self.index_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._create_schema()
+        self._reopen_stale_claims()
+        self._import_error_logs()
+
+    def _create_schema(self):
+        """Create index tables if they do not exist"""
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS exceptions (
+                content_hash TEXT PRIMARY KEY,
+                filename TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                item_key TEXT,
+                customer TEXT,
+                error_message TEXT,
+                archive_entry_id INTEGER,
+                exception_path TEXT,
+                catalog_version TEXT,
+                extracted_text TEXT,
+                parsed_order TEXT,
+                status TEXT NOT NULL,
+                failed_at TEXT NOT NULL,
+                resolved_at TEXT,
+                claimed_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_exceptions_stage ON exceptions(status, stage, catalog_version);
+            CREATE INDEX IF NOT EXISTS idx_exceptions_item ON exceptions(status, item_key);
+            CREATE TABLE IF NOT EXISTS store_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(exceptions)')}
+        if 'claimed_at' not in columns:
+            self._conn.execute('ALTER TABLE exceptions ADD COLUMN claimed_at TEXT')
+        self._conn.commit()
+
+    def record(self, content_hash: str, filename: str, journal_state: Optional[Dict[str, Any]],
+               error_message: str, archive_entry_id: int = None, exception_path: str = None,
+               catalog_version: str = None):
+        """Index a failed file with whatever the journal saved before the failure"""
+        data = (journal_state or {}).get('data', {})
+        stage = failing_stage((journal_state or {}).get('stage'))
+        parsed_order = data.get('parsed_order') or {}
+
+        with self._lock, self._conn:
+            # One row per content; a file that fails again replaces its earlier entry
+            self._conn.execute(
+                """INSERT OR REPLACE INTO exceptions (content_hash, filename, stage, item_key, customer,
+                                                     error_message, archive_entry_id, exception_path,
+                                                     catalog_version, extracted_text, parsed_order,
+                                                     status, failed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 'OPEN', ?)""",
+                (content_hash, filename, stage, item_key(parsed_order.get('item_description')),
+                 parsed_order.get('customer_name'), error_message, archive_entry_id, exception_path,
+                 catalog_version, data.get('extracted_text'),
+                 json.dumps(parsed_order) if parsed_order else None,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def resolve(self, content_hash: str, status: str = 'RESOLVED'):
+        """Close an exception once its file has been processed"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """UPDATE exceptions SET status = ?, resolved_at = ?
+                   WHERE content_hash = ? AND status != ?""",
+                (status, datetime.now().isoformat(timespec='seconds'), content_hash, status)
+            )
+
+    def claim(self, content_hash: str) -> bool:
+        """Mark an open exception as being replayed; False if it is no longer open"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """UPDATE exceptions SET status = 'REPLAYING', claimed_at = ?
+                   WHERE content_hash = ? AND status = 'OPEN'""",
+                (datetime.now().isoformat(timespec='seconds'), content_hash)
+            )
+        return cursor.rowcount == 1
+
+    def release(self, content_hash: str):
+        """Return a claimed exception to the open set"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """UPDATE exceptions SET status = 'OPEN', claimed_at = NULL
+                   WHERE content_hash = ? AND status = 'REPLAYING'""",
+                (content_hash,)
+            )
+
+    def _reopen_stale_claims(self):
+        """Reopen exceptions left in REPLAYING by a run that crashed mid-replay"""
+        cutoff = (datetime.now() - timedelta(seconds=self.replay_lease_seconds)).isoformat(timespec='seconds')
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                """UPDATE exceptions SET status = 'OPEN', claimed_at = NULL
+                   WHERE status = 'REPLAYING' AND (claimed_at IS NULL OR claimed_at < ?)""",
+                (cutoff,)
+            )
+        if cursor.rowcount:
+            self.logger.warning("Reopened %s exceptions stuck in replay", cursor.rowcount)
+
+    def mark_checked(self, content_hashes: List[str], catalog_version: str):
+        """Record that exceptions were checked against a catalog version without a fix"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                'UPDATE exceptions SET catalog_version = ? WHERE content_hash = ?',
+                [(catalog_version, content_hash) for content_hash in content_hashes]
+            )
+
+    def open_exceptions(self, stage: str = None, item: str = None,
+                        stale_for_catalog: str = None) -> List[ExceptionRecord]:
+        """Open exceptions by failing stage and item, optionally only those not yet checked
+        against the given catalog version"""
+        self._reopen_stale_claims()
+        clauses = ["status = 'OPEN'"]
+        params: List[Any] = []
+        if stage:
+            clauses.append('stage = ?')
+            params.append(stage)
+        if item:
+            clauses.append('item_key = ?')
+            params.append(item_key(item))
+        if stale_for_catalog:
+            clauses.append('(catalog_version IS NULL OR catalog_version != ?)')
+            params.append(stale_for_catalog)
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""SELECT content_hash, filename, stage, item_key, customer, error_message,
+                           archive_entry_id, exception_path, catalog_version, extracted_text,
+                           parsed_order, failed_at
+                    FROM exceptions WHERE {' AND '.join(clauses)} ORDER BY failed_at""",
+                params
+            ).fetchall()
+
+        return [
+            ExceptionRecord(*row[:10], json.loads(row[10]) if row[10] else None, row[11])
+            for row in rows
+        ]
+
+    def summary(self) -> List[tuple]:
+        """Open exception counts by failing stage and item"""
+        with self._lock:
+            return self._conn.execute(
+                """SELECT stage, item_key, COUNT(*) FROM exceptions WHERE status = 'OPEN'
+                   GROUP BY stage, item_key ORDER BY COUNT(*) DESC"""
+            ).fetchall()
+
+    def _import_error_logs(self):
+        """Index legacy exception files and their .error.log notes once
+
+        These have no saved parse, so a replay runs them through the whole pipeline.
+        """
+        if not os.path.isdir(self.exceptions_folder):
+            return
+
+        imported = self._conn.execute(
+            "SELECT value FROM store_meta WHERE key = 'error_logs_imported'"
+        ).fetchone()
+        if imported:
+            return
+
+        count = 0
+        for name in os.listdir(self.exceptions_folder):
+            if not name.endswith(ERROR_LOG_SUFFIX):
+                continue
+            exception_path = os.path.join(self.exceptions_folder, name[:-len(ERROR_LOG_SUFFIX)])
+            if not os.path.exists(exception_path):
+                continue
+
+            with open(os.path.join(self.exceptions_folder, name), 'r', errors='replace') as f:
+                error_message = next(
+                    (line[len('Error: '):].strip() for line in f if line.startswith('Error: ')), ''
+                )
+
+            sku_error = SKU_ERROR_PATTERN.search(error_message)
+            with self._conn:
+                self._conn.execute(
+                    """INSERT OR IGNORE INTO exceptions (content_hash, filename, stage, item_key,
+                                                        error_message, exception_path, status, failed_at)
+                       VALUES (?, ?, ?, ?, ?, ?, 'OPEN', ?)""",
+                    (compute_content_hash(exception_path), os.path.basename(exception_path),
+                     'SKU_MAPPED' if sku_error else 'EXTRACTED',
+                     item_key(sku_error.group(1)) if sku_error else '', error_message, exception_path,
+                     datetime.fromtimestamp(os.path.getmtime(exception_path)).isoformat(timespec='seconds'))
+                )
+            count += 1
+
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO store_meta (key, value) VALUES ('error_logs_imported', ?)",
+                (datetime.now().isoformat(timespec='seconds'),)
+            )
+        if count:
+            self.logger.info("Indexed %s legacy exception files", count)
+
+    def close(self):
+        """Close the index connection"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,290 @@
+import os
+import json
+import zlib
+import struct
+import sqlite3
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional
+
+# Segment record layout: magic, header length, payload length, JSON header, zlib payload
+RECORD_MAGIC = b'RPA1'
+RECORD_PREFIX = struct.Struct('>4sII')
+
+
+def compute_content_hash(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Compute SHA-256 of a file's content without loading it fully"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class ArchiveEntry:
+    """Index entry for one archived input file"""
+    entry_id: int
+    filename: str
+    content_hash: str
+    status: str
+    archived_at: str
+    error_message: Optional[str]
+    segment: str
+    offset: int
+    stored_size: int
+    original_size: int
+
+
+class FileArchive:
+    """Packs processed and failed input files into compressed, append-only segments"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        self.archive_folder = self.config.get('paths.archive_folder', 'data/archive')
+        self.segment_max_bytes = int(self.config.get('archive.segment_max_mb', 256) * 1024 * 1024)
+        self.compression_level = self.config.get('archive.compression_level', 6)
+        self.fsync = self.config.get('archive.fsync', True)
+        self.index_path = os.path.join(self.archive_folder, 'archive_index.db')
+
+        self._lock = threading.Lock()
+        os.makedirs(self.archive_folder, exist_ok=True)
+        self._conn = sqlite3.connect(self.index_path, timeout=self.config.get('archive.lock_timeout_seconds', 30),
+                                     check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._create_schema()
+
+    def _create_schema(self):
+        """Create index tables if they do not exist"""
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                entry_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                filename TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                status TEXT NOT NULL,
+                archived_at TEXT NOT NULL,
+                archive_date TEXT NOT NULL,
+                error_message TEXT,
+                segment TEXT NOT NULL,
+                offset INTEGER NOT NULL,
+                stored_size INTEGER NOT NULL,
+                original_size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_filename ON entries(filename);
+            CREATE INDEX IF NOT EXISTS idx_entries_hash ON entries(content_hash);
+            CREATE INDEX IF NOT EXISTS idx_entries_date ON entries(archive_date, status);
+            CREATE INDEX IF NOT EXISTS idx_entries_error ON entries(status, error_message);
+        """)
+        self._conn.commit()
+
+    def archive_file(self, file_path: str, status: str, error_message: str = None) -> int:
+        """Append file to the current segment, index it and remove the original"""
+        filename = os.path.basename(file_path)
+        with open(file_path, 'rb') as f:
+            content = f.read()
+
+        content_hash = hashlib.sha256(content).hexdigest()
+        archived_at = datetime.now()
+
+        with self._lock:
+            # The index write lock, taken up front, also serializes segment appends across processes
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                # Identical content is stored once; further entries point at the same record
+                existing = self._conn.execute(
+                    'SELECT segment, offset, stored_size FROM entries WHERE content_hash = ? LIMIT 1',
+                    (content_hash,)
+                ).fetchone()
+
+                if existing:
+                    segment, offset, stored_size = existing
+                else:
+                    segment, offset, stored_size = self._append_record(
+                        filename, content_hash, status, archived_at, content
+                    )
+
+                cursor = self._conn.execute(
+                    """INSERT INTO entries (filename, content_hash, status, archived_at, archive_date,
+                                            error_message, segment, offset, stored_size, original_size)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                    (filename, content_hash, status, archived_at.isoformat(timespec='seconds'),
+                     archived_at.strftime('%Y-%m-%d'), error_message, segment, offset,
+                     stored_size, len(content))
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+            entry_id = cursor.lastrowid
+
+        os.remove(file_path)
+        self.logger.info("Archived %s as entry %s (%s) in %s", filename, entry_id, status, segment)
+        return entry_id
+
+    def _append_record(self, filename: str, content_hash: str, status: str,
+                       archived_at: datetime, content: bytes):
+        """Write one compressed record to the active segment"""
+        header = json.dumps({
+            'filename': filename,
+            'content_hash': content_hash,
+            'status': status,
+            'archived_at': archived_at.isoformat(timespec='seconds')
+        }).encode('utf-8')
+        payload = zlib.compress(content, self.compression_level)
+
+        segment = self._active_segment()
+        segment_path = os.path.join(self.archive_folder, segment)
+
+        with open(segment_path, 'ab') as f:
+            offset = f.tell()
+            f.write(RECORD_PREFIX.pack(RECORD_MAGIC, len(header), len(payload)))
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+
+        return segment, offset, RECORD_PREFIX.size + len(header) + len(payload)
+
+    def _active_segment(self) -> str:
+        """Return the segment to append to, rolling over when it is full"""
+        segments = self._list_segments()
+        if segments:
+            latest = segments[-1]
+            if os.path.getsize(os.path.join(self.archive_folder, latest)) < self.segment_max_bytes:
+                return latest
+            number = int(latest.split('_')[1].split('.')[0]) + 1
+        else:
+            number = 1
+        return f"segment_{number:06d}.seg"
+
+    def _list_segments(self) -> List[str]:
+        """List segment files in append order"""
+        return sorted(
+            name for name in os.listdir(self.archive_folder)
+            if name.startswith('segment_') and name.endswith('.seg')
+        )
+
+    def _query(self, where: str = '', params: tuple = (), limit: int = 100,
+               offset: int = 0) -> List[ArchiveEntry]:
+        """Run an index query and map rows to entries"""
+        sql = """SELECT entry_id, filename, content_hash, status, archived_at, error_message,
+                        segment, offset, stored_size, original_size FROM entries"""
+        if where:
+            sql += f" WHERE {where}"
+        sql += " ORDER BY entry_id DESC LIMIT ? OFFSET ?"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params + (limit, offset)).fetchall()
+        return [ArchiveEntry(*row) for row in rows]
+
+    def find_by_filename(self, filename: str) -> List[ArchiveEntry]:
+        """Look up archived entries by original filename"""
+        return self._query('filename = ?', (filename,))
+
+    def find_by_hash(self, content_hash: str) -> List[ArchiveEntry]:
+        """Look up archived entries by content hash"""
+        return self._query('content_hash = ?', (content_hash,))
+
+    def list_entries(self, status: str = None, date_from: str = None, date_to: str = None,
+                     error_contains: str = None, limit: int = 100, offset: int = 0) -> List[ArchiveEntry]:
+        """List entries filtered by status, archive date range (YYYY-MM-DD) and error text"""
+        clauses = []
+        params = []
+
+        if date_from:
+            clauses.append('archive_date >= ?')
+            params.append(date_from)
+        if date_to:
+            clauses.append('archive_date <= ?')
+            params.append(date_to)
+        if status:
+            clauses.append('status = ?')
+            params.append(status)
+        if error_contains:
+            clauses.append('error_message LIKE ?')
+            params.append(f"%{error_contains}%")
+
+        return self._query(' AND '.join(clauses), tuple(params), limit, offset)
+
+    def get_entry(self, entry_id: int) -> Optional[ArchiveEntry]:
+        """Get a single entry by ID"""
+        entries = self._query('entry_id = ?', (entry_id,), limit=1)
+        return entries[0] if entries else None
+
+    def read_content(self, entry_id: int) -> bytes:
+        """Read and decompress the original file content of an entry"""
+        entry = self.get_entry(entry_id)
+        if entry is None:
+            raise KeyError(f"Archive entry not found: {entry_id}")
+
+        with open(os.path.join(self.archive_folder, entry.segment), 'rb') as f:
+            f.seek(entry.offset)
+            magic, header_len, payload_len = RECORD_PREFIX.unpack(f.read(RECORD_PREFIX.size))
+            if magic != RECORD_MAGIC:
+                raise ValueError(f"Corrupt archive record at {entry.segment}:{entry.offset}")
+            f.seek(header_len, os.SEEK_CUR)
+            return zlib.decompress(f.read(payload_len))
+
+    def restore(self, entry_id: int, destination_folder: str) -> str:
+        """Write an archived file back to a folder, e.g. the input folder for reprocessing"""
+        entry = self.get_entry(entry_id)
+        if entry is None:
+            raise KeyError(f"Archive entry not found: {entry_id}")
+
+        os.makedirs(destination_folder, exist_ok=True)
+        destination = os.path.join(destination_folder, entry.filename)
+        with open(destination, 'wb') as f:
+            f.write(self.read_content(entry_id))
+
+        self.logger.info("Restored archive entry %s to %s", entry_id, destination)
+        return destination
+
+    def rebuild_index(self) -> int:
+        """Rebuild the index by scanning all segments (error messages are not recoverable)"""
+        count = 0
+        with self._lock:
+            self._conn.execute('DELETE FROM entries')
+            for segment in self._list_segments():
+                segment_path = os.path.join(self.archive_folder, segment)
+                with open(segment_path, 'rb') as f:
+                    while True:
+                        offset = f.tell()
+                        prefix = f.read(RECORD_PREFIX.size)
+                        if len(prefix) < RECORD_PREFIX.size:
+                            break
+                        magic, header_len, payload_len = RECORD_PREFIX.unpack(prefix)
+                        if magic != RECORD_MAGIC:
+                            self.logger.warning("Stopping scan of %s at corrupt offset %s", segment, offset)
+                            break
+                        header = json.loads(f.read(header_len).decode('utf-8'))
+                        payload = f.read(payload_len)
+                        if len(payload) < payload_len:
+                            self.logger.warning("Truncated record in %s at offset %s", segment, offset)
+                            break
+
+                        self._conn.execute(
+                            """INSERT INTO entries (filename, content_hash, status, archived_at,
+                                                    archive_date, error_message, segment, offset,
+                                                    stored_size, original_size)
+                               VALUES (?, ?, ?, ?, ?, NULL, ?, ?, ?, ?)""",
+                            (header['filename'], header['content_hash'], header['status'],
+                             header['archived_at'], header['archived_at'][:10], segment, offset,
+                             RECORD_PREFIX.size + header_len + payload_len,
+                             len(zlib.decompress(payload)))
+                        )
+                        count += 1
+            self._conn.commit()
+
+        self.logger.info("Rebuilt archive index with %s entries", count)
+        return count
+
+    def close(self):
+        """Close the index connection"""
+        with self._lock:
+            self._conn.close()
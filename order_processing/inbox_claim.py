@@ -0,0 +1,201 @@
+import os
+import json
+import time
+import socket
+import shutil
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from .processing_journal import STAGES
+
+LEASE_FILE = 'lease.json'
+RECOVERING_PREFIX = '.recovering-'
+
+# A file that reached this stage has ERP documents; reprocessing it elsewhere would duplicate them
+SIDE_EFFECT_STAGE = 'SALES_ORDER_CREATED'
+
+
+class InboxClaimer:
+    """Claims input files for one worker by atomic rename into its own claim directory
+
+    Each worker renews a lease file from a heartbeat thread. Workers whose lease has
+    expired are considered dead and their claimed files are recovered by a live worker.
+    """
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        input_folder = self.config.get('paths.input_folder', 'data/input')
+        # Claims must live on the same filesystem as the inbox for rename to be atomic
+        self.claims_folder = self.config.get('paths.claims_folder') or os.path.join(input_folder, '.claims')
+        self.worker_id = self.config.get('cluster.worker_id') or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = self.config.get('cluster.lease_seconds', 120)
+        self.heartbeat_seconds = self.config.get('cluster.heartbeat_seconds', 30)
+
+        self.worker_folder = os.path.join(self.claims_folder, self.worker_id)
+        self.lease_path = os.path.join(self.worker_folder, LEASE_FILE)
+
+        self._lock = threading.Lock()
+        self._progress: Dict[str, str] = {}
+        self._hashes: Dict[str, str] = {}
+        self._stop_event = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    def start(self):
+        """Create the claim directory, write the lease and start heartbeating"""
+        os.makedirs(self.worker_folder, exist_ok=True)
+        self._write_lease()
+        self._stop_event.clear()
+        self._heartbeat = threading.Thread(target=self._heartbeat_loop, name='inbox-lease', daemon=True)
+        self._heartbeat.start()
+        self.logger.info("Worker %s holding inbox lease in %s", self.worker_id, self.worker_folder)
+
+    def stop(self):
+        """Stop heartbeating and give up the lease; unfinished claims stay for recovery"""
+        self._stop_event.set()
+        if self._heartbeat is not None:
+            self._heartbeat.join(timeout=5)
+            self._heartbeat = None
+
+        if self.claimed_files():
+            self.logger.warning("Worker %s stopping with claimed files; they will be recovered", self.worker_id)
+            return
+        shutil.rmtree(self.worker_folder, ignore_errors=True)
+
+    def _heartbeat_loop(self):
+        while not self._stop_event.wait(self.heartbeat_seconds):
+            try:
+                self._write_lease()
+            except OSError as e:
+                self.logger.error("Could not renew inbox lease: %s", e)
+
+    def _write_lease(self):
+        """Write lease metadata and per-file progress atomically; its mtime is the heartbeat"""
+        with self._lock:
+            lease = {
+                'worker_id': self.worker_id,
+                'host': socket.gethostname(),
+                'pid': os.getpid(),
+                'lease_seconds': self.lease_seconds,
+                'progress': dict(self._progress)
+            }
+        temp_path = f"{self.lease_path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(lease, f)
+        os.replace(temp_path, self.lease_path)
+
+    def claim(self, file_path: str) -> Optional[str]:
+        """Move a file from the inbox into this worker's claim directory; None if another worker won"""
+        claimed_path = self._free_path(os.path.basename(file_path))
+        try:
+            os.rename(file_path, claimed_path)
+        except FileNotFoundError:
+            return None
+        return claimed_path
+
+    def _free_path(self, name: str) -> str:
+        """Path in the claim directory that does not replace a file this worker already holds"""
+        # Only this worker writes into its folder, so checking before the rename is race-free
+        claimed_path = os.path.join(self.worker_folder, name)
+        stem, extension = os.path.splitext(name)
+        suffix = 1
+        while os.path.exists(claimed_path):
+            claimed_path = os.path.join(self.worker_folder, f"{stem}_{suffix}{extension}")
+            suffix += 1
+        return claimed_path
+
+    def claimed_files(self) -> List[str]:
+        """Files currently held in this worker's claim directory"""
+        if not os.path.isdir(self.worker_folder):
+            return []
+        return [
+            os.path.join(self.worker_folder, name) for name in os.listdir(self.worker_folder)
+            if name != LEASE_FILE and not name.endswith('.tmp')
+        ]
+
+    def track(self, file_path: str, content_hash: str, stage: Optional[str]):
+        """Start recording pipeline progress for a claimed file"""
+        with self._lock:
+            self._hashes[content_hash] = os.path.basename(file_path)
+            self._progress[os.path.basename(file_path)] = stage or 'STARTED'
+
+    def on_stage(self, content_hash: str, stage: str):
+        """Journal listener: persist progress immediately once ERP side effects exist"""
+        with self._lock:
+            filename = self._hashes.get(content_hash)
+            if filename is None:
+                return
+            if stage == 'COMPLETED':
+                self._progress.pop(filename, None)
+                self._hashes.pop(content_hash, None)
+            else:
+                self._progress[filename] = stage
+
+        if stage in STAGES and STAGES.index(stage) >= STAGES.index(SIDE_EFFECT_STAGE):
+            self._write_lease()
+
+    def recover_expired(self) -> Tuple[List[str], List[Tuple[str, str]]]:
+        """Take over files held by workers with expired leases
+
+        Returns files safe to reprocess, and (file, reason) pairs for files whose ERP
+        documents may already exist and need review instead.
+        """
+        if not os.path.isdir(self.claims_folder):
+            return [], []
+
+        reprocess: List[str] = []
+        review: List[Tuple[str, str]] = []
+        now = time.time()
+
+        for worker_id in os.listdir(self.claims_folder):
+            folder = os.path.join(self.claims_folder, worker_id)
+            if worker_id == self.worker_id or not os.path.isdir(folder):
+                continue
+
+            lease_path = os.path.join(folder, LEASE_FILE)
+            if worker_id.startswith(RECOVERING_PREFIX):
+                # Left behind by a worker that died while recovering; the rename set its ctime
+                heartbeat = os.stat(folder).st_ctime
+            elif os.path.exists(lease_path):
+                heartbeat = os.path.getmtime(lease_path)
+            else:
+                heartbeat = os.path.getmtime(folder)
+            if now - heartbeat <= self.lease_seconds:
+                continue
+
+            # Renaming the dead worker's folder is the recovery lock; only one live worker wins
+            recovering = os.path.join(self.claims_folder, f"{RECOVERING_PREFIX}{worker_id}-{self.worker_id}")
+            try:
+                os.rename(folder, recovering)
+            except (FileNotFoundError, OSError):
+                continue
+
+            progress = self._read_progress(os.path.join(recovering, LEASE_FILE))
+            for name in os.listdir(recovering):
+                if name == LEASE_FILE or name.endswith('.tmp'):
+                    continue
+                claimed_path = self._free_path(name)
+                os.rename(os.path.join(recovering, name), claimed_path)
+
+                stage = progress.get(name)
+                if stage in STAGES and STAGES.index(stage) >= STAGES.index(SIDE_EFFECT_STAGE):
+                    review.append((claimed_path, f"Recovered from dead worker {worker_id} after {stage}; "
+                                                 f"ERP documents may already exist"))
+                else:
+                    reprocess.append(claimed_path)
+
+            shutil.rmtree(recovering, ignore_errors=True)
+            self.logger.warning("Recovered files from expired worker %s", worker_id)
+
+        if reprocess or review:
+            self.logger.info("Recovered %s files to reprocess, %s for review", len(reprocess), len(review))
+        return reprocess, review
+
+    def _read_progress(self, lease_path: str) -> Dict[str, str]:
+        try:
+            with open(lease_path, 'r') as f:
+                return json.load(f).get('progress', {})
+        except (OSError, json.JSONDecodeError):
+            return {}
@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import cv2
+import numpy as np
+
+# Fields a template locates: the label the synthesized text uses, how to recognize a printed
+# label, and Tesseract settings per field. Fields with 'value_only' learn a region that starts
+# at the value, so a restrictive whitelist never has to read the printed label
+TEMPLATE_FIELDS = {
+    'customer': {
+        'label': 'Customer',
+        'label_pattern': re.compile(r'(?i)\b(customer|client|company|bill\s+to|sold\s+to)\b'),
+        'config': '--psm 7'
+    },
+    'item': {
+        'label': 'Item',
+        'label_pattern': re.compile(r'(?i)\b(item|description|product)\b'),
+        'config': '--psm 7'
+    },
+    'quantity': {
+        'label': 'Quantity',
+        'label_pattern': re.compile(r'(?i)\b(qty|quantity)\b'),
+        'config': '--psm 7 -c tessedit_char_whitelist=0123456789',
+        'value_only': True
+    },
+    'po_number': {
+        'label': 'PO Number',
+        'label_pattern': re.compile(r'(?i)\b(po|purchase\s+order|order\s+number)\b'),
+        'config': '--psm 7'
+    },
+    'price': {
+        'label': 'Price',
+        'label_pattern': re.compile(r'(?i)\b(price|amount|total)\b'),
+        'config': '--psm 7'
+    },
+    'order_date': {
+        'label': 'Order Date',
+        'label_pattern': re.compile(r'(?i)\bdate\b'),
+        'config': '--psm 7'
+    }
+}
+
+# Bumped when TEMPLATE_FIELDS changes in a way saved templates must relearn
+TEMPLATE_VERSION = 2
+
+SIGNATURE_SIZE = 16
+
+
+def layout_signature(gray: np.ndarray) -> str:
+    """Average hash of a heavily downscaled page; captures layout, not text"""
+    small = cv2.resize(cv2.GaussianBlur(gray, (9, 9), 0), (SIGNATURE_SIZE, SIGNATURE_SIZE),
+                       interpolation=cv2.INTER_AREA)
+    bits = (small > small.mean()).flatten()
+    return ''.join('1' if bit else '0' for bit in bits)
+
+
+def signature_distance(a: str, b: str) -> int:
+    """Hamming distance between two signatures"""
+    return sum(x != y for x, y in zip(a, b))
+
+
+class LayoutTemplateStore:
+    """Learned per-customer field regions, matched by page layout signature"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        self.templates_file = self.config.get('paths.layout_templates_file', 'config/layout_templates.json')
+        self.enabled = self.config.get('ocr_templates.enabled', True)
+        self.max_distance = self.config.get('ocr_templates.max_signature_distance', 24)
+        self.min_samples = self.config.get('ocr_templates.min_samples', 2)
+
+        self._lock = threading.Lock()
+        self.templates: List[Dict] = self._load()
+
+    def _load(self) -> List[Dict]:
+        if not os.path.exists(self.templates_file):
+            return []
+        try:
+            with open(self.templates_file, 'r') as f:
+                templates = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            self.logger.warning("Could not load layout templates: %s", e)
+            return []
+
+        # Older templates hold label boxes for value-only fields and lack the price and date
+        # regions; they go back to learning so a match never drops fields a full read found
+        for template in templates:
+            if template.get('version', 1) < TEMPLATE_VERSION:
+                for field, settings in TEMPLATE_FIELDS.items():
+                    if settings.get('value_only'):
+                        template['fields'].pop(field, None)
+                template.pop('value_regions', None)
+                template['samples'] = 0
+                template['version'] = TEMPLATE_VERSION
+        return templates
+
+    def save(self):
+        """Persist templates atomically"""
+        os.makedirs(os.path.dirname(self.templates_file) or '.', exist_ok=True)
+        temp_file = f"{self.templates_file}.tmp"
+        with self._lock:
+            with open(temp_file, 'w') as f:
+                json.dump(self.templates, f, indent=2)
+        os.replace(temp_file, self.templates_file)
+
+    def _nearest(self, signature: str, customer: str = None) -> Optional[Dict]:
+        """Closest template within the distance limit, optionally for one customer"""
+        best, best_distance = None, self.max_distance + 1
+        for template in self.templates:
+            if customer is not None and template['customer'] != customer:
+                continue
+            distance = signature_distance(signature, template['signature'])
+            if distance < best_distance:
+                best, best_distance = template, distance
+        return best
+
+    def match(self, signature: str) -> Optional[Dict]:
+        """Template for a page layout, once it has been confirmed by enough samples"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            template = self._nearest(signature)
+        if template and template['samples'] >= self.min_samples:
+            return template
+        return None
+
+    def learn(self, customer: str, signature: str, page_size: tuple, field_boxes: Dict[str, List[int]]):
+        """Fold field boxes from a successfully processed PO into the customer's template"""
+        if not self.enabled or not field_boxes:
+            return
+
+        height, width = page_size
+        relative = {
+            field: [box[0] / width, box[1] / height, box[2] / width, box[3] / height]
+            for field, box in field_boxes.items()
+        }
+
+        with self._lock:
+            template = self._nearest(signature, customer)
+            if template is None:
+                self.templates.append({
+                    'customer': customer,
+                    'signature': signature,
+                    'samples': 1,
+                    'fields': relative,
+                    'version': TEMPLATE_VERSION
+                })
+                self.logger.info("New layout template started for %s", customer)
+            else:
+                # Union of boxes, so longer values on later POs still fit their region
+                for field, box in relative.items():
+                    previous = template['fields'].get(field)
+                    template['fields'][field] = box if previous is None else [
+                        min(previous[0], box[0]), min(previous[1], box[1]),
+                        max(previous[2], box[2]), max(previous[3], box[3])
+                    ]
+                template['samples'] += 1
+
+        self.save()
+
+    @staticmethod
+    def region(template: Dict, field: str, page_size: tuple, pad: float = 0.01) -> Optional[tuple]:
+        """Pixel box (left, top, right, bottom) of a template field on a page"""
+        box = template['fields'].get(field)
+        if box is None:
+            return None
+        height, width = page_size
+        left = max(int((box[0] - pad) * width), 0)
+        top = max(int((box[1] - pad) * height), 0)
+        right = min(int((box[2] + pad) * width), width)
+        bottom = min(int((box[3] + pad) * height), height)
+        return left, top, right, bottom
@@ -1,14 +1,27 @@
 import os
+import time
 import shutil
 import logging
+from contextlib import contextmanager
+from dataclasses import asdict
 from datetime import datetime
-from typing import List
+from typing import List, Dict, Tuple
 
 from .text_extractor import TextExtractor
-from .data_parser import DataParser
-from .sku_mapper import SKUMapper
+from .data_parser import DataParser, ParsedOrder
+from .sku_maper import SKUMapper
 from .erp_simulator import ERPSimulator
+from .file_archive import FileArchive
+from .processing_journal import ProcessingJournal
+from .scheduler import CostAwareScheduler
+from .inbox_claim import InboxClaimer
+from .duplicate_detector import DuplicateDetector, DuplicateOrderError
+from .exception_index import ExceptionIndex, ERROR_LOG_SUFFIX
+from .order_batch import OrderRecord, OrderBatch
 from utils.email_sender import EmailSender
+from utils.metrics import get_metrics, export_metrics
+from utils.profiler import StageProfiler
+from utils.tracing import get_tracer, span
 
 class OrderProcessor:
     """Main order processing workflow"""
@@ -28,6 +41,38 @@ class OrderProcessor:
         self.input_folder = self.config.get('paths.input_folder', 'data/input')
         self.processed_folder = self.config.get('paths.processed_folder', 'data/processed')
         self.exceptions_folder = self.config.get('paths.exceptions_folder', 'data/exceptions')
+        
+        # Segmented archive replaces the flat processed/exceptions folders when enabled
+        self.archive = FileArchive(config_manager) if self.config.get('archive.enabled', True) else None
+        self.journal = ProcessingJournal(config_manager)
+        self.scheduler = CostAwareScheduler(config_manager)
+        self.exception_index = ExceptionIndex(config_manager)
+        self.replay_folder = self.config.get('paths.replay_folder', 'data/replay')
+        self.duplicate_detector = (
+            DuplicateDetector(config_manager) if self.config.get('duplicates.enabled', True) else None
+        )
+        
+        # Several hosts can share one inbox; each claims files by atomic rename before processing
+        self.claimer = InboxClaimer(config_manager) if self.config.get('cluster.enabled', False) else None
+        if self.claimer:
+            self.journal.add_listener(self.claimer.on_stage)
+        self._stage_timings: Dict[str, float] = {}
+        # Orders completed in this run, kept columnar for the summary and reporting
+        self.processed_orders = OrderBatch()
+        self.profiler = StageProfiler(config_manager, 'order_processing')
+        self.tracer = get_tracer()
+        
+        metrics = get_metrics()
+        self.stage_latency = metrics.histogram(
+            'rpa_order_stage_seconds', 'Order pipeline stage latency', ['stage']
+        )
+        self.files_total = metrics.counter(
+            'rpa_order_files_total', 'Input files handled by outcome', ['outcome']
+        )
+        self.queue_depth = metrics.gauge('rpa_order_queue_depth', 'Files waiting in the input queue')
+        self.replays_total = metrics.counter(
+            'rpa_exception_replays_total', 'Exception replays by failing stage and result', ['stage', 'result']
+        )
     
     def run(self):
         """Execute the order processing workflow"""
@@ -36,6 +81,20 @@ class OrderProcessor:
         print("=" * 50)
         
         try:
+            review_files = []
+            if self.claimer:
+                self.claimer.start()
+                _, review_files = self.claimer.recover_expired()
+            
+            # Recovered files whose ERP documents may exist go to exceptions for review
+            for file_path, reason in review_files:
+                print(f"⚠️ {os.path.basename(file_path)}: {reason}")
+                self._move_to_exceptions(file_path, reason)
+            
+            # A changed SKU catalog may fix earlier mapping failures; replay only those
+            if self.config.get('exceptions.replay_on_catalog_change', True):
+                self.replay_exceptions()
+            
             # Get files to process
             files_to_process = self._get_files_to_process()
             
@@ -45,12 +104,20 @@ class OrderProcessor:
                 return
             
             print(f"📄 Found {len(files_to_process)} files to process")
+            self.queue_depth.set(len(files_to_process))
             
             # Process each file
             processed_count = 0
             exception_count = 0
             
             for file_path in files_to_process:
+                if self.claimer:
+                    claimed_path = self._claim(file_path)
+                    if claimed_path is None:
+                        self.queue_depth.dec()
+                        continue
+                    file_path = claimed_path
+                
                 try:
                     print(f"\n📋 Processing: {os.path.basename(file_path)}")
                     success = self._process_single_file(file_path)
@@ -59,11 +126,18 @@ class OrderProcessor:
                         processed_count += 1
                     else:
                         exception_count += 1
+                    self.files_total.labels(outcome='processed' if success else 'exception').inc()
                         
                 except Exception as e:
-                    self.logger.error(f"Error processing {file_path}: {str(e)}")
+                    self.logger.error("Error processing %s: %s", file_path, e)
                     self._move_to_exceptions(file_path, str(e))
                     exception_count += 1
+                    self.files_total.labels(outcome='exception').inc()
+                
+                self.queue_depth.dec()
+            
+            self.journal.compact()
+            self.scheduler.save_stats()
             
             # Send completion summary
             self._send_completion_summary(processed_count, exception_count)
@@ -73,8 +147,15 @@ class OrderProcessor:
             print(f"   Exceptions: {exception_count}")
             
         except Exception as e:
-            self.logger.error(f"Error in order processing workflow: {str(e)}")
+            self.logger.error("Error in order processing workflow: %s", e)
             print(f"❌ Error: {str(e)}")
+        
+        finally:
+            self.journal.flush()
+            if self.claimer:
+                self.claimer.stop()
+            export_metrics(self.config)
+            self.profiler.write_reports()
     
     def _get_files_to_process(self) -> List[str]:
         """Get list of files to process from input folder"""
@@ -92,76 +173,282 @@ class OrderProcessor:
                 if file_ext in supported_formats:
                     files.append(file_path)
         
-        return files
+        # Files this worker already holds (its own leftovers and recovered ones) are queued too
+        if self.claimer:
+            files.extend(self.claimer.claimed_files())
+        
+        # Shortest expected job first, with aging so large scans are not starved
+        return self.scheduler.schedule(files)
+    
+    def _claim(self, file_path: str):
+        """Claim an inbox file for this worker; None if another worker took it first"""
+        if os.path.dirname(file_path) == self.claimer.worker_folder:
+            return file_path
+        
+        claimed_path = self.claimer.claim(file_path)
+        if claimed_path is None:
+            print(f"\n⏭️ Skipping {os.path.basename(file_path)}: claimed by another worker")
+            self.scheduler.forget(file_path)
+            return None
+        self.scheduler.rename(file_path, claimed_path)
+        return claimed_path
     
     def _process_single_file(self, file_path: str) -> bool:
-        """Process a single file through the complete workflow"""
+        """Process a single file through the complete workflow as one trace"""
+        with self.tracer.trace('order_file', file=os.path.basename(file_path)) as root:
+            success = self._run_pipeline(file_path)
+            if root:
+                root.set('outcome', 'processed' if success else 'exception')
+            return success
+    
+    def _run_pipeline(self, file_path: str) -> bool:
+        """Run a file through every stage, resuming from the journal"""
+        content_hash = None
+        self._stage_timings = {}
+        self.profiler.begin_unit()
         try:
-            # Step 1: Extract text
-            print("   🔍 Extracting text...")
-            extracted_text = self.text_extractor.extract_from_file(file_path)
+            # Resume from the last journaled stage if an earlier run crashed mid-file
+            content_hash = self.journal.begin(file_path)
+            journal = self.journal
+            if self.claimer:
+                state = journal.get_state(content_hash)
+                self.claimer.track(file_path, content_hash, state['stage'] if state else None)
             
-            if not extracted_text.strip():
-                raise ValueError("No text could be extracted from the file")
+            # Step 1: Extract text
+            if journal.has_reached(content_hash, 'EXTRACTED'):
+                print("   ♻️ Reusing extracted text from journal")
+                extracted_text = journal.get_data(content_hash, 'extracted_text')
+            else:
+                print("   🔍 Extracting text...")
+                with self._stage('extraction'):
+                    extracted_text = self.text_extractor.extract_from_file(file_path)
+                
+                if not extracted_text.strip():
+                    raise ValueError("No text could be extracted from the file")
+                journal.record(content_hash, 'EXTRACTED', {'extracted_text': extracted_text})
             
             # Step 2: Parse data
-            print("   📊 Parsing order data...")
-            parsed_order = self.data_parser.parse_text(extracted_text)
+            if journal.has_reached(content_hash, 'PARSED'):
+                parsed_order = ParsedOrder(**journal.get_data(content_hash, 'parsed_order'))
+            else:
+                print("   📊 Parsing order data...")
+                with self._stage('parsing'):
+                    parsed_order = self.data_parser.parse_text(extracted_text)
+                journal.record(content_hash, 'PARSED', {'parsed_order': asdict(parsed_order)})
             
             # Step 3: Map SKU
-            print("   🔗 Mapping SKU...")
-            sku, sku_found = self.sku_mapper.map_item_to_sku(
-                parsed_order.item_description, 
-                parsed_order.customer_name
-            )
-            
-            if not sku_found:
-                raise ValueError(f"SKU mapping not found for item: {parsed_order.item_description}")
+            if journal.has_reached(content_hash, 'SKU_MAPPED'):
+                sku = journal.get_data(content_hash, 'sku')
+            else:
+                print("   🔗 Mapping SKU...")
+                with self._stage('sku_mapping'):
+                    sku, sku_found = self.sku_mapper.map_item_to_sku(
+                        parsed_order.item_description, 
+                        parsed_order.customer_name
+                    )
+                
+                if not sku_found:
+                    raise ValueError(f"SKU mapping not found for item: {parsed_order.item_description}")
+                journal.record(content_hash, 'SKU_MAPPED', {'sku': sku})
             
             # Step 4: Create ERP entries
             print("   💼 Creating ERP entries...")
-            order_data = {
-                'customer_name': parsed_order.customer_name,
-                'item_description': parsed_order.item_description,
-                'sku': sku,
-                'quantity': parsed_order.quantity,
-                'price': parsed_order.price
-            }
+            order = OrderRecord.from_parsed(parsed_order, sku)
             
             # Create sales order
-            so_result = self.erp_simulator.create_sales_order(order_data)
+            if journal.has_reached(content_hash, 'SALES_ORDER_CREATED'):
+                so_result = journal.get_data(content_hash, 'so_result')
+                print(f"   ♻️ Sales order already created: {so_result['sales_order_number']}")
+            else:
+                # Resent POs are diverted before any ERP document exists for them
+                if self.duplicate_detector:
+                    with self._stage('duplicate_check'):
+                        match = self.duplicate_detector.check(extracted_text, asdict(parsed_order))
+                    if match:
+                        raise DuplicateOrderError(
+                            f"Likely duplicate of {match.filename} ({match.sales_order_number}, "
+                            f"{match.seen_at}): {match.reason}"
+                        )
+                
+                with self._stage('erp_sales_order'):
+                    so_result = self.erp_simulator.create_sales_order(order)
+                journal.record(content_hash, 'SALES_ORDER_CREATED', {'so_result': so_result})
+                if self.duplicate_detector:
+                    self.duplicate_detector.register(
+                        extracted_text, asdict(parsed_order), os.path.basename(file_path),
+                        so_result['sales_order_number']
+                    )
             
             # Create delivery note
-            dn_result = self.erp_simulator.create_delivery_note(so_result['sales_order_number'])
+            if journal.has_reached(content_hash, 'DELIVERY_NOTE_CREATED'):
+                dn_result = journal.get_data(content_hash, 'dn_result')
+                print(f"   ♻️ Delivery note already created: {dn_result['delivery_note_number']}")
+            else:
+                with self._stage('erp_delivery_note'):
+                    dn_result = self.erp_simulator.create_delivery_note(so_result['sales_order_number'])
+                journal.record(content_hash, 'DELIVERY_NOTE_CREATED', {'dn_result': dn_result})
             
             # Create invoice
-            inv_result = self.erp_simulator.create_invoice(dn_result['delivery_note_number'])
+            if journal.has_reached(content_hash, 'INVOICE_CREATED'):
+                inv_result = journal.get_data(content_hash, 'inv_result')
+                print(f"   ♻️ Invoice already created: {inv_result['invoice_number']}")
+            else:
+                with self._stage('erp_invoice'):
+                    inv_result = self.erp_simulator.create_invoice(dn_result['delivery_note_number'])
+                journal.record(content_hash, 'INVOICE_CREATED', {'inv_result': inv_result})
             
             # Step 5: Send notification to store
-            self._send_store_notification(order_data, so_result, dn_result, inv_result)
+            if not journal.has_reached(content_hash, 'NOTIFIED'):
+                with self._stage('notification'):
+                    self._send_store_notification(order, so_result, dn_result, inv_result)
+                journal.record(content_hash, 'NOTIFIED')
             
             # Step 6: Move file to processed folder
-            self._move_to_processed(file_path)
+            self.text_extractor.learn_layout(file_path, parsed_order)
+            self.scheduler.record_timings(file_path, self._stage_timings)
+            with self._stage('archive'):
+                self._move_to_processed(file_path)
+            journal.complete(content_hash, 'processed')
+            self.exception_index.resolve(content_hash)
+            self.processed_orders.append(order)
             
             print("   ✅ Processing completed successfully")
             return True
             
         except Exception as e:
-            self.logger.error(f"Error processing file {file_path}: {str(e)}")
+            self.logger.error("Error processing file %s: %s", file_path, e)
             print(f"   ❌ Error: {str(e)}")
-            self._move_to_exceptions(file_path, str(e))
+            self.scheduler.forget(file_path)
+            location = self._move_to_exceptions(file_path, str(e))
+            
+            if content_hash:
+                # Index the failure with the saved extraction and parse so it can be replayed later
+                self.exception_index.record(
+                    content_hash, os.path.basename(file_path), self.journal.get_state(content_hash), str(e),
+                    archive_entry_id=location if self.archive else None,
+                    exception_path=None if self.archive else location,
+                    catalog_version=self.sku_mapper.catalog_version
+                )
+            
+            # Keep the entry if ERP documents exist so a resubmitted file does not duplicate them
+            if content_hash and not self.journal.has_reached(content_hash, 'SALES_ORDER_CREATED'):
+                self.journal.complete(content_hash, 'exception')
             return False
     
-    def _send_store_notification(self, order_data, so_result, dn_result, inv_result):
+    def replay_exceptions(self, stage: str = 'SKU_MAPPED', item: str = None,
+                          force: bool = False) -> Tuple[int, int]:
+        """Replay open exceptions that failed at a stage, resuming from their saved parse
+        
+        SKU failures are replayed only when the current catalog maps their description, and
+        each failure is checked once per catalog version unless forced.
+        """
+        catalog_version = self.sku_mapper.catalog_version
+        records = self.exception_index.open_exceptions(
+            stage, item, stale_for_catalog=None if force else catalog_version
+        )
+        if not records:
+            return 0, 0
+        
+        print(f"\n🔁 Checking {len(records)} exceptions that failed at {stage or 'any stage'}")
+        
+        # Map each distinct description once, not once per failed file
+        skus: Dict[tuple, str] = {}
+        unmapped: List[str] = []
+        if stage == 'SKU_MAPPED':
+            for record in records:
+                key = (record.item_key, record.customer)
+                if key in skus:
+                    continue
+                description = (record.parsed_order or {}).get('item_description', record.item_key)
+                sku, found = self.sku_mapper.map_item_to_sku(description, record.customer)
+                skus[key] = sku if found else None
+            
+            unmapped = [r.content_hash for r in records if skus[(r.item_key, r.customer)] is None]
+            self.exception_index.mark_checked(unmapped, catalog_version)
+            records = [r for r in records if skus[(r.item_key, r.customer)] is not None]
+        
+        replayed = failed = 0
+        for record in records:
+            if not self.exception_index.claim(record.content_hash):
+                continue
+            
+            try:
+                file_path = self._restore_exception(record)
+            except (OSError, KeyError) as e:
+                self.logger.error("Could not restore exception %s: %s", record.filename, e)
+                self.exception_index.release(record.content_hash)
+                continue
+            
+            self._seed_journal(record, file_path, skus.get((record.item_key, record.customer)))
+            print(f"\n📋 Replaying: {record.filename}")
+            if self._process_single_file(file_path):
+                replayed += 1
+                self.replays_total.labels(stage=record.stage, result='processed').inc()
+            else:
+                failed += 1
+                self.replays_total.labels(stage=record.stage, result='exception').inc()
+        
+        self.journal.flush()
+        print(f"🔁 Replay finished: {replayed} processed, {failed} failed again, "
+              f"{len(unmapped)} still unmapped")
+        return replayed, failed
+    
+    def print_exception_summary(self):
+        """Print open exceptions grouped by failing stage and item"""
+        rows = self.exception_index.summary()
+        print(f"\n📂 Open exceptions: {sum(count for _, _, count in rows)}")
+        for stage, item, count in rows:
+            print(f"   {stage:<22} {count:>5}  {item or '-'}")
+    
+    def _restore_exception(self, record) -> str:
+        """Bring a failed file back from the archive or exceptions folder for replay"""
+        if record.archive_entry_id is not None and self.archive:
+            return self.archive.restore(record.archive_entry_id, self.replay_folder)
+        
+        os.makedirs(self.replay_folder, exist_ok=True)
+        destination = os.path.join(self.replay_folder, record.filename)
+        shutil.move(record.exception_path, destination)
+        error_log_path = f"{record.exception_path}{ERROR_LOG_SUFFIX}"
+        if os.path.exists(error_log_path):
+            os.remove(error_log_path)
+        return destination
+    
+    def _seed_journal(self, record, file_path: str, sku: str = None):
+        """Journal the stages a failed file already completed so processing resumes after them"""
+        content_hash = record.content_hash
+        if self.journal.get_state(content_hash) is not None:
+            return
+        
+        self.journal.record(content_hash, 'STARTED', file_path=file_path)
+        if record.extracted_text:
+            self.journal.record(content_hash, 'EXTRACTED', {'extracted_text': record.extracted_text})
+            if record.parsed_order:
+                self.journal.record(content_hash, 'PARSED', {'parsed_order': record.parsed_order})
+                if sku:
+                    self.journal.record(content_hash, 'SKU_MAPPED', {'sku': sku})
+    
+    @contextmanager
+    def _stage(self, name: str):
+        """Time one pipeline stage of the current file"""
+        start = time.perf_counter()
+        try:
+            with self.profiler.stage(name), span(name):
+                yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stage_timings[name] = elapsed
+            self.stage_latency.labels(stage=name).observe(elapsed)
+    
+    def _send_store_notification(self, order: OrderRecord, so_result, dn_result, inv_result):
         """Send notification email to store team"""
         subject = f"New Order Ready for Delivery - {inv_result['invoice_number']}"
         
         body = f"""Order Details:
         
-Customer: {order_data['customer_name']}
-Item: {order_data['item_description']}
-SKU: {order_data['sku']}
-Quantity: {order_data['quantity']}
+Customer: {order.customer_name}
+Item: {order.item_description}
+SKU: {order.sku}
+Quantity: {order.quantity}
 
 ERP References:
 Sales Order: {so_result['sales_order_number']}
@@ -179,16 +466,26 @@ RPA Automation System
     
     def _move_to_processed(self, file_path: str):
         """Move file to processed folder"""
+        if self.archive:
+            entry_id = self.archive.archive_file(file_path, 'processed')
+            self.logger.info("File archived as processed: %s (entry %s)", os.path.basename(file_path), entry_id)
+            return
+        
         filename = os.path.basename(file_path)
         destination = os.path.join(self.processed_folder, filename)
         
         os.makedirs(self.processed_folder, exist_ok=True)
         shutil.move(file_path, destination)
         
-        self.logger.info(f"File moved to processed: {destination}")
+        self.logger.info("File moved to processed: %s", destination)
     
     def _move_to_exceptions(self, file_path: str, error_message: str):
-        """Move file to exceptions folder with error log"""
+        """Move file to exceptions folder with error log; returns the archive entry or new path"""
+        if self.archive:
+            entry_id = self.archive.archive_file(file_path, 'exception', error_message)
+            self.logger.warning("File archived as exception: %s (entry %s)", os.path.basename(file_path), entry_id)
+            return entry_id
+        
         filename = os.path.basename(file_path)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         exception_filename = f"{timestamp}_{filename}"
@@ -204,11 +501,16 @@ RPA Automation System
             f.write(f"Timestamp: {datetime.now()}\n")
             f.write(f"Error: {error_message}\n")
         
-        self.logger.warning(f"File moved to exceptions: {destination}")
+        self.logger.warning("File moved to exceptions: %s", destination)
+        return destination
     
     def _send_completion_summary(self, processed_count: int, exception_count: int):
         """Send completion summary email"""
         subject = f"Order Processing Summary - {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+        top_customers = '\n'.join(
+            f"  {customer}: {count}"
+            for customer, count in list(self.processed_orders.value_counts('customer_name').items())[:10]
+        )
         
         body = f"""Order Processing Automation Summary:
 
@@ -216,6 +518,9 @@ Processed Successfully: {processed_count} files
 Exceptions/Errors: {exception_count} files
 Total Files: {processed_count + exception_count}
 
+Orders by Customer:
+{top_customers or '  (none)'}
+
 Processing completed at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
 
 Best regards,
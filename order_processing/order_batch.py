@@ -0,0 +1,158 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .data_parser import ParsedOrder
+
+# Column order of an order record; also the positional order used when pickling
+ORDER_FIELDS = ('customer_name', 'item_description', 'sku', 'quantity', 'price', 'order_date', 'po_number')
+
+# Dictionary code for a missing value; pandas reads it as NaN in categorical codes
+MISSING = -1
+
+
+class OrderRecord:
+    """One mapped order as it moves through the ERP stages"""
+
+    __slots__ = ORDER_FIELDS
+
+    def __init__(self, customer_name: str, item_description: str, sku: Optional[str] = None,
+                 quantity: Optional[str] = None, price: Optional[str] = None,
+                 order_date: Optional[str] = None, po_number: Optional[str] = None):
+        self.customer_name = customer_name
+        self.item_description = item_description
+        self.sku = sku
+        self.quantity = quantity
+        self.price = price
+        self.order_date = order_date
+        self.po_number = po_number
+
+    @classmethod
+    def from_parsed(cls, parsed_order: ParsedOrder, sku: Optional[str]) -> 'OrderRecord':
+        """Build the record for a parsed order once its SKU is known"""
+        return cls(parsed_order.customer_name, parsed_order.item_description, sku, parsed_order.quantity,
+                   parsed_order.price, parsed_order.order_date, parsed_order.po_number)
+
+    def get(self, field: str, default: Any = None) -> Any:
+        """Mapping-style access, so a record can be passed where an order dict was expected"""
+        value = getattr(self, field, None) if field in ORDER_FIELDS else None
+        return default if value is None else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {field: getattr(self, field) for field in ORDER_FIELDS}
+
+    def __reduce__(self):
+        # A plain tuple pickles far smaller than the default slots state dict
+        return OrderRecord, tuple(getattr(self, field) for field in ORDER_FIELDS)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, OrderRecord) and all(
+            getattr(self, field) == getattr(other, field) for field in ORDER_FIELDS
+        )
+
+    def __repr__(self) -> str:
+        return f"OrderRecord({', '.join(f'{field}={getattr(self, field)!r}' for field in ORDER_FIELDS)})"
+
+
+class OrderBatch:
+    """Columnar, dictionary-encoded batch of orders
+
+    Every field is stored as an int32 array of codes into one shared list of distinct
+    strings, so repeated customers, items and SKUs cost four bytes per order. Pickling
+    sends the raw array buffers, which keeps batches cheap to pass between processes.
+    """
+
+    __slots__ = ('_values', '_codes', '_columns')
+
+    def __init__(self, records: Iterable[OrderRecord] = ()):
+        self._values: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self._columns: Dict[str, array] = {field: array('i') for field in ORDER_FIELDS}
+        self.extend(records)
+
+    def _encode(self, value: Any) -> int:
+        if value is None:
+            return MISSING
+        value = str(value)
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self._values)
+            self._values.append(value)
+        return code
+
+    def append(self, record: OrderRecord):
+        """Add one order"""
+        for field in ORDER_FIELDS:
+            self._columns[field].append(self._encode(getattr(record, field)))
+
+    def extend(self, records: Iterable[OrderRecord]):
+        """Add several orders"""
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self._columns[ORDER_FIELDS[0]])
+
+    def __getitem__(self, index: int) -> OrderRecord:
+        return OrderRecord(*(self._decode(self._columns[field][index]) for field in ORDER_FIELDS))
+
+    def __iter__(self) -> Iterator[OrderRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def _decode(self, code: int) -> Optional[str]:
+        return None if code == MISSING else self._values[code]
+
+    def column(self, field: str) -> List[Optional[str]]:
+        """Decoded values of one field"""
+        return [self._decode(code) for code in self._columns[field]]
+
+    def value_counts(self, field: str) -> Dict[str, int]:
+        """Orders per distinct value of a field, most frequent first"""
+        counts: Dict[int, int] = {}
+        for code in self._columns[field]:
+            if code != MISSING:
+                counts[code] = counts.get(code, 0) + 1
+        return {self._values[code]: count for code, count in sorted(counts.items(), key=lambda kv: -kv[1])}
+
+    def nbytes(self) -> int:
+        """Approximate memory held by the codes and distinct values"""
+        codes = sum(column.itemsize * len(column) for column in self._columns.values())
+        return codes + sum(len(value) for value in self._values)
+
+    def __reduce__(self):
+        return _restore_batch, (self._values, {field: column.tobytes() for field, column in self._columns.items()})
+
+    def to_pandas(self):
+        """DataFrame with one categorical column per field, sharing the batch's codes"""
+        import pandas as pd
+
+        categories = pd.Index(self._values, dtype=object)
+        return pd.DataFrame({
+            field: pd.Categorical.from_codes(self._columns[field], categories=categories)
+            for field in ORDER_FIELDS
+        })
+
+    def to_arrow(self):
+        """pyarrow Table of dictionary-encoded columns; requires pyarrow"""
+        try:
+            import pyarrow as pa
+        except ImportError as e:
+            raise ImportError("pyarrow is required for OrderBatch.to_arrow") from e
+
+        dictionary = pa.array(self._values, type=pa.string())
+        columns = []
+        for field in ORDER_FIELDS:
+            indices = pa.array([None if code == MISSING else code for code in self._columns[field]],
+                               type=pa.int32())
+            columns.append(pa.DictionaryArray.from_arrays(indices, dictionary))
+        return pa.Table.from_arrays(columns, names=list(ORDER_FIELDS))
+
+
+def _restore_batch(values: List[str], buffers: Dict[str, bytes]) -> OrderBatch:
+    """Rebuild a pickled batch from its distinct values and code buffers"""
+    batch = OrderBatch()
+    batch._values = values
+    batch._codes = {value: code for code, value in enumerate(values)}
+    for field, buffer in buffers.items():
+        batch._columns[field].frombytes(buffer)
+    return batch
@@ -0,0 +1,198 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+from typing import Callable, Dict, Any, Optional, List
+
+from .file_archive import compute_content_hash
+
+# Stages in pipeline order; a file resumes after the last one it reached
+STAGES = [
+    'STARTED',
+    'EXTRACTED',
+    'PARSED',
+    'SKU_MAPPED',
+    'SALES_ORDER_CREATED',
+    'DELIVERY_NOTE_CREATED',
+    'INVOICE_CREATED',
+    'NOTIFIED',
+    'COMPLETED'
+]
+
+# Stages that follow an external side effect and must hit disk before moving on
+DURABLE_STAGES = {'SALES_ORDER_CREATED', 'DELIVERY_NOTE_CREATED', 'INVOICE_CREATED', 'NOTIFIED'}
+
+# COMPLETED is durable too once ERP documents exist, so a crash cannot resume an archived order
+DURABLE_COMPLETION_AFTER = 'SALES_ORDER_CREATED'
+
+
+class ProcessingJournal:
+    """Write-ahead journal of pipeline stages keyed by file content hash"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        logs_folder = self.config.get('paths.logs_folder', 'logs')
+        self.journal_file = self.config.get(
+            'paths.journal_file', os.path.join(logs_folder, 'processing_journal.jsonl')
+        )
+        self.batch_size = self.config.get('journal.batch_size', 32)
+        self.compact_after_records = self.config.get('journal.compact_after_records', 5000)
+
+        self._lock = threading.Lock()
+        self._buffer: List[str] = []
+        self._record_count = 0
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._listeners: List[Callable[[str, str], None]] = []
+
+        os.makedirs(os.path.dirname(self.journal_file) or '.', exist_ok=True)
+        self._replay()
+
+    def _replay(self):
+        """Rebuild in-flight file states from the journal"""
+        if not os.path.exists(self.journal_file):
+            return
+
+        complete_end = 0
+        with open(self.journal_file, 'rb') as f:
+            for raw in f:
+                if not raw.endswith(b'\n'):
+                    # A torn final line from a crash mid-write; everything before it is valid
+                    self.logger.warning("Discarding incomplete journal record")
+                    break
+                complete_end += len(raw)
+                try:
+                    record = json.loads(raw.decode('utf-8'))
+                except (UnicodeDecodeError, json.JSONDecodeError):
+                    self.logger.warning("Ignoring unreadable journal record")
+                    continue
+                self._record_count += 1
+                self._apply(record)
+
+        # Cut the fragment off so the next flush does not append onto it
+        if complete_end < os.path.getsize(self.journal_file):
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(complete_end)
+                f.flush()
+                os.fsync(f.fileno())
+
+        if self._states:
+            self.logger.info("Journal replayed: %s files in flight", len(self._states))
+
+    def _apply(self, record: Dict[str, Any]):
+        """Apply one journal record to the in-memory state"""
+        content_hash = record['hash']
+        if record['stage'] == 'COMPLETED':
+            self._states.pop(content_hash, None)
+            return
+
+        state = self._states.setdefault(content_hash, {'stage': None, 'data': {}})
+        state['stage'] = record['stage']
+        if record.get('file'):
+            state['filename'] = record['file']
+        state['data'].update(record.get('data') or {})
+
+    def begin(self, file_path: str) -> str:
+        """Register a file and return its content hash"""
+        content_hash = compute_content_hash(file_path)
+        if content_hash in self._states:
+            state = self._states[content_hash]
+            self.logger.info("Resuming %s after stage %s", os.path.basename(file_path), state['stage'])
+        else:
+            self.record(content_hash, 'STARTED', file_path=file_path)
+        return content_hash
+
+    def get_state(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Get the last recorded stage and accumulated data for a file"""
+        return self._states.get(content_hash)
+
+    def has_reached(self, content_hash: str, stage: str) -> bool:
+        """Check whether a file already completed the given stage"""
+        state = self._states.get(content_hash)
+        if not state or state['stage'] is None:
+            return False
+        return STAGES.index(state['stage']) >= STAGES.index(stage)
+
+    def get_data(self, content_hash: str, key: str, default=None):
+        """Get a value saved by an earlier stage"""
+        state = self._states.get(content_hash)
+        if not state:
+            return default
+        return state['data'].get(key, default)
+
+    def record(self, content_hash: str, stage: str, data: Dict[str, Any] = None,
+               file_path: str = None):
+        """Record that a file reached a stage; side-effect stages are flushed immediately"""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown journal stage: {stage}")
+
+        record = {
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'hash': content_hash,
+            'stage': stage
+        }
+        if file_path:
+            record['file'] = os.path.basename(file_path)
+        if data:
+            record['data'] = data
+
+        with self._lock:
+            should_flush = (stage in DURABLE_STAGES
+                            or (stage == 'COMPLETED' and self.has_reached(content_hash, DURABLE_COMPLETION_AFTER)))
+            self._apply(record)
+            self._buffer.append(json.dumps(record, default=str))
+            should_flush = should_flush or len(self._buffer) >= self.batch_size
+
+        if should_flush:
+            self.flush()
+
+        for listener in self._listeners:
+            listener(content_hash, stage)
+
+    def add_listener(self, listener: Callable[[str, str], None]):
+        """Call listener(content_hash, stage) after each record, once it is durable if required"""
+        self._listeners.append(listener)
+
+    def complete(self, content_hash: str, outcome: str = 'processed'):
+        """Close a file's journal entry once it has been archived"""
+        self.record(content_hash, 'COMPLETED', {'outcome': outcome})
+
+    def flush(self):
+        """Write buffered records with a single fsync"""
+        with self._lock:
+            if not self._buffer:
+                return
+            lines = self._buffer
+            self._buffer = []
+
+            with open(self.journal_file, 'a', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self._record_count += len(lines)
+
+    def compact(self):
+        """Rewrite the journal with only in-flight files once it grows large"""
+        self.flush()
+        with self._lock:
+            if self._record_count < self.compact_after_records:
+                return
+
+            temp_file = f"{self.journal_file}.tmp"
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                for content_hash, state in self._states.items():
+                    f.write(json.dumps({
+                        'ts': datetime.now().isoformat(timespec='milliseconds'),
+                        'hash': content_hash,
+                        'stage': state['stage'],
+                        'file': state.get('filename'),
+                        'data': state['data']
+                    }, default=str) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(temp_file, self.journal_file)
+            self.logger.info("Journal compacted from %s to %s records", self._record_count, len(self._states))
+            self._record_count = len(self._states)
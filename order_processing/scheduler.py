@@ -0,0 +1,187 @@
+import os
+import re
+import json
+import time
+import fnmatch
+import logging
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+# Prior extraction cost in seconds per work unit, used until timings are learned
+DEFAULT_EXTRACTION_RATES = {
+    '.txt': 0.05,
+    '.pdf': 0.5,
+    '.jpg': 4.0,
+    '.jpeg': 4.0,
+    '.png': 4.0,
+    '.bmp': 4.0
+}
+
+# Stages whose cost grows with document size; other stages are treated as fixed per file
+SCALING_STAGES = {'extraction'}
+
+PDF_PAGE_PATTERN = re.compile(rb'/Type\s*/Page(?!s)')
+
+
+@dataclass
+class FileCost:
+    """Cost estimate for one queued file"""
+    file_path: str
+    file_type: str
+    work_units: float
+    expected_seconds: float
+    waited_seconds: float
+    lane: int
+    score: float
+
+
+class CostAwareScheduler:
+    """Orders the input queue shortest-expected-job first with aging and priority lanes"""
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        logs_folder = self.config.get('paths.logs_folder', 'logs')
+        self.stats_file = self.config.get(
+            'paths.scheduler_stats_file', os.path.join(logs_folder, 'scheduler_stats.json')
+        )
+        self.smoothing = self.config.get('scheduling.smoothing', 0.2)
+        self.aging_rate = self.config.get('scheduling.aging_rate', 0.05)
+        self.starvation_limit_seconds = self.config.get('scheduling.starvation_limit_seconds', 1800)
+        self.priority_lanes = self.config.get('scheduling.priority_lanes', [])
+        self.default_lane = self.config.get('scheduling.default_lane', 1)
+
+        self._work_units: Dict[str, tuple] = {}
+        self.stats = self._load_stats()
+
+    def _load_stats(self) -> Dict[str, Dict[str, float]]:
+        """Load learned per-type stage timings"""
+        if os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                self.logger.warning("Could not load scheduler stats, starting fresh: %s", e)
+        return {}
+
+    def save_stats(self):
+        """Persist learned timings for the next run"""
+        os.makedirs(os.path.dirname(self.stats_file) or '.', exist_ok=True)
+        temp_file = f"{self.stats_file}.tmp"
+        with open(temp_file, 'w') as f:
+            json.dump(self.stats, f, indent=4)
+        os.replace(temp_file, self.stats_file)
+
+    def _measure_work_units(self, file_path: str) -> tuple:
+        """Size a file in work units: pages for PDFs, megabytes for images, one for text"""
+        file_type = os.path.splitext(file_path)[1].lower()
+        size_mb = os.path.getsize(file_path) / (1024 * 1024)
+
+        if file_type == '.pdf':
+            units = max(self._count_pdf_pages(file_path), 1)
+        elif file_type == '.txt':
+            units = 1.0
+        else:
+            units = max(size_mb, 0.1)
+
+        self._work_units[file_path] = (file_type, units)
+        return file_type, units
+
+    def _count_pdf_pages(self, file_path: str) -> int:
+        """Count page objects without building a full PDF parser"""
+        try:
+            with open(file_path, 'rb') as f:
+                return len(PDF_PAGE_PATTERN.findall(f.read()))
+        except OSError:
+            return 1
+
+    def _lane_for(self, filename: str) -> int:
+        """Find the priority lane for a file; lower lanes run first"""
+        for lane_rule in self.priority_lanes:
+            if fnmatch.fnmatch(filename.lower(), lane_rule.get('pattern', '').lower()):
+                return lane_rule.get('lane', self.default_lane)
+        return self.default_lane
+
+    def estimate_seconds(self, file_type: str, units: float) -> float:
+        """Expected processing time from learned stage timings"""
+        type_stats = self.stats.get(file_type, {})
+
+        extraction_rate = type_stats.get('extraction', DEFAULT_EXTRACTION_RATES.get(file_type, 1.0))
+        expected = extraction_rate * units
+
+        for stage, seconds in type_stats.items():
+            if stage not in SCALING_STAGES:
+                expected += seconds
+
+        return expected
+
+    def estimate(self, file_path: str, now: float = None) -> FileCost:
+        """Estimate cost and scheduling score for a file"""
+        now = now or time.time()
+        file_type, units = self._measure_work_units(file_path)
+        expected = self.estimate_seconds(file_type, units)
+        waited = max(now - os.path.getmtime(file_path), 0.0)
+
+        # Aging: every second spent waiting discounts the expected cost, and starved
+        # files jump ahead of everything in their lane
+        if waited >= self.starvation_limit_seconds:
+            score = -waited
+        else:
+            score = expected - self.aging_rate * waited
+
+        return FileCost(
+            file_path=file_path,
+            file_type=file_type,
+            work_units=units,
+            expected_seconds=expected,
+            waited_seconds=waited,
+            lane=self._lane_for(os.path.basename(file_path)),
+            score=score
+        )
+
+    def schedule(self, file_paths: List[str]) -> List[str]:
+        """Return files ordered by lane, then shortest expected job with aging"""
+        now = time.time()
+        costs = []
+        for file_path in file_paths:
+            try:
+                costs.append(self.estimate(file_path, now))
+            except FileNotFoundError:
+                # Claimed by another worker since the inbox was listed
+                self._work_units.pop(file_path, None)
+                self.logger.debug("Skipping %s, no longer in the inbox", file_path)
+        costs.sort(key=lambda cost: (cost.lane, cost.score))
+
+        if costs:
+            total = sum(cost.expected_seconds for cost in costs)
+            self.logger.info("Scheduled %s files, expected total %.1fs", len(costs), total)
+
+        return [cost.file_path for cost in costs]
+
+    def rename(self, old_path: str, new_path: str):
+        """Follow a queued file that was moved, e.g. claimed by a worker"""
+        if old_path in self._work_units:
+            self._work_units[new_path] = self._work_units.pop(old_path)
+
+    def forget(self, file_path: str):
+        """Drop a queued file that will not report timings, e.g. one that failed"""
+        self._work_units.pop(file_path, None)
+
+    def record_timings(self, file_path: str, stage_timings: Dict[str, float]):
+        """Fold observed stage timings into the per-type moving averages"""
+        profile = self._work_units.get(file_path)
+        if profile is None:
+            return
+        file_type, units = profile
+
+        type_stats = self.stats.setdefault(file_type, {})
+        for stage, seconds in stage_timings.items():
+            observed = seconds / units if stage in SCALING_STAGES else seconds
+            previous: Optional[float] = type_stats.get(stage)
+            if previous is None:
+                type_stats[stage] = observed
+            else:
+                type_stats[stage] = (1 - self.smoothing) * previous + self.smoothing * observed
+
+        self.forget(file_path)
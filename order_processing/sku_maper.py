@@ -1,9 +1,13 @@
 import pandas as pd
 import os
+import hashlib
 import logging
 from typing import Tuple, Optional
 import difflib
 
+from utils.metrics import get_metrics
+from utils.tracing import span
+
 class SKUMapper:
     """Maps item descriptions to SKU codes"""
     
@@ -12,22 +16,36 @@ class SKUMapper:
         self.logger = logging.getLogger(__name__)
         self.mapping_file = self.config.get('paths.sku_mapping_file', 'config/sku_mapping.xlsx')
         self.mapping_df = self._load_sku_mapping()
+        self.catalog_version = self._catalog_version()
+        
+        metrics = get_metrics()
+        self.match_latency = metrics.histogram(
+            'rpa_sku_match_seconds', 'SKU matching latency by match tier', ['tier']
+        )
+        self.match_total = metrics.counter(
+            'rpa_sku_match_total', 'SKU match attempts by tier and result', ['tier', 'result']
+        )
     
     def _load_sku_mapping(self) -> pd.DataFrame:
         """Load SKU mapping from Excel file"""
         try:
             if os.path.exists(self.mapping_file):
                 df = pd.read_excel(self.mapping_file)
-                self.logger.info(f"Loaded SKU mapping with {len(df)} entries")
+                self.logger.info("Loaded SKU mapping with %s entries", len(df))
                 return df
             else:
                 self.logger.warning("SKU mapping file not found. Creating sample mapping.")
                 return self._create_sample_mapping()
                 
         except Exception as e:
-            self.logger.error(f"Error loading SKU mapping: {str(e)}")
+            self.logger.error("Error loading SKU mapping: %s", e)
             return self._create_sample_mapping()
     
+    def _catalog_version(self) -> str:
+        """Fingerprint of the loaded catalog; changes whenever SKU rows are edited"""
+        csv = self.mapping_df.to_csv(index=False).encode('utf-8')
+        return hashlib.sha256(csv).hexdigest()[:16]
+    
     def _create_sample_mapping(self) -> pd.DataFrame:
         """Create sample SKU mapping for demo"""
         sample_data = {
@@ -61,34 +79,33 @@ class SKUMapper:
         os.makedirs(os.path.dirname(self.mapping_file), exist_ok=True)
         df.to_excel(self.mapping_file, index=False)
         
-        self.logger.info(f"Created sample SKU mapping: {self.mapping_file}")
+        self.logger.info("Created sample SKU mapping: %s", self.mapping_file)
         return df
     
     def map_item_to_sku(self, item_description: str, customer_name: str = None) -> Tuple[Optional[str], bool]:
         """Map item description to SKU code"""
         try:
-            self.logger.info(f"Mapping item: '{item_description}' for customer: '{customer_name}'")
+            self.logger.info("Mapping item: '%s' for customer: '%s'", item_description, customer_name)
             
-            # First try exact match
-            sku = self._exact_match(item_description, customer_name)
-            if sku:
-                return sku, True
-            
-            # Try fuzzy matching
-            sku = self._fuzzy_match(item_description, customer_name)
-            if sku:
-                return sku, True
+            # Try exact, then fuzzy, then partial matching
+            tiers = [
+                ('exact', self._exact_match),
+                ('fuzzy', self._fuzzy_match),
+                ('partial', self._partial_match)
+            ]
             
-            # Try partial matching
-            sku = self._partial_match(item_description, customer_name)
-            if sku:
-                return sku, True
+            for tier, matcher in tiers:
+                with self.match_latency.labels(tier=tier).time(), span(f"sku_match.{tier}"):
+                    sku = matcher(item_description, customer_name)
+                self.match_total.labels(tier=tier, result='hit' if sku else 'miss').inc()
+                if sku:
+                    return sku, True
             
-            self.logger.warning(f"No SKU mapping found for: {item_description}")
+            self.logger.warning("No SKU mapping found for: %s", item_description)
             return None, False
             
         except Exception as e:
-            self.logger.error(f"Error mapping SKU: {str(e)}")
+            self.logger.error("Error mapping SKU: %s", e)
             return None, False
     
     def _exact_match(self, item_description: str, customer_name: str = None) -> Optional[str]:
@@ -139,7 +156,7 @@ class SKUMapper:
                 best_match = row['SKU']
         
         if best_match:
-            self.logger.info(f"Fuzzy match found with score {best_score:.2f}: {best_match}")
+            self.logger.info("Fuzzy match found with score %.2f: %s", best_score, best_match)
         
         return best_match
     
@@ -159,7 +176,7 @@ class SKUMapper:
             overlap = max(desc_overlap, customer_desc_overlap)
             
             if overlap >= 0.5:  # At least 50% word overlap
-                self.logger.info(f"Partial match found with overlap {overlap:.2f}: {row['SKU']}")
+                self.logger.info("Partial match found with overlap %.2f: %s", overlap, row['SKU'])
                 return row['SKU']
         
         return None
\ No newline at end of file
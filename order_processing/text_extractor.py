@@ -1,11 +1,24 @@
 import os
+import re
 import logging
+from typing import Dict, List, Optional, Tuple
 import PyPDF2
 import pytesseract
 from PIL import Image
 import cv2
 import numpy as np
 
+from .layout_templates import LayoutTemplateStore, TEMPLATE_FIELDS, layout_signature
+from utils.metrics import get_metrics
+from utils.tracing import traced
+
+# Labels the parser needs; if the first OCR pass misses any of them the page is re-read
+REQUIRED_FIELD_PATTERNS = {
+    'customer': re.compile(r'(?i)\b(customer|client|company|bill\s+to|sold\s+to)\b'),
+    'item': re.compile(r'(?i)\b(item|description|product)\b'),
+    'quantity': re.compile(r'(?i)\b(qty|quantity|units?)\b|\d+\s*(pcs|pieces)')
+}
+
 class TextExtractor:
     """Extracts text from various file formats"""
     
@@ -13,27 +26,47 @@ class TextExtractor:
         self.config = config_manager
         self.logger = logging.getLogger(__name__)
         self.ocr_language = self.config.get('processing.ocr_language', 'eng')
+        self.first_pass_scale = self.config.get('processing.ocr_first_pass_scale', 0.5)
+        self.first_pass_min_width = self.config.get('processing.ocr_first_pass_min_width', 1200)
+        self.min_confidence = self.config.get('processing.ocr_min_confidence', 60)
+        # Beyond this many weak lines, per-line rereads cost more than one full-page read
+        self.max_reread_lines = self.config.get('processing.ocr_max_reread_lines', 8)
+        self.max_reread_fraction = self.config.get('processing.ocr_max_reread_fraction', 0.3)
+        
+        # Per-customer field regions learned from processed POs, plus OCR layouts awaiting learning
+        self.layout_templates = LayoutTemplateStore(config_manager)
+        self._recent_layouts: Dict[str, Dict] = {}
+        
+        metrics = get_metrics()
+        self.extraction_latency = metrics.histogram(
+            'rpa_extraction_seconds', 'Text extraction latency by file type', ['file_type']
+        )
+        self.ocr_passes = metrics.counter(
+            'rpa_ocr_passes_total', 'OCR passes by kind (first, region, full)', ['kind']
+        )
     
     def extract_from_file(self, file_path: str) -> str:
         """Extract text from various file formats"""
         file_extension = os.path.splitext(file_path)[1].lower()
         
         try:
-            self.logger.info(f"Extracting text from: {file_path}")
-            
-            if file_extension == '.pdf':
-                return self._extract_from_pdf(file_path)
-            elif file_extension in ['.jpg', '.jpeg', '.png', '.bmp']:
-                return self._extract_from_image(file_path)
-            elif file_extension == '.txt':
-                return self._extract_from_text(file_path)
-            else:
-                raise ValueError(f"Unsupported file format: {file_extension}")
+            self.logger.info("Extracting text from: %s", file_path)
+            
+            with self.extraction_latency.labels(file_type=file_extension).time():
+                if file_extension == '.pdf':
+                    return self._extract_from_pdf(file_path)
+                elif file_extension in ['.jpg', '.jpeg', '.png', '.bmp']:
+                    return self._extract_from_image(file_path)
+                elif file_extension == '.txt':
+                    return self._extract_from_text(file_path)
+                else:
+                    raise ValueError(f"Unsupported file format: {file_extension}")
                 
         except Exception as e:
-            self.logger.error(f"Error extracting text from {file_path}: {str(e)}")
+            self.logger.error("Error extracting text from %s: %s", file_path, e)
             raise
     
+    @traced()
     def _extract_from_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
         text = ""
@@ -43,15 +76,16 @@ class TextExtractor:
                 for page_num, page in enumerate(pdf_reader.pages):
                     page_text = page.extract_text()
                     text += page_text
-                    self.logger.debug(f"Extracted text from page {page_num + 1}")
+                    self.logger.debug("Extracted text from page %s", page_num + 1)
         except Exception as e:
-            self.logger.error(f"Error reading PDF {file_path}: {str(e)}")
+            self.logger.error("Error reading PDF %s: %s", file_path, e)
             raise
         
         return text
     
+    @traced()
     def _extract_from_image(self, file_path: str) -> str:
-        """Extract text from image using OCR"""
+        """Extract text from image using OCR, re-reading only what the first pass got wrong"""
         try:
             # Load image
             image = cv2.imread(file_path)
@@ -64,23 +98,219 @@ class TextExtractor:
             # Apply threshold to get better contrast
             _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
             
-            # Extract text using Tesseract
-            text = pytesseract.image_to_string(thresh, lang=self.ocr_language)
+            # Known customer layout: OCR only its field regions
+            signature = layout_signature(gray)
+            template = self.layout_templates.match(signature)
+            if template:
+                text = self._extract_with_template(template, thresh)
+                if text:
+                    self.logger.info("OCR completed from %s layout template: %s", template['customer'], file_path)
+                    return text
+                self.logger.info("Layout template for %s did not fit, reading full page", template['customer'])
+            
+            # First pass at reduced resolution; clean scans stop here
+            scale = self.first_pass_scale if gray.shape[1] >= self.first_pass_min_width else 1.0
+            lines = self._ocr_lines(self._first_pass_image(gray, scale), scale)
+            self.ocr_passes.labels(kind='first').inc()
+            
+            # A noisy scan goes straight to one full-page read; rereading most of its lines
+            # separately would cost more
+            weak = [i for i, line in enumerate(lines) if line['confidence'] < self.min_confidence]
+            if self._too_weak_for_rereads(len(weak), len(lines)):
+                self.logger.info("OCR first pass weak on %s of %s lines, running full-page OCR",
+                                 len(weak), len(lines))
+                return self._full_page_text(thresh)
+            
+            # Re-read low-confidence lines at full resolution, trying two binarizations
+            if weak:
+                adaptive = cv2.adaptiveThreshold(
+                    gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 31, 10
+                )
+                for i in weak:
+                    lines[i] = self._reread_line(lines[i], (thresh, adaptive))
+                self.ocr_passes.labels(kind='region').inc()
             
-            self.logger.info(f"OCR completed for image: {file_path}")
+            text = '\n'.join(line['text'] for line in lines)
+            self._remember_layout(file_path, signature, gray.shape[:2], lines)
+            
+            # Fields still missing: fall back to today's full-page, full-resolution read
+            missing = self._missing_fields(lines)
+            if missing:
+                self.logger.info("OCR first pass missed %s, running full-page OCR", ', '.join(missing))
+                text = self._full_page_text(thresh)
+            
+            self.logger.info("OCR completed for image: %s", file_path)
             return text
             
         except Exception as e:
-            self.logger.error(f"Error processing image {file_path}: {str(e)}")
+            self.logger.error("Error processing image %s: %s", file_path, e)
             raise
     
+    def _too_weak_for_rereads(self, weak_count: int, line_count: int) -> bool:
+        """Whether per-line rereads would cost more than the full-page read they try to avoid"""
+        if line_count == 0:
+            return True
+        return weak_count > self.max_reread_lines or weak_count > self.max_reread_fraction * line_count
+    
+    def _full_page_text(self, thresh: np.ndarray) -> str:
+        """Full-page, full-resolution OCR"""
+        self.ocr_passes.labels(kind='full').inc()
+        return pytesseract.image_to_string(thresh, lang=self.ocr_language)
+    
+    def _first_pass_image(self, gray: np.ndarray, scale: float) -> np.ndarray:
+        """Downscale and binarize for the cheap first pass"""
+        if scale < 1.0:
+            gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        return thresh
+    
+    @traced()
+    def _ocr_lines(self, image: np.ndarray, scale: float = 1.0, config: str = '') -> List[Dict]:
+        """OCR an image into lines with mean word confidence and full-resolution boxes"""
+        data = pytesseract.image_to_data(
+            image, lang=self.ocr_language, config=config, output_type=pytesseract.Output.DICT
+        )
+        
+        lines: Dict[Tuple[int, int, int], Dict] = {}
+        for i, word in enumerate(data['text']):
+            confidence = float(data['conf'][i])
+            if confidence < 0 or not word.strip():
+                continue
+            
+            key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            left, top = data['left'][i] / scale, data['top'][i] / scale
+            right, bottom = left + data['width'][i] / scale, top + data['height'][i] / scale
+            
+            line = lines.setdefault(key, {'words': [], 'confidences': [], 'word_boxes': [],
+                                          'box': [left, top, right, bottom]})
+            line['words'].append(word)
+            line['word_boxes'].append([int(round(v)) for v in (left, top, right, bottom)])
+            line['confidences'].append(confidence)
+            box = line['box']
+            line['box'] = [min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom)]
+        
+        return [
+            {
+                'text': ' '.join(line['words']),
+                'confidence': sum(line['confidences']) / len(line['confidences']),
+                'box': [int(round(v)) for v in line['box']],
+                'words': list(zip(line['words'], line['word_boxes']))
+            }
+            for _, line in sorted(lines.items())
+        ]
+    
+    @traced()
+    def _reread_line(self, line: Dict, candidates: Tuple[np.ndarray, ...]) -> Dict:
+        """OCR one line region at full resolution and keep the most confident reading"""
+        left, top, right, bottom = line['box']
+        pad = max(4, (bottom - top) // 4)
+        best = line
+        
+        for image in candidates:
+            height, width = image.shape[:2]
+            x0, y0 = max(left - pad, 0), max(top - pad, 0)
+            crop = image[y0:min(bottom + pad, height), x0:min(right + pad, width)]
+            if crop.size == 0:
+                continue
+            
+            # Single text line page segmentation
+            for candidate in self._ocr_lines(crop, config='--psm 7'):
+                if candidate['confidence'] > best['confidence']:
+                    words = [(word, [box[0] + x0, box[1] + y0, box[2] + x0, box[3] + y0])
+                             for word, box in candidate['words']]
+                    best = {**candidate, 'box': line['box'], 'words': words}
+        
+        return best
+    
+    @traced()
+    def _extract_with_template(self, template: Dict, thresh: np.ndarray) -> str:
+        """OCR a template's field regions with field-specific settings; empty if any read is weak"""
+        if any(field not in template['fields'] for field in REQUIRED_FIELD_PATTERNS):
+            return ''
+        
+        page_size = thresh.shape[:2]
+        text_lines = []
+        
+        for field, settings in TEMPLATE_FIELDS.items():
+            box = self.layout_templates.region(template, field, page_size)
+            if box is None:
+                continue
+            left, top, right, bottom = box
+            lines = self._ocr_lines(thresh[top:bottom, left:right], config=settings['config'])
+            self.ocr_passes.labels(kind='template').inc()
+            
+            if not lines or min(line['confidence'] for line in lines) < self.min_confidence:
+                return ''
+            
+            field_text = ' '.join(line['text'] for line in lines)
+            if not settings['label_pattern'].search(field_text):
+                field_text = f"{settings['label']}: {field_text}"
+            text_lines.append((top, left, field_text))
+        
+        # Page order, as a full read would give, so the parser sees the fields in the same sequence
+        return '\n'.join(field_text for _, _, field_text in sorted(text_lines))
+    
+    def _remember_layout(self, file_path: str, signature: str, page_size: tuple, lines: List[Dict]):
+        """Keep a full-page OCR layout until the file is known to have processed successfully"""
+        self._recent_layouts[file_path] = {'signature': signature, 'page_size': page_size, 'lines': lines}
+        while len(self._recent_layouts) > 32:
+            self._recent_layouts.pop(next(iter(self._recent_layouts)))
+    
+    def learn_layout(self, file_path: str, parsed_order) -> None:
+        """Teach the customer's layout template where this PO's fields were found"""
+        layout = self._recent_layouts.pop(file_path, None)
+        if layout is None:
+            return
+        
+        values = {
+            'customer': parsed_order.customer_name,
+            'item': parsed_order.item_description,
+            'quantity': parsed_order.quantity,
+            'po_number': parsed_order.po_number,
+            'price': parsed_order.price,
+            'order_date': parsed_order.order_date
+        }
+        field_boxes = {}
+        for field, value in values.items():
+            if not value:
+                continue
+            candidates = [line for line in layout['lines'] if str(value).lower() in line['text'].lower()]
+            # Prefer the line that also carries the field's label, e.g. quantity over price
+            labelled = [line for line in candidates if TEMPLATE_FIELDS[field]['label_pattern'].search(line['text'])]
+            if not (labelled or candidates):
+                continue
+            line = (labelled or candidates)[0]
+            if TEMPLATE_FIELDS[field].get('value_only'):
+                box = self._value_box(line, str(value))
+                if box is not None:
+                    field_boxes[field] = box
+            else:
+                field_boxes[field] = line['box']
+        
+        self.layout_templates.learn(parsed_order.customer_name, layout['signature'], layout['page_size'], field_boxes)
+    
+    @staticmethod
+    def _value_box(line: Dict, value: str) -> Optional[List[int]]:
+        """Part of a line from the value's first word to the line end, leaving out the label"""
+        first_word = value.split()[0].lower() if value.split() else ''
+        for word, box in line.get('words', []):
+            if first_word and first_word in word.lower():
+                # Extends to the line's right edge so longer values on later POs still fit
+                return [box[0], line['box'][1], line['box'][2], line['box'][3]]
+        return None
+    
+    def _missing_fields(self, lines: List[Dict]) -> List[str]:
+        """Required field labels not present in the OCR text"""
+        text = '\n'.join(line['text'] for line in lines)
+        return [field for field, pattern in REQUIRED_FIELD_PATTERNS.items() if not pattern.search(text)]
+    
     def _extract_from_text(self, file_path: str) -> str:
         """Extract text from plain text file"""
         try:
             with open(file_path, 'r', encoding='utf-8') as file:
                 text = file.read()
-            self.logger.info(f"Text extracted from: {file_path}")
+            self.logger.info("Text extracted from: %s", file_path)
             return text
         except Exception as e:
-            self.logger.error(f"Error reading text file {file_path}: {str(e)}")
+            self.logger.error("Error reading text file %s: %s", file_path, e)
             raise
\ No newline at end of file
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeConfig:
+    """Dotted-key settings in place of ConfigManager, without touching config/settings.json"""
+
+    def __init__(self, settings=None):
+        self.settings = dict(settings or {})
+
+    def get(self, key, default=None):
+        return self.settings.get(key, default)
+
+    def set(self, key, value):
+        self.settings[key] = value
+
+
+@pytest.fixture
+def make_config(tmp_path):
+    """Build a FakeConfig whose logs and data paths live under the test's temp folder"""
+    def build(settings=None):
+        base = {
+            'paths.logs_folder': str(tmp_path / 'logs'),
+            'paths.input_folder': str(tmp_path / 'input'),
+            'paths.exceptions_folder': str(tmp_path / 'exceptions'),
+            'paths.processed_folder': str(tmp_path / 'processed'),
+            'paths.reports_folder': str(tmp_path / 'reports')
+        }
+        base.update(settings or {})
+        return FakeConfig(base)
+    return build
@@ -0,0 +1,40 @@
+import pytest
+
+pd = pytest.importorskip('pandas')
+openpyxl = pytest.importorskip('openpyxl')
+pytest.importorskip('xlsxwriter')
+
+from customer_unblock.aging_batch import AgingBatchGenerator
+from customer_unblock.aging_report_generator import safe_sheet_name
+
+
+def write_ledger(path, customer_ids):
+    pd.DataFrame([{
+        'CustomerID': customer_id,
+        'CustomerName': customer_id,
+        'InvoiceNo': f"INV-{index:04d}",
+        'InvoiceDate': '2026-01-01',
+        'DueDate': '2026-02-01',
+        'Amount': 100.0 + index,
+        'Comments': ''
+    } for index, customer_id in enumerate(customer_ids)]).to_csv(path, index=False)
+
+
+def test_safe_sheet_name_replaces_forbidden_symbols_and_truncates():
+    assert safe_sheet_name('a/b:c') == 'a_b_c'
+    assert len(safe_sheet_name('x' * 40)) == 31
+
+
+def test_workbook_sheet_names_are_unique_after_cleaning(make_config, tmp_path):
+    long_id = 'C' * 35
+    customer_ids = ['acme', 'ACME', 'a/b', 'a_b', 'bucket totals', long_id, long_id.lower()]
+    ledger_file = tmp_path / 'open_invoices.csv'
+    write_ledger(ledger_file, customer_ids)
+    config = make_config({'paths.invoice_ledger_file': str(ledger_file), 'aging.batch_workers': 1})
+
+    result = AgingBatchGenerator(config).generate_batch(single_workbook=True)
+
+    sheet_names = openpyxl.load_workbook(result.workbook_path, read_only=True).sheetnames
+    assert len(sheet_names) == len(customer_ids) + 1
+    assert len({name.lower() for name in sheet_names}) == len(sheet_names)
+    assert {'acme', 'ACME~2', 'a_b', 'a_b~2', 'bucket totals~2'} <= set(sheet_names)
@@ -0,0 +1,21 @@
+import logging
+
+import pytest
+
+pd = pytest.importorskip('pandas')
+
+from customer_unblock.aging_engine import AgingEngine
+
+
+def test_unknown_customer_is_reported_instead_of_silently_empty(make_config, tmp_path, caplog):
+    ledger_file = tmp_path / 'open_invoices.csv'
+    pd.DataFrame([{'CustomerID': 'C1', 'InvoiceNo': 'INV-1', 'InvoiceDate': '2026-01-01',
+                   'DueDate': '2026-02-01', 'Amount': 100.0}]).to_csv(ledger_file, index=False)
+    engine = AgingEngine(make_config({'paths.invoice_ledger_file': str(ledger_file)}))
+
+    with caplog.at_level(logging.WARNING, logger='customer_unblock.aging_engine'):
+        assert len(engine.customer_slice('C1')) == 1
+        assert not caplog.records
+        assert engine.customer_slice('C2').empty
+
+    assert 'C2 has no open invoices' in caplog.text
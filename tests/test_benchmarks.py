@@ -0,0 +1,27 @@
+from benchmarks.corpus_generator import CorpusGenerator
+from benchmarks.run_benchmarks import compare_to_baseline
+
+
+def test_accuracy_only_baseline_ignores_timings():
+    baseline = {'benchmarks': {'parsing': {'accuracy': 0.86}}}
+
+    assert compare_to_baseline({'parsing': {'median_ms': 500.0, 'accuracy': 0.85}}, baseline, 0.25, 0.02) == []
+    assert compare_to_baseline({'parsing': {'median_ms': 1.0, 'accuracy': 0.80}}, baseline, 0.25, 0.02) == [
+        'parsing: accuracy 80.0% < baseline 86.0%'
+    ]
+
+
+def test_slow_and_missing_benchmarks_are_regressions():
+    baseline = {'benchmarks': {'parsing': {'median_ms': 10.0}, 'aging_report': {'median_ms': 5.0}}}
+
+    regressions = compare_to_baseline({'parsing': {'median_ms': 12.6}}, baseline, 0.25, 0.02)
+
+    assert regressions == ['parsing: median 12.600 ms > 12.500 ms (baseline 10.000 ms)',
+                           'aging_report: in the baseline but did not run']
+
+
+def test_ledger_covers_every_customer_with_unique_invoices():
+    ledger = CorpusGenerator(seed=1).generate_ledger(['Acme', 'Globex', 'Initech'], invoices_per_customer=3)
+
+    assert {row['CustomerID'] for row in ledger} == {'CUST-00001', 'CUST-00002', 'CUST-00003'}
+    assert len({row['InvoiceNo'] for row in ledger}) == len(ledger)
@@ -0,0 +1,78 @@
+import json
+import os
+
+from customer_unblock.block_detector import BlockDetector
+
+
+def write_export(folder, name, rows):
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, name), 'w', encoding='utf-8') as f:
+        for row in rows:
+            f.write(json.dumps(row) + '\n')
+
+
+def block(customer_id, blocked_at=None):
+    row = {'CustomerID': customer_id, 'CustomerName': f"Customer {customer_id}", 'BlockReason': 'Credit limit'}
+    if blocked_at:
+        row['BlockedAt'] = blocked_at
+    return row
+
+
+def detect(config, failing=()):
+    detector = BlockDetector(config)
+    delivered = []
+    for customer_id, customer_name, block_reason in detector.detect_blocks_from_exports():
+        delivered.append(customer_id)
+        if customer_id in failing:
+            detector.mark_failed(customer_id, customer_name, block_reason)
+    return delivered
+
+
+def make_detector_config(make_config, tmp_path):
+    return make_config({'paths.block_export_folder': str(tmp_path / 'exports')})
+
+
+def test_customers_blocked_at_the_watermark_time_are_told_apart(make_config, tmp_path):
+    config = make_detector_config(make_config, tmp_path)
+    write_export(tmp_path / 'exports', 'blocks_1.jsonl', [block('C1', '2026-10-01T09:00:00'),
+                                                          block('C2', '2026-10-01T10:00:00')])
+    assert detect(config) == ['C1', 'C2']
+
+    write_export(tmp_path / 'exports', 'blocks_2.jsonl', [block('C2', '2026-10-01T10:00:00'),
+                                                          block('C3', '2026-10-01T10:00:00'),
+                                                          block('C4', '2026-10-01T08:00:00')])
+    assert detect(config) == ['C3']
+
+
+def test_undated_rows_are_delivered_once(make_config, tmp_path):
+    config = make_detector_config(make_config, tmp_path)
+    write_export(tmp_path / 'exports', 'blocks_1.jsonl', [block('C1'), block('C1')])
+    assert detect(config) == ['C1']
+
+    write_export(tmp_path / 'exports', 'blocks_2.jsonl', [block('C1'), block('C2')])
+    assert detect(config) == ['C2']
+
+
+def test_legacy_single_position_watermark_is_read(make_config, tmp_path):
+    config = make_detector_config(make_config, tmp_path)
+    detector = BlockDetector(config)
+    os.makedirs(os.path.dirname(detector.watermark_file), exist_ok=True)
+    with open(detector.watermark_file, 'w') as f:
+        json.dump({'blocked_at': '2026-10-01T10:00:00', 'customer_id': 'C1'}, f)
+
+    write_export(tmp_path / 'exports', 'blocks_1.jsonl', [block('C1', '2026-10-01T10:00:00'),
+                                                          block('C2', '2026-10-01T10:00:00')])
+    assert detect(config) == ['C2']
+
+
+def test_failed_customers_are_retried_without_holding_back_the_watermark(make_config, tmp_path):
+    config = make_detector_config(make_config, tmp_path)
+    write_export(tmp_path / 'exports', 'blocks_1.jsonl', [block('C1', '2026-10-01T09:00:00'),
+                                                          block('C2', '2026-10-01T10:00:00')])
+    assert detect(config, failing={'C1'}) == ['C1', 'C2']
+
+    assert BlockDetector(config).has_pending_exports()
+    assert detect(config, failing={'C1'}) == ['C1']
+    assert detect(config) == ['C1']
+    assert not BlockDetector(config).has_pending_exports()
+    assert detect(config) == []
@@ -0,0 +1,76 @@
+import random
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from order_processing.duplicate_detector import (BLOCK_BITS, BLOCK_COUNT, DuplicateDetector, _blocks,
+                                                 _to_signed, simhash)
+
+PO_TEXT = """PURCHASE ORDER
+Customer Name: Northwind Traders
+Order Date: 2026-10-01
+Item Description: Industrial Widget Assembly
+Quantity: 25
+Ship to: 12 Harbour Road, Portsmouth
+"""
+
+ORDER = {'customer_name': 'Northwind Traders', 'po_number': '', 'order_date': '2026-10-01',
+         'item_description': 'Industrial Widget Assembly', 'quantity': '25'}
+
+
+def test_fingerprints_within_three_bits_share_a_block():
+    rng = random.Random(7)
+    for _ in range(200):
+        value = rng.getrandbits(64)
+        flipped = value
+        for bit in rng.sample(range(64), BLOCK_COUNT - 1):
+            flipped ^= 1 << bit
+        assert any(a == b for a, b in zip(_blocks(value), _blocks(flipped)))
+
+
+def test_blocks_and_signed_storage_round_trip():
+    value = (1 << 64) - 12345
+    blocks = _blocks(value)
+    assert sum(block << (BLOCK_BITS * i) for i, block in enumerate(blocks)) == value
+    assert _to_signed(value) & ((1 << 64) - 1) == value
+    assert _to_signed(5) == 5
+
+
+def test_ocr_noise_moves_the_fingerprint_only_a_few_bits():
+    noisy = PO_TEXT.replace('Harbour', 'Harb0ur')
+    distance = bin(simhash(PO_TEXT, {'item': 'widget'}) ^ simhash(noisy, {'item': 'widget'})).count('1')
+    assert distance <= 3
+
+
+def test_resent_scan_is_matched_through_a_shared_block(make_config):
+    detector = DuplicateDetector(make_config())
+    detector.register(PO_TEXT, ORDER, 'PO_scan_1.png', 'SO-1001')
+
+    match = detector.check(PO_TEXT.replace('Harbour', 'Harb0ur'), ORDER)
+
+    assert match is not None
+    assert (match.filename, match.sales_order_number) == ('PO_scan_1.png', 'SO-1001')
+
+
+def test_same_po_number_is_a_resend_whatever_the_text(make_config):
+    detector = DuplicateDetector(make_config())
+    order = {**ORDER, 'po_number': 'PO-123'}
+    detector.register(PO_TEXT, order, 'PO_123.txt', 'SO-1')
+
+    match = detector.check('completely different layout', {**order, 'po_number': 'PO 123'})
+
+    assert match.distance == 0
+    assert match.reason == 'same customer, PO number, item and quantity'
+
+
+@pytest.mark.parametrize('stored, change', [
+    ({'po_number': 'PO-123'}, {'quantity': '30'}),
+    ({'po_number': 'PO-123'}, {'po_number': 'PO-124'}),
+    ({}, {'order_date': '2026-11-01'})
+])
+def test_recurring_orders_are_not_duplicates(make_config, stored, change):
+    detector = DuplicateDetector(make_config())
+    detector.register(PO_TEXT, {**ORDER, **stored}, 'PO_123.txt', 'SO-1')
+
+    assert detector.check(PO_TEXT, {**ORDER, **stored, **change}) is None
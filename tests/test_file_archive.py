@@ -0,0 +1,56 @@
+import os
+import multiprocessing
+
+from order_processing.file_archive import FileArchive
+
+
+def archive_files(config, paths):
+    archive = FileArchive(config)
+    for path in paths:
+        archive.archive_file(path, 'processed')
+    archive.close()
+
+
+def test_archive_round_trip_stores_identical_content_once(make_config, tmp_path):
+    archive = FileArchive(make_config({'paths.archive_folder': str(tmp_path / 'archive')}))
+    first = tmp_path / 'PO_1.txt'
+    second = tmp_path / 'PO_1_copy.txt'
+    first.write_bytes(b'PO Number: 1\n')
+    second.write_bytes(b'PO Number: 1\n')
+
+    first_id = archive.archive_file(str(first), 'processed')
+    second_id = archive.archive_file(str(second), 'exception', 'duplicate')
+
+    assert archive.read_content(second_id) == b'PO Number: 1\n'
+    assert archive.get_entry(first_id).offset == archive.get_entry(second_id).offset
+    assert not first.exists()
+
+
+def test_concurrent_processes_append_without_overlapping_records(make_config, tmp_path):
+    config = make_config({'paths.archive_folder': str(tmp_path / 'archive'), 'archive.fsync': False,
+                          'archive.compression_level': 0})
+    contents = {}
+    batches = []
+    for worker in range(4):
+        paths = []
+        for index in range(25):
+            path = tmp_path / f"PO_{worker}_{index}.pdf"
+            contents[path.name] = os.urandom(64 * 1024)
+            path.write_bytes(contents[path.name])
+            paths.append(str(path))
+        batches.append(paths)
+
+    context = multiprocessing.get_context('fork')
+    workers = [context.Process(target=archive_files, args=(config, paths)) for paths in batches]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert all(worker.exitcode == 0 for worker in workers)
+
+    archive = FileArchive(config)
+    entries = archive.list_entries(limit=1000)
+    assert len(entries) == len(contents)
+    for entry in entries:
+        assert archive.read_content(entry.entry_id) == contents[entry.filename]
+    assert archive.rebuild_index() == len(contents)
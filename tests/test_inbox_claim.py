@@ -0,0 +1,86 @@
+import os
+import time
+
+import pytest
+
+from order_processing.inbox_claim import InboxClaimer
+
+
+@pytest.fixture
+def claimers(make_config, tmp_path):
+    def build(worker_id):
+        claimer = InboxClaimer(make_config({'cluster.worker_id': worker_id, 'cluster.lease_seconds': 60}))
+        claimer.start()
+        started.append(claimer)
+        return claimer
+
+    started = []
+    yield build
+    for claimer in started:
+        claimer.stop()
+
+
+def inbox_file(claimer, name, content='PO'):
+    inbox = os.path.dirname(claimer.claims_folder)
+    os.makedirs(inbox, exist_ok=True)
+    path = os.path.join(inbox, name)
+    with open(path, 'w') as f:
+        f.write(content)
+    return path
+
+
+def expire(claimer):
+    old = time.time() - 3600
+    os.utime(claimer.lease_path, (old, old))
+
+
+def test_only_one_worker_wins_a_claim(claimers):
+    first, second = claimers('worker-a'), claimers('worker-b')
+    path = inbox_file(first, 'PO_1.txt')
+
+    claimed = first.claim(path)
+
+    assert claimed == os.path.join(first.worker_folder, 'PO_1.txt')
+    assert second.claim(path) is None
+    assert first.claimed_files() == [claimed]
+
+
+def test_a_second_file_with_a_held_name_does_not_replace_it(claimers):
+    worker = claimers('worker-a')
+    first = worker.claim(inbox_file(worker, 'PO_1.txt', 'first'))
+    second = worker.claim(inbox_file(worker, 'PO_1.txt', 'second'))
+
+    assert second == os.path.join(worker.worker_folder, 'PO_1_1.txt')
+    with open(first) as f:
+        assert f.read() == 'first'
+
+
+def test_expired_leases_are_recovered_by_side_effect_stage(claimers):
+    dead, live = claimers('worker-a'), claimers('worker-b')
+    fresh = dead.claim(inbox_file(dead, 'PO_1.txt'))
+    ordered = dead.claim(inbox_file(dead, 'PO_2.txt'))
+    dead.track(fresh, 'hash-1', 'PARSED')
+    dead.track(ordered, 'hash-2', 'SKU_MAPPED')
+    dead.on_stage('hash-2', 'SALES_ORDER_CREATED')
+    dead._stop_event.set()
+
+    assert live.recover_expired() == ([], [])
+    expire(dead)
+    reprocess, review = live.recover_expired()
+
+    assert reprocess == [os.path.join(live.worker_folder, 'PO_1.txt')]
+    assert [path for path, _ in review] == [os.path.join(live.worker_folder, 'PO_2.txt')]
+    assert 'SALES_ORDER_CREATED' in review[0][1]
+    assert not os.path.exists(dead.worker_folder)
+
+
+def test_completed_files_leave_the_lease_progress(claimers):
+    worker = claimers('worker-a')
+    path = worker.claim(inbox_file(worker, 'PO_1.txt'))
+    worker.track(path, 'hash-1', None)
+    worker.on_stage('hash-1', 'SALES_ORDER_CREATED')
+
+    worker.on_stage('hash-1', 'COMPLETED')
+    worker._write_lease()
+
+    assert worker._read_progress(worker.lease_path) == {}
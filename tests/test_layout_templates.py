@@ -0,0 +1,122 @@
+import json
+
+import pytest
+
+pytest.importorskip('cv2')
+pytest.importorskip('pytesseract')
+np = pytest.importorskip('numpy')
+
+from order_processing.data_parser import DataParser
+from order_processing.layout_templates import TEMPLATE_VERSION, LayoutTemplateStore
+from order_processing.text_extractor import TextExtractor
+
+CHAR_WIDTH = 10
+LINE_PITCH = 30
+PAGE_WIDTH = 1000
+
+PO_LINES = [
+    'Customer: Acme Corp',
+    'PO Number: 4411',
+    'Order Date: 2024-01-15',
+    'Item: Blue Widget',
+    'Quantity: 50',
+    'Unit Price: $12.50'
+]
+
+
+def render(lines):
+    """Page whose pixels encode (line, column) so a fake OCR can read back any region"""
+    page = np.zeros((LINE_PITCH * len(lines) + 20, PAGE_WIDTH), dtype=np.int32)
+    for row, text in enumerate(lines):
+        top = LINE_PITCH * row + 5
+        for column, char in enumerate(text):
+            if char != ' ':
+                page[top:top + 20, column * CHAR_WIDTH:(column + 1) * CHAR_WIDTH] = (row + 1) * 1000 + column
+    return page
+
+
+def fake_ocr(lines, configs):
+    """Stand-in for Tesseract that reads the characters covered by a crop of a rendered page"""
+    def ocr_lines(image, scale=1.0, config=''):
+        configs.append(config)
+        result = []
+        for code in sorted({value // 1000 for value in np.unique(image) if value}):
+            row = code - 1
+            columns = [value % 1000 for value in np.unique(image) if value // 1000 == code]
+            start, end = min(columns), max(columns) + 1
+            text = lines[row][start:end]
+            words, position = [], start
+            for word in text.split():
+                position = lines[row].index(word, position)
+                words.append((word, [position * CHAR_WIDTH, LINE_PITCH * row + 5,
+                                     (position + len(word)) * CHAR_WIDTH, LINE_PITCH * row + 25]))
+                position += len(word)
+            result.append({
+                'text': text.strip(),
+                'confidence': 95.0,
+                'box': [words[0][1][0], LINE_PITCH * row + 5, words[-1][1][2], LINE_PITCH * row + 25],
+                'words': words
+            })
+        return result
+    return ocr_lines
+
+
+@pytest.fixture
+def extractor(make_config, tmp_path):
+    config = make_config({
+        'paths.layout_templates_file': str(tmp_path / 'layout_templates.json'),
+        'ocr_templates.min_samples': 1
+    })
+    return TextExtractor(config), DataParser(config)
+
+
+def learn_and_read(text_extractor, parser, lines):
+    """Learn a template from a full-page read, then parse the template-only read of the same page"""
+    configs = []
+    page = render(lines)
+    text_extractor._ocr_lines = fake_ocr(lines, configs)
+
+    full_lines = text_extractor._ocr_lines(page)
+    full_order = parser.parse_text('\n'.join(line['text'] for line in full_lines))
+    text_extractor._remember_layout('po.png', '0' * 256, page.shape, full_lines)
+    text_extractor.learn_layout('po.png', full_order)
+
+    template = text_extractor.layout_templates.match('0' * 256)
+    assert template is not None
+    configs.clear()
+    template_text = text_extractor._extract_with_template(template, page)
+    return full_order, parser.parse_text(template_text), configs
+
+
+def test_template_read_keeps_every_field_of_a_full_page_read(extractor):
+    text_extractor, parser = extractor
+    full_order, template_order, _ = learn_and_read(text_extractor, parser, PO_LINES)
+
+    assert full_order.price == '12.50'
+    assert full_order.order_date == '2024-01-15'
+    assert template_order == full_order
+
+
+def test_quantity_region_excludes_its_label(extractor):
+    text_extractor, parser = extractor
+    page = render(PO_LINES)
+    _, template_order, _ = learn_and_read(text_extractor, parser, PO_LINES)
+
+    template = text_extractor.layout_templates.match('0' * 256)
+    left, top, right, bottom = LayoutTemplateStore.region(template, 'quantity', page.shape)
+    read = fake_ocr(PO_LINES, [])(page[top:bottom, left:right])
+    assert [line['text'] for line in read] == ['50']
+    assert template_order.quantity == '50'
+
+
+def test_templates_from_older_versions_relearn(make_config, tmp_path):
+    templates_file = tmp_path / 'layout_templates.json'
+    templates_file.write_text(json.dumps([{
+        'customer': 'Acme Corp', 'signature': '0' * 256, 'samples': 5,
+        'fields': {'customer': [0, 0, 1, 0.1], 'quantity': [0, 0.5, 1, 0.6]}
+    }]))
+    store = LayoutTemplateStore(make_config({'paths.layout_templates_file': str(templates_file)}))
+
+    assert store.match('0' * 256) is None
+    assert 'quantity' not in store.templates[0]['fields']
+    assert store.templates[0]['version'] == TEMPLATE_VERSION
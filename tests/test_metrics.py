@@ -0,0 +1,37 @@
+import pytest
+
+from utils.metrics import MetricsRegistry
+
+
+def test_histogram_buckets_are_cumulative_and_inclusive():
+    registry = MetricsRegistry()
+    latency = registry.histogram('rpa_stage_seconds', 'Stage latency', ['stage'], buckets=(0.1, 1.0, 0.5))
+    for seconds in (0.05, 0.1, 0.3, 0.5, 2.0):
+        latency.labels(stage='ocr').observe(seconds)
+
+    lines = registry.render().splitlines()
+
+    assert lines[:2] == ['# HELP rpa_stage_seconds Stage latency', '# TYPE rpa_stage_seconds histogram']
+    assert lines[2:] == [
+        'rpa_stage_seconds_bucket{stage="ocr",le="0.1"} 2',
+        'rpa_stage_seconds_bucket{stage="ocr",le="0.5"} 4',
+        'rpa_stage_seconds_bucket{stage="ocr",le="1"} 4',
+        'rpa_stage_seconds_bucket{stage="ocr",le="+Inf"} 5',
+        'rpa_stage_seconds_sum{stage="ocr"} 2.95',
+        'rpa_stage_seconds_count{stage="ocr"} 5'
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter('rpa_errors_total', 'Errors', ['reason']).labels(reason='bad "PO"\nline').inc(2)
+
+    assert 'rpa_errors_total{reason="bad \\"PO\\"\\nline"} 2' in registry.render()
+
+
+def test_a_name_keeps_its_metric_type():
+    registry = MetricsRegistry()
+    assert registry.counter('rpa_files_total', 'Files') is registry.counter('rpa_files_total', 'Files')
+
+    with pytest.raises(ValueError):
+        registry.gauge('rpa_files_total', 'Files')
@@ -0,0 +1,67 @@
+import os
+
+import pytest
+
+from order_processing.processing_journal import ProcessingJournal
+
+
+@pytest.fixture
+def document(tmp_path):
+    path = tmp_path / 'PO_1001.txt'
+    path.write_text('PO Number: 1001\n')
+    return str(path)
+
+
+def journal_lines(journal):
+    if not os.path.exists(journal.journal_file):
+        return []
+    with open(journal.journal_file, 'rb') as f:
+        return f.read().splitlines()
+
+
+def test_replay_resumes_after_the_last_durable_stage(make_config, document):
+    journal = ProcessingJournal(make_config())
+    content_hash = journal.begin(document)
+    journal.record(content_hash, 'SALES_ORDER_CREATED', {'so_result': {'so_number': 'SO-1'}})
+
+    replayed = ProcessingJournal(make_config())
+
+    assert replayed.has_reached(content_hash, 'SALES_ORDER_CREATED')
+    assert not replayed.has_reached(content_hash, 'DELIVERY_NOTE_CREATED')
+    assert replayed.get_data(content_hash, 'so_result') == {'so_number': 'SO-1'}
+
+
+def test_torn_tail_is_discarded_and_cut_off(make_config, document):
+    journal = ProcessingJournal(make_config())
+    content_hash = journal.begin(document)
+    journal.record(content_hash, 'SALES_ORDER_CREATED', {'so_result': {'so_number': 'SO-1'}})
+    with open(journal.journal_file, 'ab') as f:
+        f.write(b'{"ts": "2026-10-19T10:00:00.000", "hash": "' + content_hash.encode() + b'", "sta')
+
+    replayed = ProcessingJournal(make_config())
+    replayed.record(content_hash, 'DELIVERY_NOTE_CREATED', {'dn_result': {'dn_number': 'DN-1'}})
+
+    assert replayed.get_state(content_hash)['stage'] == 'DELIVERY_NOTE_CREATED'
+    assert len(journal_lines(replayed)) == 3
+    assert ProcessingJournal(make_config()).has_reached(content_hash, 'DELIVERY_NOTE_CREATED')
+
+
+def test_completion_after_a_sales_order_is_written_at_once(make_config, document):
+    journal = ProcessingJournal(make_config({'journal.batch_size': 100}))
+    content_hash = journal.begin(document)
+    journal.record(content_hash, 'SALES_ORDER_CREATED', {'so_result': {'so_number': 'SO-1'}})
+
+    journal.complete(content_hash)
+
+    assert ProcessingJournal(make_config()).get_state(content_hash) is None
+
+
+def test_completion_before_any_erp_document_stays_batched(make_config, document):
+    journal = ProcessingJournal(make_config({'journal.batch_size': 100}))
+    content_hash = journal.begin(document)
+
+    journal.complete(content_hash, 'exception')
+
+    assert journal_lines(journal) == []
+    journal.flush()
+    assert len(journal_lines(journal)) == 2
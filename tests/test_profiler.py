@@ -0,0 +1,54 @@
+import time
+from types import SimpleNamespace
+
+from utils import profiler
+from utils.profiler import StageProfiler
+
+
+def dense_call_graph(layers, width, self_seconds):
+    """Stats where every function of a layer calls every function of the next one"""
+    def func(layer, index):
+        return ('pipeline.py', layer * 100 + index, f"f{layer}_{index}")
+
+    cumulative = {layer: self_seconds * (layers - layer) for layer in range(1, layers)}
+    root = ('pipeline.py', 1, 'root')
+    raw = {root: (1, 1, self_seconds, self_seconds + cumulative[1] * width, {})}
+    for layer in range(1, layers):
+        for index in range(width):
+            if layer == 1:
+                callers = {root: (1, 1, self_seconds, cumulative[1])}
+            else:
+                callers = {func(layer - 1, caller): (1, 1, self_seconds / width, cumulative[layer] / width)
+                           for caller in range(width)}
+            raw[func(layer, index)] = (width, width, self_seconds, cumulative[layer], callers)
+    return SimpleNamespace(stats=raw)
+
+
+def test_folded_stacks_split_self_time_across_callers(make_config):
+    stats = dense_call_graph(layers=3, width=2, self_seconds=0.01)
+    stacks = dict(StageProfiler(make_config(), 'orders')._folded_stacks('extraction', stats))
+
+    leaf = 'extraction;root (pipeline.py:1);f1_0 (pipeline.py:100);f2_1 (pipeline.py:201)'
+    assert stacks[leaf] == 5000
+    assert sum(stacks.values()) == 10000 + 2 * 10000 + 4 * 5000
+
+
+def test_dense_call_graphs_are_pruned_instead_of_enumerated(make_config):
+    # 4^29 paths without pruning
+    stats = dense_call_graph(layers=30, width=4, self_seconds=0.001)
+
+    started = time.perf_counter()
+    stacks = StageProfiler(make_config(), 'unblock')._folded_stacks('aging', stats)
+
+    assert time.perf_counter() - started < 10
+    assert stacks
+    assert all(len(stack.split(';')) <= profiler.MAX_STACK_DEPTH + 1 for stack, _ in stacks)
+
+
+def test_path_budget_stops_the_walk(make_config, monkeypatch):
+    monkeypatch.setattr(profiler, 'MAX_STACK_PATHS', 50)
+    stats = dense_call_graph(layers=12, width=3, self_seconds=1.0)
+
+    stacks = StageProfiler(make_config(), 'unblock')._folded_stacks('aging', stats)
+
+    assert 0 < len(stacks) <= 50
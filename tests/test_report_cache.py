@@ -0,0 +1,46 @@
+import os
+
+from customer_unblock.report_cache import ReportCache
+
+
+def write_report(folder, name, size=1024):
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def test_lookup_returns_a_copy_owned_by_the_cache(make_config, tmp_path):
+    cache = ReportCache(make_config())
+    report = write_report(tmp_path / 'reports' / 'aging_batch_1', 'AgingReport_C1.xlsx')
+
+    cache.store('C1', 'xlsx', 'abc', report)
+    cached = cache.lookup('C1', 'xlsx', 'abc')
+
+    assert cached != report
+    assert os.path.dirname(cached) == cache.cache_folder
+    assert ReportCache(make_config()).lookup('C1', 'xlsx', 'abc') == cached
+
+
+def test_eviction_never_deletes_reports_outside_the_cache_folder(make_config, tmp_path):
+    cache = ReportCache(make_config({'aging.cache_max_mb': 0}))
+    report = write_report(tmp_path / 'reports' / 'aging_batch_1', 'AgingReport_C1.xlsx')
+
+    cache.store('C1', 'xlsx', 'abc', report)
+
+    assert os.path.exists(report)
+    assert cache.lookup('C1', 'xlsx', 'abc') is None
+    assert os.listdir(cache.cache_folder) == ['index.json']
+
+
+def test_index_entries_outside_the_cache_folder_are_dropped_not_deleted(make_config, tmp_path):
+    cache = ReportCache(make_config())
+    report = write_report(tmp_path / 'reports', 'AgingReport_C1.xlsx')
+    cache._entries['C1|xlsx|abc'] = {'customer_id': 'C1', 'path': report, 'size': 1024,
+                                     'created_at': 0, 'last_used': 0}
+
+    cache.flush()
+
+    assert os.path.exists(report)
+    assert ReportCache(make_config())._entries == {}
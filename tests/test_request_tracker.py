@@ -0,0 +1,26 @@
+import sqlite3
+
+from customer_unblock.request_tracker import RequestTracker, is_durable_status
+
+
+def stored_statuses(tracker):
+    with sqlite3.connect(tracker.store_path) as conn:
+        return [row[0] for row in conn.execute('SELECT status FROM request_events ORDER BY event_id')]
+
+
+def test_final_statuses_are_durable():
+    for status in ('APPROVED_COMPLETED', 'REJECTED', 'TIMEOUT_TIMEOUT', 'ERROR_smtp down', 'APPROVAL_SENT'):
+        assert is_durable_status(status)
+    assert not is_durable_status('PENDING_APPROVAL')
+
+
+def test_final_status_is_written_without_waiting_for_the_batch(make_config):
+    tracker = RequestTracker(make_config({'request_store.batch_size': 100,
+                                          'request_store.flush_interval_seconds': 3600}))
+
+    tracker.log_request('UNB-1', 'Acme', 'PENDING_APPROVAL', customer_id='C1')
+    assert stored_statuses(tracker) == []
+
+    tracker.log_request('UNB-1', 'Acme', 'REJECTED')
+    assert stored_statuses(tracker) == ['PENDING_APPROVAL', 'REJECTED']
+    tracker.close()
@@ -0,0 +1,64 @@
+import os
+import time
+
+from order_processing.scheduler import CostAwareScheduler
+
+
+def queue_file(folder, name, size=100, age_seconds=0):
+    path = folder / name
+    path.write_bytes(b'x' * size)
+    mtime = time.time() - age_seconds
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def test_shortest_expected_job_runs_first(make_config, tmp_path):
+    scheduler = CostAwareScheduler(make_config({'scheduling.aging_rate': 0}))
+    scan = queue_file(tmp_path, 'scan.png', size=2 * 1024 * 1024)
+    pdf = queue_file(tmp_path, 'order.pdf')
+    text = queue_file(tmp_path, 'order.txt')
+
+    assert scheduler.schedule([scan, pdf, text]) == [text, pdf, scan]
+
+
+def test_waiting_discounts_cost_and_starved_files_jump_ahead(make_config, tmp_path):
+    scheduler = CostAwareScheduler(make_config({'scheduling.aging_rate': 0.05,
+                                                'scheduling.starvation_limit_seconds': 1800}))
+    text = queue_file(tmp_path, 'order.txt')
+    aged_scan = queue_file(tmp_path, 'aged.png', size=1024 * 1024, age_seconds=600)
+    starved_scan = queue_file(tmp_path, 'starved.png', size=8 * 1024 * 1024, age_seconds=3600)
+
+    assert scheduler.schedule([text, aged_scan, starved_scan]) == [starved_scan, aged_scan, text]
+
+
+def test_priority_lanes_come_before_cost(make_config, tmp_path):
+    scheduler = CostAwareScheduler(make_config({'scheduling.priority_lanes': [{'pattern': 'rush_*', 'lane': 0}]}))
+    text = queue_file(tmp_path, 'order.txt')
+    rush_scan = queue_file(tmp_path, 'rush_order.png', size=4 * 1024 * 1024)
+
+    assert scheduler.schedule([text, rush_scan]) == [rush_scan, text]
+
+
+def test_learned_timings_scale_extraction_per_unit(make_config, tmp_path):
+    scheduler = CostAwareScheduler(make_config({'scheduling.smoothing': 0.5}))
+    scan = queue_file(tmp_path, 'scan.png', size=2 * 1024 * 1024)
+    scheduler.schedule([scan])
+
+    scheduler.record_timings(scan, {'extraction': 4.0, 'parsing': 0.2})
+
+    assert scheduler.stats['.png'] == {'extraction': 2.0, 'parsing': 0.2}
+    assert scheduler.estimate_seconds('.png', 3) == 2.0 * 3 + 0.2
+
+
+def test_failed_and_lost_files_are_forgotten(make_config, tmp_path):
+    scheduler = CostAwareScheduler(make_config())
+    failed = queue_file(tmp_path, 'failed.txt')
+    claimed = queue_file(tmp_path, 'claimed.txt')
+    scheduler.schedule([failed, claimed])
+
+    scheduler.forget(failed)
+    scheduler.rename(claimed, claimed + '.worker')
+    os.remove(claimed)
+    scheduler.schedule([claimed])
+
+    assert scheduler._work_units == {claimed + '.worker': ('.txt', 1.0)}
@@ -0,0 +1,73 @@
+import pytest
+
+cv2 = pytest.importorskip('cv2')
+pytesseract = pytest.importorskip('pytesseract')
+np = pytest.importorskip('numpy')
+
+from order_processing.text_extractor import TextExtractor
+
+CLEAN_LINES = ['Customer: Acme Corp', 'Item: Blue Widget', 'Quantity: 50', 'PO Number: 4411',
+               'Order Date: 2024-01-15', 'Unit Price: $12.50', 'Ship via ground', 'Thank you',
+               'Terms: net 30', 'Page 1']
+
+
+@pytest.fixture
+def scan(tmp_path):
+    path = tmp_path / 'po.png'
+    cv2.imwrite(str(path), np.full((400, 800, 3), 255, dtype=np.uint8))
+    return str(path)
+
+
+@pytest.fixture
+def extractor(make_config, tmp_path, monkeypatch):
+    text_extractor = TextExtractor(make_config({
+        'paths.layout_templates_file': str(tmp_path / 'layout_templates.json')
+    }))
+    calls = {'reread': 0, 'full': 0}
+
+    def reread(line, candidates):
+        calls['reread'] += 1
+        return {**line, 'confidence': 90.0}
+
+    def full_page(image, lang=None):
+        calls['full'] += 1
+        return '\n'.join(CLEAN_LINES)
+
+    text_extractor._reread_line = reread
+    monkeypatch.setattr(pytesseract, 'image_to_string', full_page)
+    return text_extractor, calls
+
+
+def first_pass(confidences):
+    def ocr_lines(image, scale=1.0, config=''):
+        return [{'text': text, 'confidence': confidence, 'box': [0, 20 * i, 200, 20 * i + 15], 'words': []}
+                for i, (text, confidence) in enumerate(zip(CLEAN_LINES, confidences))]
+    return ocr_lines
+
+
+def test_a_few_weak_lines_are_reread_without_a_full_page_pass(extractor, scan):
+    text_extractor, calls = extractor
+    text_extractor._ocr_lines = first_pass([95.0] * 9 + [30.0])
+
+    text = text_extractor.extract_from_file(scan)
+
+    assert calls == {'reread': 1, 'full': 0}
+    assert 'Quantity: 50' in text
+
+
+def test_a_noisy_scan_goes_straight_to_one_full_page_pass(extractor, scan):
+    text_extractor, calls = extractor
+    text_extractor._ocr_lines = first_pass([30.0] * 6 + [95.0] * 4)
+
+    text = text_extractor.extract_from_file(scan)
+
+    assert calls == {'reread': 0, 'full': 1}
+    assert text == '\n'.join(CLEAN_LINES)
+
+
+def test_the_weak_line_count_cap_applies_to_long_pages(extractor):
+    text_extractor, _ = extractor
+
+    assert not text_extractor._too_weak_for_rereads(3, 40)
+    assert text_extractor._too_weak_for_rereads(9, 40)
+    assert text_extractor._too_weak_for_rereads(0, 0)
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from utils.tracing import Tracer, _covered_ms, critical_path, slowest_traces
+
+
+def span(span_id, parent, name, start_ms, duration_ms):
+    return {'id': span_id, 'parent': parent, 'name': name, 'start_ms': start_ms, 'duration_ms': duration_ms}
+
+
+def test_critical_path_follows_the_last_finishing_children():
+    record = {'spans': [
+        span(1, None, 'order_file', 0, 100),
+        span(2, 1, 'extraction', 0, 30),
+        span(3, 1, 'sku_mapping', 10, 50),
+        span(4, 1, 'erp_sales_order', 60, 30),
+        span(5, 4, 'erp_call', 65, 20)
+    ]}
+
+    path = critical_path(record)
+
+    assert [(step['name'], step['depth']) for step in path] == [
+        ('order_file', 0), ('sku_mapping', 1), ('erp_sales_order', 1), ('erp_call', 2)
+    ]
+    assert [step['self_ms'] for step in path] == [10.0, 50.0, 10.0, 20.0]
+
+
+def test_covered_time_merges_overlapping_spans():
+    assert _covered_ms([span(1, None, 'a', 0, 30), span(2, None, 'b', 10, 50), span(3, None, 'c', 70, 10)]) == 70
+
+
+def test_traces_export_nested_spans_and_errors(make_config, tmp_path):
+    trace_file = tmp_path / 'traces.jsonl'
+    tracer = Tracer()
+    tracer.configure(make_config({'paths.trace_file': str(trace_file)}))
+
+    with tracer.trace('order_file', trace_id='PO-1', file='PO_1.txt'):
+        with tracer.span('extraction'):
+            with tracer.span('ocr_pass'):
+                pass
+    with pytest.raises(ValueError):
+        with tracer.trace('order_file', trace_id='PO-2'):
+            raise ValueError('no text')
+
+    first, second = [json.loads(line) for line in trace_file.read_text().splitlines()]
+    assert [(s['id'], s['parent'], s['name']) for s in first['spans']] == [
+        (1, None, 'order_file'), (2, 1, 'extraction'), (3, 2, 'ocr_pass')
+    ]
+    assert first['attributes'] == {'file': 'PO_1.txt'}
+    assert second['error'] == 'ValueError: no text'
+    assert len(slowest_traces(str(trace_file), top=1)) == 1
+
+
+def test_spans_outside_a_trace_are_no_ops():
+    tracer = Tracer()
+    with tracer.span('orphan') as orphan:
+        assert orphan is None
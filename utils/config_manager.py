@@ -33,12 +33,159 @@ class ConfigManager:
                 "exceptions_folder": "data/exceptions",
                 "reports_folder": "reports",
                 "logs_folder": "logs",
+                "archive_folder": "data/archive",
+                "journal_file": "logs/processing_journal.jsonl",
+                "scheduler_stats_file": "logs/scheduler_stats.json",
+                "block_export_folder": "data/erp_exports",
+                "block_watermark_file": "logs/block_watermark.json",
+                "invoice_ledger_file": "data/ledger/open_invoices.csv",
+                "request_store": "logs/unblock_requests.db",
+                "layout_templates_file": "config/layout_templates.json",
+                "parser_profiles_file": "config/parser_profiles.json",
+                "duplicate_index_file": "logs/duplicate_index.db",
+                "exception_index_file": "logs/exception_index.db",
+                "replay_folder": "data/replay",
+                "trace_file": "logs/traces.jsonl",
                 "sku_mapping_file": "config/sku_mapping.xlsx"
             },
             "processing": {
                 "max_file_size_mb": 50,
                 "supported_formats": [".txt", ".pdf", ".jpg", ".jpeg", ".png"],
-                "ocr_language": "eng"
+                "ocr_language": "eng",
+                "ocr_first_pass_scale": 0.5,
+                "ocr_first_pass_min_width": 1200,
+                "ocr_min_confidence": 60,
+                "ocr_max_reread_lines": 8,
+                "ocr_max_reread_fraction": 0.3
+            },
+            "parser": {
+                "header_lines": 12
+            },
+            "ocr_templates": {
+                "enabled": True,
+                "max_signature_distance": 24,
+                "min_samples": 2
+            },
+            "tracing": {
+                "enabled": True,
+                "sample_rate": 1.0,
+                "max_spans_per_trace": 2000
+            },
+            "exceptions": {
+                "replay_on_catalog_change": True,
+                "replay_lease_seconds": 3600
+            },
+            "duplicates": {
+                "enabled": True,
+                "window_days": 30,
+                "max_distance": 3
+            },
+            "cluster": {
+                "enabled": False,
+                "worker_id": "",
+                "lease_seconds": 120,
+                "heartbeat_seconds": 30
+            },
+            "archive": {
+                "enabled": True,
+                "segment_max_mb": 256,
+                "compression_level": 6,
+                "fsync": True,
+                "lock_timeout_seconds": 30
+            },
+            "journal": {
+                "batch_size": 32,
+                "compact_after_records": 5000
+            },
+            "scheduling": {
+                "smoothing": 0.2,
+                "aging_rate": 0.05,
+                "starvation_limit_seconds": 1800,
+                "default_lane": 1,
+                "priority_lanes": []
+            },
+            "metrics": {
+                "enabled": True,
+                "textfile": "logs/metrics.prom",
+                "http_host": "127.0.0.1",
+                "http_port": None
+            },
+            "profiling": {
+                "enabled": False,
+                "sample_rate": 1.0,
+                "traceback_frames": 10,
+                "top_allocations": 25
+            },
+            "logging": {
+                "level": "INFO",
+                "format": "text",
+                "max_bytes": 52428800,
+                "backup_count": 5,
+                "sampling": {
+                    "order_processing.sku_maper": 10,
+                    "order_processing.text_extractor": 10
+                }
+            },
+            "block_detection": {
+                "chunk_size": 5000,
+                "move_processed_exports": True,
+                "columns": {
+                    "customer_id": "CustomerID",
+                    "customer_name": "CustomerName",
+                    "block_reason": "BlockReason",
+                    "blocked_at": "BlockedAt"
+                }
+            },
+            "request_store": {
+                "batch_size": 50,
+                "flush_interval_seconds": 1.0
+            },
+            "erp": {
+                "bulk_window_seconds": 0.5,
+                "bulk_max_customers": 500,
+                "simulation_costs": {
+                    "connect": [1.0, 0.0],
+                    "search": [0.9, 0.1],
+                    "update": [0.95, 0.05],
+                    "save": [0.95, 0.05]
+                },
+                "time_scale": 1.0,
+                "per_call_overhead_seconds": 0.0,
+                "concurrency_slowdown": 0.0,
+                "max_concurrent_calls": 0,
+                "timeout_seconds": None,
+                "error_rate": 0.0,
+                "seed": None,
+                "operations": {}
+            },
+            "workflow": {
+                "max_workers": 16,
+                "step_concurrency": {
+                    "aging_report": 4,
+                    "approval_request": 8,
+                    "erp_unblock": 4,
+                    "notification": 8
+                }
+            },
+            "approval": {
+                "source": "console",
+                "maildir": "data/approvals",
+                "poll_interval_seconds": 10,
+                "timeout_hours": 48,
+                "max_wait_seconds": None,
+                "imap_host": "",
+                "imap_port": 993,
+                "imap_user": "",
+                "imap_password": "",
+                "imap_folder": "INBOX"
+            },
+            "aging": {
+                "report_format": "xlsx",
+                "cache_enabled": True,
+                "cache_max_age_hours": 24,
+                "cache_max_mb": 500,
+                "batch_workers": 0,
+                "batch_chunk_size": 50
             }
         }
         
@@ -65,6 +212,16 @@ class ConfigManager:
         
         return value
     
+    def set(self, key: str, value):
+        """Set configuration value using dot notation (in memory only)"""
+        keys = key.split('.')
+        target = self.config
+        
+        for k in keys[:-1]:
+            target = target.setdefault(k, {})
+        
+        target[keys[-1]] = value
+    
     def save(self):
         """Save current configuration to file"""
         with open(self.config_file, 'w') as f:
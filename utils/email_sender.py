@@ -1,5 +1,6 @@
 import smtplib
 import ssl
+import time
 import os
 import logging
 from email.mime.text import MIMEText
@@ -8,6 +9,9 @@ from email.mime.base import MIMEBase
 from email import encoders
 from typing import List, Optional
 
+from utils.metrics import get_metrics
+from utils.tracing import traced
+
 class EmailSender:
     """Handles email sending functionality"""
     
@@ -20,7 +24,12 @@ class EmailSender:
         self.port = self.config.get('email.port', 587)
         self.sender_email = self.config.get('email.sender_email')
         self.sender_password = self.config.get('email.sender_password')
+        
+        metrics = get_metrics()
+        self.smtp_latency = metrics.histogram('rpa_smtp_send_seconds', 'SMTP send latency')
+        self.emails_total = metrics.counter('rpa_emails_total', 'Emails by delivery result', ['result'])
     
+    @traced()
     def send_email(self, recipients: List[str], subject: str, body: str, 
                    attachment_path: Optional[str] = None) -> bool:
         """Send email with optional attachment"""
@@ -28,8 +37,10 @@ class EmailSender:
         if not self.sender_email or not self.sender_password:
             self.logger.warning("Email credentials not configured. Simulating email send.")
             self._simulate_email_send(recipients, subject, body, attachment_path)
+            self.emails_total.labels(result='simulated').inc()
             return True
         
+        start = time.perf_counter()
         try:
             message = MIMEMultipart()
             message["From"] = self.sender_email
@@ -60,11 +71,15 @@ class EmailSender:
                 text = message.as_string()
                 server.sendmail(self.sender_email, recipients, text)
             
-            self.logger.info(f"Email sent successfully to: {', '.join(recipients)}")
+            self.smtp_latency.observe(time.perf_counter() - start)
+            self.emails_total.labels(result='sent').inc()
+            self.logger.info("Email sent successfully to: %s", ', '.join(recipients))
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to send email: {str(e)}")
+            self.smtp_latency.observe(time.perf_counter() - start)
+            self.emails_total.labels(result='failed').inc()
+            self.logger.error("Failed to send email: %s", e)
             self._simulate_email_send(recipients, subject, body, attachment_path)
             return False
     
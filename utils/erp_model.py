@@ -0,0 +1,116 @@
+import math
+import time
+import random
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DISTRIBUTIONS = ('constant', 'uniform', 'normal', 'lognormal', 'exponential')
+
+
+class ERPError(Exception):
+    """Transient failure reported by the ERP"""
+
+
+class ERPThrottledError(ERPError):
+    """The ERP rejected a call because too many were in flight"""
+
+
+class ERPTimeoutError(ERPError):
+    """The ERP did not answer within the configured timeout"""
+
+
+# Calls in flight per process, shared by every model so order and unblock traffic slow each other down
+_in_flight_lock = threading.Lock()
+_in_flight = 0
+
+
+class ERPLatencyModel:
+    """Configurable latency and failure model for simulated ERP calls
+
+    Each operation's latency is drawn from a distribution centred on its base cost, plus a
+    per-call overhead, stretched by the number of calls in flight. Calls can be throttled,
+    time out or fail at configured rates. With no configuration every call takes exactly
+    its base cost and never fails.
+    """
+
+    def __init__(self, config_manager):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+
+        # Simulated seconds per real second; load tests shrink this to run quickly
+        self.time_scale = float(self.config.get('erp.time_scale', 1.0))
+        self.per_call_overhead = float(self.config.get('erp.per_call_overhead_seconds', 0.0))
+        self.concurrency_slowdown = float(self.config.get('erp.concurrency_slowdown', 0.0))
+        self.max_concurrent_calls = self.config.get('erp.max_concurrent_calls', 0)
+        self.timeout_seconds = self.config.get('erp.timeout_seconds')
+        self.error_rate = float(self.config.get('erp.error_rate', 0.0))
+        self.operations: Dict[str, Dict] = self.config.get('erp.operations', {})
+        self.record_calls = self.config.get('erp.record_calls', False)
+
+        self.random = random.Random(self.config.get('erp.seed'))
+        self.observations: Dict[str, List[Tuple[float, str]]] = defaultdict(list)
+
+        for operation, spec in self.operations.items():
+            if spec.get('distribution', 'constant') not in DISTRIBUTIONS:
+                raise ValueError(f"Unknown latency distribution for {operation}: {spec['distribution']}")
+
+    def sample(self, operation: str, base: float) -> float:
+        """Draw the unloaded latency of one call in simulated seconds"""
+        spec = self.operations.get(operation, {})
+        center = float(spec.get('median', base))
+        distribution = spec.get('distribution', 'constant')
+
+        if distribution == 'uniform':
+            spread = spec.get('spread', 0.5)
+            latency = center * self.random.uniform(1 - spread, 1 + spread)
+        elif distribution == 'normal':
+            latency = center * (1 + spec.get('cv', 0.2) * self.random.gauss(0, 1))
+        elif distribution == 'lognormal':
+            latency = center * math.exp(spec.get('sigma', 0.5) * self.random.gauss(0, 1))
+        elif distribution == 'exponential':
+            latency = self.random.expovariate(1 / center) if center > 0 else 0.0
+        else:
+            latency = center
+
+        # Occasional slow outliers on top of the body of the distribution
+        if self.random.random() < spec.get('tail_rate', 0.0):
+            latency *= spec.get('tail_multiplier', 10.0)
+
+        return max(latency, 0.0) + self.per_call_overhead
+
+    def call(self, operation: str, base: float):
+        """Spend the modeled time of one ERP call, raising ERPError subclasses on injected failures"""
+        global _in_flight
+        with _in_flight_lock:
+            _in_flight += 1
+            concurrent = _in_flight
+
+        start = time.perf_counter()
+        status = 'ok'
+        try:
+            if self.max_concurrent_calls and concurrent > self.max_concurrent_calls:
+                status = 'throttled'
+                self._sleep(self.per_call_overhead)
+                raise ERPThrottledError(f"{operation} throttled with {concurrent} calls in flight")
+
+            latency = self.sample(operation, base) * (1 + self.concurrency_slowdown * (concurrent - 1))
+            if self.timeout_seconds is not None and latency > self.timeout_seconds:
+                status = 'timeout'
+                self._sleep(self.timeout_seconds)
+                raise ERPTimeoutError(f"{operation} timed out after {self.timeout_seconds}s")
+
+            self._sleep(latency)
+            if self.random.random() < self.operations.get(operation, {}).get('error_rate', self.error_rate):
+                status = 'error'
+                raise ERPError(f"{operation} failed in ERP")
+        finally:
+            with _in_flight_lock:
+                _in_flight -= 1
+            if self.record_calls:
+                self.observations[operation].append((time.perf_counter() - start, status))
+
+    def _sleep(self, simulated_seconds: float):
+        if simulated_seconds > 0:
+            time.sleep(simulated_seconds * self.time_scale)
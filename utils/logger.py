@@ -1,25 +1,152 @@
+import json
+import queue
+import atexit
 import logging
+import logging.handlers
+import multiprocessing
 import os
+import threading
 from datetime import datetime
 
-def setup_logging():
+_listener = None
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Formats each record as one JSON object per line"""
+
+    def format(self, record):
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'logger': record.name,
+            'level': record.levelname,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps one in N records per message template for high-volume loggers
+
+    Only records below WARNING are sampled; warnings and errors always pass.
+    """
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+
+        rate = self.rates.get(record.name)
+        if not rate or rate <= 1:
+            return True
+
+        key = (record.name, record.msg)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % rate == 0
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queues records unformatted so message formatting also runs on the listener thread"""
+
+    def prepare(self, record):
+        return record
+
+
+class _ForwardingHandler(logging.Handler):
+    """Re-emits records from worker processes through this process's loggers"""
+
+    def handle(self, record):
+        logging.getLogger(record.name).handle(record)
+        return True
+
+
+def start_worker_log_listener():
+    """Queue and running listener that carry process pool workers' records to the parent's handlers"""
+    log_queue = multiprocessing.Queue()
+    listener = logging.handlers.QueueListener(log_queue, _ForwardingHandler())
+    listener.start()
+    return log_queue, listener
+
+
+def setup_worker_logging(log_queue, level=logging.INFO):
+    """Send a worker process's records to the parent's listener instead of inherited handlers"""
+    # A forked worker inherits the parent's queue handler, but no listener reads that queue here
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    # No formatter, so only the message is rendered here and the parent's handlers format the rest
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(level)
+
+
+def _stop_listener():
+    """Drain queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(config_manager=None):
     """Setup logging configuration"""
+    global _listener
+
+    def setting(key, default):
+        return config_manager.get(key, default) if config_manager else default
+
+    logs_folder = setting('paths.logs_folder', 'logs')
+
     # Create logs directory if it doesn't exist
-    os.makedirs('logs', exist_ok=True)
-    
+    os.makedirs(logs_folder, exist_ok=True)
+
     # Create log filename with timestamp
-    log_filename = f"logs/rpa_poc_{datetime.now().strftime('%Y%m%d')}.log"
-    
-    # Configure logging
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_filename),
-            logging.StreamHandler()
-        ]
+    log_filename = os.path.join(logs_folder, f"rpa_poc_{datetime.now().strftime('%Y%m%d')}.log")
+
+    if setting('logging.format', 'text') == 'json':
+        formatter = JsonLinesFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    # File and console writes happen on the listener thread, off the processing path
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_filename,
+        maxBytes=setting('logging.max_bytes', 50 * 1024 * 1024),
+        backupCount=setting('logging.backup_count', 5),
+        encoding='utf-8'
     )
-    
+    stream_handler = logging.StreamHandler()
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+
+    _stop_listener()
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(
+        log_queue, file_handler, stream_handler, respect_handler_level=True
+    )
+    _listener.start()
+
+    queue_handler = DeferredQueueHandler(log_queue)
+    sampling_rates = setting('logging.sampling', {})
+    if sampling_rates:
+        queue_handler.addFilter(SamplingFilter(sampling_rates))
+
+    # Configure logging
+    level = getattr(logging, str(setting('logging.level', 'INFO')).upper(), logging.INFO)
+    logging.basicConfig(level=level, handlers=[queue_handler], force=True)
+
     # Set specific log levels for external libraries
     logging.getLogger('PIL').setLevel(logging.WARNING)
     logging.getLogger('opencv').setLevel(logging.WARNING)
+
+
+atexit.register(_stop_listener)
@@ -0,0 +1,163 @@
+import os
+import io
+import random
+import pstats
+import cProfile
+import logging
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+MAX_STACK_DEPTH = 64
+# Call paths carrying less time than this are not expanded, and the walk stops after
+# MAX_STACK_PATHS paths, so dense call graphs (pandas, numpy) cannot explode exponentially
+MIN_PATH_SECONDS = 0.000001
+MAX_STACK_PATHS = 200_000
+
+
+class StageProfiler:
+    """Profiles pipeline stages with cProfile and tracemalloc on a sampled subset of work"""
+
+    def __init__(self, config_manager, workflow: str):
+        self.config = config_manager
+        self.logger = logging.getLogger(__name__)
+        self.workflow = workflow
+
+        self.enabled = self.config.get('profiling.enabled', False)
+        self.sample_rate = float(self.config.get('profiling.sample_rate', 1.0))
+        self.traceback_frames = self.config.get('profiling.traceback_frames', 10)
+        self.top_allocations = self.config.get('profiling.top_allocations', 25)
+        self.reports_folder = self.config.get('paths.reports_folder', 'reports')
+
+        self._sampled = False
+        self._active_stage = None
+        self._stage_stats: Dict[str, pstats.Stats] = {}
+        self._stage_allocations: Dict[str, Dict[Tuple[str, int], List[int]]] = {}
+        self._stage_samples: Dict[str, int] = {}
+
+    def begin_unit(self) -> bool:
+        """Decide whether the next unit of work (file or request) is profiled"""
+        self._sampled = self.enabled and random.random() < self.sample_rate
+        return self._sampled
+
+    @contextmanager
+    def stage(self, name: str):
+        """Profile one stage if the current unit is sampled"""
+        if not self._sampled or self._active_stage is not None:
+            yield
+            return
+
+        self._active_stage = name
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(self.traceback_frames)
+        before = tracemalloc.take_snapshot()
+
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            after = tracemalloc.take_snapshot()
+            if started_tracemalloc:
+                tracemalloc.stop()
+            self._active_stage = None
+            self._collect(name, profile, before, after)
+
+    def _collect(self, name: str, profile: cProfile.Profile,
+                 before: tracemalloc.Snapshot, after: tracemalloc.Snapshot):
+        """Merge one stage sample into the per-stage aggregates"""
+        if name in self._stage_stats:
+            self._stage_stats[name].add(profile)
+        else:
+            self._stage_stats[name] = pstats.Stats(profile, stream=io.StringIO())
+        self._stage_samples[name] = self._stage_samples.get(name, 0) + 1
+
+        allocations = self._stage_allocations.setdefault(name, {})
+        for diff in after.compare_to(before, 'lineno'):
+            if diff.size_diff <= 0:
+                continue
+            frame = diff.traceback[0]
+            site = allocations.setdefault((frame.filename, frame.lineno), [0, 0])
+            site[0] += diff.size_diff
+            site[1] += diff.count_diff
+
+    def write_reports(self) -> str:
+        """Write folded stacks, pstats dumps and top allocation sites per stage"""
+        if not self._stage_stats:
+            return None
+
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        output_folder = os.path.join(self.reports_folder, 'profiles', f"{self.workflow}_{timestamp}")
+        os.makedirs(output_folder, exist_ok=True)
+
+        for name, stats in self._stage_stats.items():
+            stats.dump_stats(os.path.join(output_folder, f"{name}.pstats"))
+
+            with open(os.path.join(output_folder, f"{name}.folded"), 'w') as f:
+                for stack, microseconds in self._folded_stacks(name, stats):
+                    f.write(f"{stack} {microseconds}\n")
+
+            with open(os.path.join(output_folder, f"{name}_allocations.txt"), 'w') as f:
+                f.write(f"Top allocation sites for stage '{name}' "
+                        f"({self._stage_samples[name]} sampled runs)\n\n")
+                sites = sorted(self._stage_allocations.get(name, {}).items(),
+                               key=lambda item: item[1][0], reverse=True)
+                for (filename, lineno), (size, count) in sites[:self.top_allocations]:
+                    f.write(f"{size / 1024:10.1f} KiB {count:8d} blocks  {filename}:{lineno}\n")
+
+        self.logger.info("Profiling reports written to: %s", output_folder)
+        print(f"🔬 Profiling reports saved: {output_folder}")
+        return output_folder
+
+    def _folded_stacks(self, stage: str, stats: pstats.Stats) -> List[Tuple[str, int]]:
+        """Reconstruct flamegraph folded stacks from cProfile's caller graph
+
+        cProfile keeps only caller/callee edges, so each function's own time is
+        split across call paths in proportion to the cumulative time of each edge.
+        """
+        raw = stats.stats
+        callees: Dict[tuple, List[tuple]] = {}
+        for func, (_, _, _, _, callers) in raw.items():
+            for caller in callers:
+                callees.setdefault(caller, []).append(func)
+
+        roots = [func for func, (_, _, _, _, callers) in raw.items() if not callers]
+        totals: Dict[str, float] = {}
+        visited = 0
+
+        def label(func):
+            filename, lineno, name = func
+            return f"{name} ({os.path.basename(filename)}:{lineno})"
+
+        def walk(func, path, weight):
+            nonlocal visited
+            visited += 1
+            _, _, tottime, cumtime, _ = raw[func]
+            frames = path + [label(func)]
+            if tottime * weight > 0:
+                key = ';'.join(frames)
+                totals[key] = totals.get(key, 0.0) + tottime * weight
+
+            if len(frames) >= MAX_STACK_DEPTH:
+                return
+            for callee in callees.get(func, []):
+                if visited >= MAX_STACK_PATHS:
+                    return
+                if label(callee) in frames:
+                    continue
+                callee_cumtime = raw[callee][3]
+                edge_cumtime = raw[callee][4][func][3]
+                # weight * edge_cumtime is the time this path spends in the callee and below
+                if callee_cumtime > 0 and weight * edge_cumtime >= MIN_PATH_SECONDS:
+                    walk(callee, frames, weight * edge_cumtime / callee_cumtime)
+
+        for root in roots:
+            walk(root, [stage], 1.0)
+        if visited >= MAX_STACK_PATHS:
+            self.logger.warning("Folded stacks for %s truncated after %s call paths", stage, MAX_STACK_PATHS)
+
+        return [(stack, int(seconds * 1_000_000)) for stack, seconds in totals.items()
+                if seconds >= 0.000001]
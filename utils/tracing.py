@@ -0,0 +1,292 @@
+import os
+import json
+import time
+import heapq
+import uuid
+import random
+import logging
+import functools
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Spans beyond this per trace are counted but not kept, so a runaway loop cannot bloat the export
+DEFAULT_MAX_SPANS = 2000
+
+
+class Span:
+    """One timed operation within a trace"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'start', 'end', 'attributes', 'error')
+
+    def __init__(self, trace: '_Trace', span_id: int, parent_id: Optional[int], name: str,
+                 attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any):
+        """Attach an attribute to the span"""
+        self.attributes[key] = value
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        record = {
+            'id': self.span_id,
+            'parent': self.parent_id,
+            'name': self.name,
+            'start_ms': round((self.start - origin) * 1000, 3),
+            'duration_ms': round(((self.end or time.time()) - self.start) * 1000, 3)
+        }
+        if self.attributes:
+            record['attributes'] = self.attributes
+        if self.error:
+            record['error'] = self.error
+        return record
+
+
+class _Trace:
+    """Spans collected for one file or request"""
+
+    def __init__(self, trace_id: str, max_spans: int):
+        self.trace_id = trace_id
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def new_span(self, parent_id: Optional[int], name: str, attributes: Dict[str, Any]) -> Span:
+        # Steps of one trace may run on worker threads
+        with self._lock:
+            self._next_id += 1
+            span = Span(self, self._next_id, parent_id, name, attributes)
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+        return span
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar('current_span', default=None)
+
+
+class JsonlTraceExporter:
+    """Appends each finished trace as one JSON line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str)
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+class Tracer:
+    """Process-wide tracer; spans are no-ops outside an active trace"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.enabled = False
+        self.sample_rate = 1.0
+        self.max_spans = DEFAULT_MAX_SPANS
+        self.exporter: Optional[JsonlTraceExporter] = None
+
+    def configure(self, config_manager):
+        """Enable tracing and the JSONL exporter from configuration"""
+        logs_folder = config_manager.get('paths.logs_folder', 'logs')
+        self.enabled = config_manager.get('tracing.enabled', True)
+        self.sample_rate = float(config_manager.get('tracing.sample_rate', 1.0))
+        self.max_spans = config_manager.get('tracing.max_spans_per_trace', DEFAULT_MAX_SPANS)
+        self.exporter = JsonlTraceExporter(
+            config_manager.get('paths.trace_file', os.path.join(logs_folder, 'traces.jsonl'))
+        )
+
+    @contextmanager
+    def trace(self, name: str, trace_id: str = None, **attributes) -> Iterator[Optional[Span]]:
+        """Start a trace with a root span; nested spans anywhere below it join the trace"""
+        if not self.enabled or self.exporter is None or random.random() >= self.sample_rate:
+            yield None
+            return
+
+        trace = _Trace(trace_id or uuid.uuid4().hex, self.max_spans)
+        root = trace.new_span(None, name, attributes)
+        token = _current_span.set(root)
+        try:
+            yield root
+        except BaseException as e:
+            root.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            root.end = time.time()
+            _current_span.reset(token)
+            self._export(trace, root)
+
+    @contextmanager
+    def span(self, name: str, **attributes) -> Iterator[Optional[Span]]:
+        """Time a nested operation of the current trace"""
+        parent = _current_span.get()
+        if parent is None:
+            yield None
+            return
+
+        span = parent.trace.new_span(parent.span_id, name, attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.time()
+            _current_span.reset(token)
+
+    def _export(self, trace: _Trace, root: Span):
+        record = {
+            'trace_id': trace.trace_id,
+            'name': root.name,
+            'start': root.start,
+            'duration_ms': round((root.end - root.start) * 1000, 3),
+            'attributes': root.attributes,
+            'error': root.error,
+            'dropped_spans': trace.dropped,
+            'spans': [span.to_dict(root.start) for span in trace.spans]
+        }
+        try:
+            self.exporter.export(record)
+        except OSError as e:
+            self.logger.warning("Could not export trace %s: %s", trace.trace_id, e)
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    """Get the process-wide tracer"""
+    return _tracer
+
+
+def configure_tracing(config_manager):
+    """Configure the process-wide tracer"""
+    _tracer.configure(config_manager)
+
+
+def span(name: str, **attributes):
+    """Span on the process-wide tracer"""
+    return _tracer.span(name, **attributes)
+
+
+def traced(name: str = None) -> Callable:
+    """Decorator recording each call as a span named after the function"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with _tracer.span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def critical_path(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Spans that bounded a trace's duration, in order, each with a 'depth'
+
+    Walking back from a span's end, the child that finished last is on the path, then the
+    child that finished last before that one started, and so on; each is expanded the same
+    way. Self time is the part of a span's duration not covered by any child.
+    """
+    children: Dict[Optional[int], List[Dict[str, Any]]] = {}
+    for span_record in record['spans']:
+        children.setdefault(span_record['parent'], []).append(span_record)
+
+    path: List[Dict[str, Any]] = []
+
+    def expand(span_record: Dict[str, Any], depth: int):
+        kids = children.get(span_record['id'], [])
+        path.append({**span_record, 'depth': depth,
+                     'self_ms': round(max(span_record['duration_ms'] - _covered_ms(kids), 0.0), 3)})
+
+        chain = []
+        boundary = span_record['start_ms'] + span_record['duration_ms']
+        remaining = sorted(kids, key=lambda kid: kid['start_ms'] + kid['duration_ms'])
+        while remaining:
+            # Latest child that finished before the current boundary (rounding tolerance of 1 us)
+            candidates = [kid for kid in remaining if kid['start_ms'] + kid['duration_ms'] <= boundary + 0.001]
+            if not candidates:
+                break
+            last = candidates[-1]
+            chain.append(last)
+            boundary = last['start_ms']
+            remaining = candidates[:-1]
+
+        for kid in reversed(chain):
+            expand(kid, depth + 1)
+
+    for root in children.get(None, []):
+        expand(root, 0)
+    return path
+
+
+def _covered_ms(spans: List[Dict[str, Any]]) -> float:
+    """Wall time covered by possibly overlapping spans"""
+    covered, reach = 0.0, float('-inf')
+    for span_record in sorted(spans, key=lambda s: s['start_ms']):
+        start, end = span_record['start_ms'], span_record['start_ms'] + span_record['duration_ms']
+        if end > reach:
+            covered += end - max(start, reach)
+            reach = end
+    return covered
+
+
+def slowest_traces(path: str, top: int = 10, name: str = None) -> List[Dict[str, Any]]:
+    """Slowest traces in an export file, read as a stream"""
+    def records():
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if name is None or record['name'] == name:
+                    yield record
+
+    return heapq.nlargest(top, records(), key=lambda record: record['duration_ms'])
+
+
+def print_trace_report(config_manager, top: int = 10, name: str = None):
+    """Print the slowest traces with their critical paths"""
+    logs_folder = config_manager.get('paths.logs_folder', 'logs')
+    path = config_manager.get('paths.trace_file', os.path.join(logs_folder, 'traces.jsonl'))
+    if not os.path.exists(path):
+        print(f"📭 No traces recorded yet ({path})")
+        return
+
+    traces = slowest_traces(path, top, name)
+    print(f"\n🐢 Slowest {len(traces)} traces from {path}")
+
+    time_by_span: Dict[str, float] = {}
+    for record in traces:
+        label = record['attributes'].get('file') or record['trace_id']
+        print(f"\n   {record['duration_ms'] / 1000:8.2f}s  {record['name']}  {label}"
+              + (f"  ❌ {record['error']}" if record.get('error') else ''))
+        for span_record in critical_path(record):
+            depth = span_record['depth']
+            print(f"      {'  ' * depth}{span_record['name']:<{40 - 2 * depth}} "
+                  f"{span_record['duration_ms']:10.1f} ms  (self {span_record['self_ms']:.1f} ms)")
+            time_by_span[span_record['name']] = time_by_span.get(span_record['name'], 0.0) + span_record['self_ms']
+
+    if time_by_span:
+        total = sum(time_by_span.values()) or 1.0
+        print("\n   Critical-path self time across these traces:")
+        for span_name, self_ms in sorted(time_by_span.items(), key=lambda kv: -kv[1])[:10]:
+            print(f"      {span_name:<40} {self_ms / 1000:8.2f}s  {self_ms / total:6.1%}")